@@ -0,0 +1,91 @@
+"""
+Import time of CLI cold starts, from python -X importtime.
+
+    python benchmarks/bench_importtime.py [-n RUNS] [--top N]
+
+Prints the median total import time of each command and its most expensive
+top level imports, and exits with 1 if a command is over its budget or
+imports one of the modules it must leave alone.
+"""
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+FORKSEARCH = Path(__file__).parent.parent / "forksearch"
+
+# modules that cost tens to hundreds of milliseconds each
+HEAVY = ("neo4j", "requests", "typer", "pycurl", "sgqlc.endpoint.requests", "mygithub.github_schema")
+
+# command -> (arguments, budget in ms, heavy modules it may import)
+COMMANDS = {
+    "main.py -h": (["main.py", "-h"], 25, ()),
+    "import utils": (["-c", "import utils"], 100, ()),
+    "first operation": (["-c", "import utils; from templates import repo_info_query; repo_info_query()"], 150, ()),
+}
+
+
+def import_times(args, baseline=()):
+    """Module -> cumulative import time in microseconds of one run.
+
+    Modules in baseline, what the interpreter imports on its own (site,
+    encodings, ...), are left out.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=FORKSEARCH,
+                            capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        # top level imports are the ones not indented under another module
+        if not module.startswith("  ") and module.strip() not in baseline:
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def heavy_imports(times, allowed=()):
+    return sorted(
+        m for m in times
+        if any(m == h or m.startswith(h + ".") or m.startswith(h + "_") for h in HEAVY)
+        and not any(m == a or m.startswith(a + ".") for a in allowed)
+    )
+
+
+def run_all(runs: int = 5):
+    """Command -> (median total ms, top level imports of the last run)"""
+    baseline = set(import_times(["-c", "pass"]))
+    results = {}
+    for name, (args, _, _) in COMMANDS.items():
+        import_times(args)  # writes the bytecode cache
+        totals = []
+        for _ in range(runs):
+            times = import_times(args, baseline)
+            totals.append(sum(times.values()) / 1000)
+        results[name] = (statistics.median(totals), times)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for name, (total, times) in run_all(args.runs).items():
+        _, budget, allowed = COMMANDS[name]
+        heavy = heavy_imports(times, allowed)
+        ok = total <= budget and not heavy
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:16} {total:7.1f}ms (budget {budget}ms)")
+        for module, t in sorted(times.items(), key=lambda x: -x[1])[:args.top]:
+            print(f"       {t / 1000:7.1f}ms {module}")
+        if heavy:
+            print(f"       imports {', '.join(heavy)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Rows per second written by add_all_edges against the old APOC query.
+
+    python benchmarks/bench_ingest.py [--pages N] [--rows N] [--host ...]
+
+Needs a running neo4j (the APOC plugin only for the old query). Writes
+synthetic pages under a throwaway repository and deletes them afterwards.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "forksearch"))
+from database import GitDB  # noqa: E402
+from database.queries import *  # noqa: E402
+
+BENCH_REPO = "bench-ingest-repo"
+
+# ADD_ALL_EDGES before the per label statements, one apoc.merge.node per row
+APOC_ADD_ALL_EDGES = f'''
+WITH $nodes as batch
+MATCH (parent:{REPOSITORY} {{id: $nodes.id}})
+WITH $nodes.stargazers.nodes as stargazers,
+    $nodes.watchers.nodes as watchers,
+    $nodes.forks.nodes as forks,
+    parent
+CALL {{
+    WITH parent, stargazers
+    UNWIND stargazers AS user
+    call apoc.merge.node(["{OWNER}", user.__typename], {{login: user.login}}, user, user) yield node as stargazer
+    MERGE (parent) <-[:{STAR}]- (stargazer)
+    return stargazer.login as result
+UNION all
+    WITH parent, watchers
+    UNWIND watchers AS user
+    call apoc.merge.node(["{OWNER}", user.__typename], {{login: user.login}}, user, user) yield node as watcher
+    MERGE (parent) <-[:{WATCH}]- (watcher)
+    return watcher.login as result
+UNION all
+    WITH parent, forks
+    UNWIND forks as fork
+    call apoc.merge.node(["{OWNER}", fork.owner.__typename], {{login: fork.owner.login}}, fork.owner, fork.owner) yield node as owner
+    MERGE (repo:{REPOSITORY} {{id: fork.id}})<-[:{OWN}]-(owner)
+    SET repo += {{ isFork: fork.isFork, name: fork.name, url: fork.url, login: fork.owner.login, patch_date: fork.patch_date, pushedAt: fork.pushedAt}}
+    MERGE (repo)<-[:{OWN}]-(owner)
+    MERGE (parent)<-[:{FORK}]-(repo)
+    return owner.login as result
+}}
+return result
+'''
+
+
+def user(login, typename="User"):
+    return {"login": login, "__typename": typename, "id": login, "url": f"https://github.com/{login}", "name": login}
+
+
+def page(prefix, i, rows):
+    """A page with rows stargazers, watchers and forks each; every third fork owner is an organization"""
+    base = i * rows
+    return {
+        "id": BENCH_REPO,
+        "stargazers": {"nodes": [user(f"{prefix}-s{base + j}") for j in range(rows)]},
+        "watchers": {"nodes": [user(f"{prefix}-w{base + j}") for j in range(rows)]},
+        "forks": {"nodes": [
+            {
+                "id": f"{prefix}-f{base + j}", "name": BENCH_REPO, "url": "", "isFork": True,
+                "pushedAt": "2023-01-01T00:00:00Z", "patch_date": "None",
+                "owner": user(f"{prefix}-o{base + j}", "Organization" if j % 3 == 0 else "User"),
+            }
+            for j in range(rows)
+        ]},
+    }
+
+
+def cleanup(db):
+    db._write(lambda tx: tx.run(
+        "MATCH (n) WHERE n.login STARTS WITH 'bench-' OR n.id STARTS WITH 'bench-' DETACH DELETE n"
+    ).consume())
+
+
+def run(write, pages):
+    start = time.perf_counter()
+    rows = sum(len(write(p)) for p in pages)
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=100, help="rows per connection of a page")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default=7687)
+    parser.add_argument("--username", default="neo4j")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+
+    db = GitDB(args.host, args.port, args.username, args.password)
+    writers = {
+        "apoc": lambda p: db._write(lambda tx: tx.run(APOC_ADD_ALL_EDGES, nodes=p).data()),
+        "unwind": db.add_all_edges,
+    }
+    try:
+        for name, write in writers.items():
+            cleanup(db)
+            db._write(lambda tx: tx.run(f"MERGE (:{REPOSITORY} {{id: $id}})", id=BENCH_REPO).consume())
+            pages = [page(f"bench-{name}", i, args.rows) for i in range(args.pages)]
+            try:
+                rows, seconds = run(write, pages)
+            except Exception as e:
+                print(f"{name:8} failed: {e}")
+                continue
+            print(f"{name:8} {rows} rows in {seconds:.2f}s, {rows / seconds:,.0f} rows/s")
+    finally:
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Response bytes and rate limit points per crawled page for every crawl profile.
+
+    python benchmarks/bench_profiles.py [--repo owner/name] [--pages N] [--first N]
+
+Needs a Github token in GH_TOKEN. Crawls the first pages of the repository
+with each profile, without writing anything, and reports the size of the
+document sent and of the JSON data returned per page.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "forksearch"))
+from gh_utils import query_with_retry, query_cost  # noqa: E402
+from profiles import PROFILES  # noqa: E402
+from templates import crawl_page_query, crawl_page_variables  # noqa: E402
+from tokens import GRAPHQL_URL  # noqa: E402
+
+
+def crawl(endpoint, owner, name, profile, pages, first):
+    """(document bytes, response bytes, cost) of up to pages pages"""
+    cursors = {field: None for field in profile.connections}
+    results = []
+    while cursors and len(results) < pages:
+        op = crawl_page_query(tuple(sorted(cursors)), (), profile.name)
+        variables = crawl_page_variables(owner, name, {field: (first, after) for field, after in cursors.items()})
+        d = query_with_retry(endpoint, op, variables=variables)
+        repo = d["data"]["repository"]
+        results.append((len(bytes(op)), len(json.dumps(d["data"], separators=(",", ":"))), query_cost(d)))
+        cursors = {
+            field: repo[field]["pageInfo"]["endCursor"]
+            for field in cursors if repo[field]["pageInfo"]["hasNextPage"]
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repo", default="dbrumley/forksearch")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--first", type=int, default=100, help="nodes per connection of a page")
+    args = parser.parse_args()
+
+    token = os.getenv("GH_TOKEN")
+    if not token:
+        sys.exit("GH_TOKEN is not set")
+    from sgqlc.endpoint.requests import RequestsEndpoint  # noqa: I900
+    endpoint = RequestsEndpoint(GRAPHQL_URL, {"Authorization": "bearer " + token})
+    owner, name = args.repo.split("/")
+
+    print(f"{'profile':14} {'pages':>5} {'document':>10} {'bytes/page':>11} {'points/page':>12}")
+    for profile in PROFILES.values():
+        results = crawl(endpoint, owner, name, profile, args.pages, args.first)
+        if not results:
+            continue
+        documents, sizes, costs = zip(*results)
+        costs = [c for c in costs if c is not None]
+        print(f"{profile.name:14} {len(results):5} {statistics.mean(documents):10,.0f} "
+              f"{statistics.mean(sizes):11,.0f} {statistics.mean(costs) if costs else float('nan'):12.1f}")
+
+
+if __name__ == "__main__":
+    main()
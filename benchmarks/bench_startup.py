@@ -0,0 +1,46 @@
+"""
+Cold start time of the CLI with the trimmed and the full Github schema.
+
+    python benchmarks/bench_startup.py [-n RUNS]
+
+Every run is a fresh interpreter in forksearch/, which imports what a crawl
+imports and builds one operation, so the schema is actually loaded.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+FORKSEARCH = Path(__file__).parent.parent / "forksearch"
+
+STARTUP = "import utils; from templates import repo_info_query; repo_info_query()"
+SCHEMAS = {
+    "trimmed": {},
+    "full": {"FORKSEARCH_FULL_SCHEMA": "1"},
+}
+
+
+def run(code, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=FORKSEARCH, env=dict(os.environ, **env), check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, env in SCHEMAS.items():
+        # the first run writes the bytecode cache
+        run(STARTUP, env)
+        times = [run(STARTUP, env) for _ in range(args.runs)]
+        print(f"{name:8} median {statistics.median(times):.3f}s  min {min(times):.3f}s  ({args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Adaptive page and batch sizes for GraphQL documents
+"""
+import threading
+
+# Github's maximum for first/last on a connection
+MAX_PAGE_SIZE = 100
+MIN_PAGE_SIZE = 5
+# pages slower than this (seconds) are not grown; Github gives up at 10
+TARGET_LATENCY = 5.0
+# pages costing more points than this are not grown
+TARGET_COST = 1
+
+
+class PageSize:
+    """Size of the pages (or batches) of one kind of document.
+
+    Halved whenever Github times out on a document, grown back a step at a
+    time while documents come back faster than TARGET_LATENCY and cheaper
+    than TARGET_COST. This settles on the largest size Github serves
+    reliably without manual tuning.
+    """
+
+    def __init__(self, size: int = MAX_PAGE_SIZE, minimum: int = MIN_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE,
+                 target_latency: float = TARGET_LATENCY, target_cost: int = TARGET_COST):
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.size = max(self.minimum, min(size, maximum))
+        self.target_latency = target_latency
+        self.target_cost = target_cost
+        self.step = max(1, maximum // 10)
+        self.lock = threading.Lock()
+
+    def __int__(self):
+        return self.size
+
+    def shrink(self):
+        """Halve the size. Returns False if it was already at the minimum."""
+        with self.lock:
+            if self.size <= self.minimum:
+                return False
+            self.size = max(self.minimum, self.size // 2)
+            return True
+
+    def observe(self, latency: float, cost: int = None):
+        """Grow after a document that was fast and cheap enough"""
+        with self.lock:
+            if latency > self.target_latency:
+                return
+            if cost is not None and cost > self.target_cost:
+                return
+            self.size = min(self.maximum, self.size + self.step)
@@ -0,0 +1,101 @@
+"""
+Index of which fix commits the head of every fork of a network contains
+"""
+import sqlite3
+import threading
+
+
+class AncestryIndex:
+    """Reachability of known fix commits from the heads of the forks of a network.
+
+    Every fork maps to the oid at the head of its default branch. Every
+    distinct head stores a bitset with one bit per known fix, set if the
+    head contains that fix; forks that share a head share the row. Fix
+    commits get their bit, in order, the first time they are evaluated.
+
+    source answers has_commit(oid) and is_ancestor(ancestor, oid), usually
+    a mirror.NetworkMirror. Every pair of a head and a fix is asked once:
+    adding a fix checks the stored heads against it, a new head checks it
+    against the stored fixes, and unpatched() is a lookup.
+    """
+
+    def __init__(self, source, path=None):
+        self.source = source
+        if path is None:
+            path = str(source.path) + ".ancestry.sqlite"
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fixes (oid TEXT PRIMARY KEY, bit INTEGER UNIQUE);
+            CREATE TABLE IF NOT EXISTS commits (oid TEXT PRIMARY KEY, fixes TEXT);
+            CREATE TABLE IF NOT EXISTS heads (fork TEXT PRIMARY KEY, oid TEXT);
+            """
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __contains__(self, oid):
+        """Whether head oid is evaluated already, set_head then needs nothing from the source"""
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM commits WHERE oid = ?", (oid,)).fetchone() is not None
+
+    def _contains(self, oid, fix):
+        return oid == fix or self.source.is_ancestor(fix, oid)
+
+    def add_fix(self, oid: str):
+        """Bit of fix commit oid, evaluated against every stored head if it is new.
+
+        None if the source does not have the commit.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT bit FROM fixes WHERE oid = ?", (oid,)).fetchone()
+            if row:
+                return row[0]
+            if not self.source.has_commit(oid):
+                return None
+            bit = self.conn.execute("SELECT COUNT(*) FROM fixes").fetchone()[0]
+            updates = []
+            for head, fixes in self.conn.execute("SELECT oid, fixes FROM commits"):
+                if self._contains(head, oid):
+                    updates.append((hex(int(fixes, 16) | 1 << bit), head))
+            # column names, so index files that still have a generation column work
+            self.conn.execute("INSERT INTO fixes (oid, bit) VALUES (?, ?)", (oid, bit))
+            self.conn.executemany("UPDATE commits SET fixes = ? WHERE oid = ?", updates)
+            self.conn.commit()
+            return bit
+
+    def set_head(self, fork: str, oid: str):
+        """Record the head of fork, evaluating the stored fixes against it if it is new"""
+        with self.lock:
+            if oid and not self.conn.execute("SELECT 1 FROM commits WHERE oid = ?", (oid,)).fetchone():
+                if not self.source.has_commit(oid):
+                    oid = None
+                else:
+                    bits = 0
+                    for fix, bit in self.conn.execute("SELECT oid, bit FROM fixes"):
+                        if self._contains(oid, fix):
+                            bits |= 1 << bit
+                    self.conn.execute("INSERT INTO commits (oid, fixes) VALUES (?, ?)", (oid, hex(bits)))
+            self.conn.execute("INSERT OR REPLACE INTO heads VALUES (?, ?)", (fork, oid))
+            self.conn.commit()
+
+    def patched(self, fixes):
+        """fork -> True if its head contains any of fixes, the commits of one patch and its backports"""
+        mask = 0
+        for oid in fixes:
+            bit = self.add_fix(oid)
+            if bit is not None:
+                mask |= 1 << bit
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT heads.fork, commits.fixes FROM heads LEFT JOIN commits ON commits.oid = heads.oid"
+            ).fetchall()
+        return {fork: bool(bits and int(bits, 16) & mask) for fork, bits in rows}
+
+    def unpatched(self, fixes):
+        """Forks whose head contains none of fixes"""
+        return {fork for fork, patched in self.patched(fixes).items() if not patched}
@@ -0,0 +1,135 @@
+"""
+On-disk cache of GraphQL responses
+"""
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+import xdg.BaseDirectory
+
+# query type -> seconds a cached response stays fresh
+TTLS = {
+    "repo_info": 10 * 60,
+    "connections": 6 * 60 * 60,
+    "pulls": 24 * 60 * 60,
+    "comments": 24 * 60 * 60,
+    "default": 60 * 60,
+}
+# least recently used responses are evicted above this size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def normalize(document):
+    """Collapse the formatting of a document so equal queries hash equally"""
+    return re.sub(r"\s+", " ", document).strip()
+
+
+def cache_key(document, variables=None):
+    payload = normalize(document) + json.dumps(variables or {}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def query_kind(document):
+    """Type of a query, which decides the TTL of its responses"""
+    if "pullRequests" in document:
+        return "pulls"
+    if "issues" in document:
+        return "comments"
+    if re.search(r"\b(stargazers|watchers|forks)\([^)]*(first|last)", document):
+        return "connections"
+    if "forkCount" in document:
+        return "repo_info"
+    return "default"
+
+
+class ResponseCache:
+    """Content-addressed store of GraphQL responses.
+
+    Responses are keyed by the normalized document plus its variables, kept
+    as zlib compressed JSON in a sqlite file, expire after the TTL of their
+    query type and are evicted least recently used first once the file
+    grows past max_bytes. With read=False the cache is only written, which
+    is what --refresh wants.
+
+    A rerun is not free. A crawl resumes after the stored endCursor of its
+    last page, a request no earlier run made, so that page is always
+    fetched. Repository info is refetched once its 10 minute TTL is over.
+    The cache saves the pages and lookups a rerun repeats, not every call.
+    """
+
+    def __init__(self, path=None, max_bytes: int = MAX_CACHE_BYTES, ttls: dict = TTLS, read: bool = True):
+        if path is None:
+            path = Path(xdg.BaseDirectory.save_cache_path("forksearch")) / "responses.sqlite"
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.read = read
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                kind TEXT,
+                stored REAL,
+                accessed REAL,
+                size INTEGER,
+                body BLOB
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, document, variables=None):
+        if not self.read:
+            return None
+        key = cache_key(document, variables)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT kind, stored, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            kind, stored, body = row
+            if now - stored > self.ttls.get(kind, self.ttls["default"]):
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(zlib.decompress(body))
+
+    def put(self, document, variables, response):
+        body = zlib.compress(json.dumps(response, separators=(",", ":")).encode())
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(document, variables), query_kind(document), now, now, len(body), body),
+            )
+            self.conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
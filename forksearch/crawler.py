@@ -0,0 +1,322 @@
+"""
+Asyncio crawl engine for the watchers, forks and stargazers of a repository
+"""
+import time
+import asyncio
+from gh_utils import *
+from adaptive import PageSize, MAX_PAGE_SIZE
+from profiles import PROFILES, DEFAULT_PROFILE
+
+# connection -> db_info key of its stored cursor
+CONNECTIONS = {
+    'watchers': 'watcher_cursor',
+    'forks': 'fork_cursor',
+    'stargazers': 'stargazer_cursor',
+}
+# connection -> db_info key of the newest starredAt/createdAt crawled, the
+# high-water mark a delta crawl stops at
+HIGH_WATER_MARKS = {
+    'stargazers': 'stargazer_hwm',
+    'forks': 'fork_hwm',
+}
+DEFAULT_PAGE_SIZES = {'watchers': 100, 'forks': 100, 'stargazers': 100}
+# fetched pages waiting for a writer; the fetcher waits once it is full
+DEFAULT_QUEUE_SIZE = 8
+# workers writing pages to neo4j, and pages each one merges into a batch
+DEFAULT_WRITERS = 2
+DEFAULT_COALESCE = 4
+
+
+def init_connections(db_info: dict, delta: bool = False, profile: str = DEFAULT_PROFILE):
+    """Pagination state of every connection, resumed from db_info cursors.
+
+    In a delta crawl the connections with a high-water mark start over from
+    their newest node instead, and stop at the mark. Connections outside the
+    crawl profile start out finished.
+    """
+    connections = {}
+    for field, cursor_key in CONNECTIONS.items():
+        hwm_key = HIGH_WATER_MARKS.get(field)
+        connections[field] = {
+            'cursor': None if delta and hwm_key else db_info[cursor_key],
+            'has_next_page': field in PROFILES[profile].connections,
+            'mark': db_info.get(hwm_key),
+            'hwm': db_info.get(hwm_key),
+        }
+    return connections
+
+
+def active_connections(connections: dict):
+    return {field: state for field, state in connections.items() if state['has_next_page']}
+
+
+def filter_data(data):
+    fields=['watchers', 'forks', 'stargazers']
+    for field in fields:
+        if field not in data:
+            continue
+        if(data[field]['nodes'] == None):
+            data[field]['nodes']=[]
+        else:
+            data[field]['nodes']=list(filter(None, data[field]['nodes']))
+        continue
+    return data
+
+
+def stamps(field: str, page: dict):
+    """starredAt/createdAt of every node of a page, in order; None where unknown"""
+    nodes = page['nodes'] or []
+    if field == 'stargazers':
+        edges = page.get('edges') or []
+        return [(edges[i] or {}).get('starredAt') if i < len(edges) else None for i in range(len(nodes))]
+    if field == 'forks':
+        return [node and node.get('createdAt') for node in nodes]
+    return [None] * len(nodes)
+
+
+def cut_at_mark(page: dict, page_stamps, mark: str):
+    """Drop the nodes of a newest first page older than mark.
+
+    Returns True if any were dropped, the connection has nothing newer left.
+    Nodes stamped at the mark itself are kept, merging them again is free.
+    """
+    if mark is None:
+        return False
+    for i, stamp in enumerate(page_stamps):
+        if stamp is not None and stamp < mark:
+            page['nodes'] = page['nodes'][:i]
+            if 'edges' in page:
+                page['edges'] = page['edges'][:i]
+            return True
+    return False
+
+
+def merge_pages(pages):
+    """One add_all_edges batch with the nodes of pages, but none of their cursors"""
+    batch = {'id': pages[0]['id']}
+    for field in CONNECTIONS:
+        batch[field] = {'nodes': [node for page in pages if field in page for node in page[field]['nodes'] or []]}
+    return batch
+
+
+class Checkpoint:
+    """Stores the cursors of written pages in page order.
+
+    Writers commit their batches in whatever order they finish. The cursor
+    of a page is stored only once its edges and those of every page before
+    it are committed, so an interrupted crawl never resumes past a page that
+    is not in the database; at worst it fetches a few pages again.
+    """
+
+    def __init__(self, db, id: str, counts: dict):
+        self.db = db
+        self.id = id
+        self.counts = counts
+        self.next_seq = 0
+        self.written = {}
+        self.lock = asyncio.Lock()
+
+    async def commit(self, pages, edges: int):
+        """pages, a list of (seq, data, cursors), have their edges in the database"""
+        async with self.lock:
+            for seq, data, cursors in pages:
+                self.written[seq] = cursors
+                for field in self.counts:
+                    if field in data:
+                        self.counts[field] += len(data[field]['nodes'] or [])
+            cursors = {}
+            while self.next_seq in self.written:
+                cursors.update(self.written.pop(self.next_seq))
+                self.next_seq += 1
+            if cursors:
+                # still under the lock, so cursors are stored in order too
+                await asyncio.to_thread(self.db.update_cursors, self.id, cursors)
+
+            # print count of watchers/forks/stargazers
+            counts = self.counts
+            print(f"Watchers: {counts['watchers']}, Forks: {counts['forks']}, Stargazers: {counts['stargazers']} ({edges} edges added)")
+
+
+class Crawler:
+    """Crawl a repository, fetching and writing at the same time.
+
+    Pages of one connection are chained by their cursor, so they are fetched
+    one after another. What runs in parallel is everything around that chain:
+    the next page is requested while the current one is queued and written.
+    Patch dates are not looked up here, query_unpatched_orgs evaluates them
+    once a patch date is known.
+
+    Writing is a separate stage: fetched pages go into a bounded queue that
+    writer workers drain, merging the pages waiting there into one batch,
+    while the fetcher goes on with the next page. A full queue holds the
+    fetcher back until neo4j catches up. Cursors are stored by a Checkpoint
+    after the edges are committed, so an interrupted crawl resumes where it
+    stopped.
+    """
+
+    def __init__(self, endpoint, db, wait_for_ratelimiter: bool = False,
+                 page_sizes: dict = DEFAULT_PAGE_SIZES, writers: int = DEFAULT_WRITERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, coalesce: int = DEFAULT_COALESCE, profile: str = DEFAULT_PROFILE):
+        self.endpoint = endpoint
+        self.db = db
+        # every connection finds its own largest page Github serves in time
+        self.page_sizes = {field: PageSize(page_sizes.get(field, MAX_PAGE_SIZE)) for field in CONNECTIONS}
+        self.wait_for_ratelimiter = wait_for_ratelimiter
+        self.writers = max(1, writers)
+        self.queue_size = max(1, queue_size)
+        self.coalesce = max(1, coalesce)
+        self.profile = PROFILES[profile].name
+
+    async def fetch_page(self, owner: str, name: str, connections: dict, newest_first: tuple = (), use_cache: bool = True):
+        """Fetch the next page of every connection in connections.
+
+        Connections that already reported their last page are not part of
+        connections, so they cost nothing in the document. When Github times
+        out, the page sizes of the connections are halved and the page is
+        requested again; fast, cheap pages grow them back. Without use_cache
+        the page is not read from the response cache.
+        """
+        op = crawl_page_query(
+            tuple(sorted(connections)), tuple(f for f in newest_first if f in connections), self.profile,
+        )
+        while True:
+            variables = crawl_page_variables(owner, name, {
+                field: (int(self.page_sizes[field]), state['cursor']) for field, state in connections.items()
+            })
+
+            start = time.monotonic()
+            try:
+                # the endpoint is blocking, run it in a thread
+                p = await asyncio.to_thread(query_with_retry, self.endpoint, op, 2, self.wait_for_ratelimiter, True, variables, use_cache)
+                break
+            except QueryTimeout:
+                shrunk = [self.page_sizes[field].shrink() for field in connections]
+                if not any(shrunk):
+                    # nothing left to shrink, fall back to plain retries
+                    p = await asyncio.to_thread(query_with_retry, self.endpoint, op, 2, self.wait_for_ratelimiter, False, variables, use_cache)
+                    break
+
+        latency = time.monotonic() - start
+        for field in connections:
+            self.page_sizes[field].observe(latency, query_cost(p))
+        return p['data']['repository']
+
+    def write_page(self, data):
+        try:
+            return self.db.add_all_edges(data)
+        except:
+            return self.db.add_all_edges(filter_data(data))
+
+    async def produce(self, owner: str, name: str, connections: dict, queue: asyncio.Queue, delta: bool = False):
+        """Fetch the pages of connections in order and queue them for the writers.
+
+        In a delta crawl the connections with a high-water mark come newest
+        first and end at the first node older than their mark. Their
+        cursors are not stored, and neither is their new mark until the
+        whole crawl is written (see crawl). Nor are their pages read from the
+        response cache: the first page of a delta crawl is the same document
+        every time, and a cached one would hide the nodes added since.
+        """
+        seq = 0
+        newest_first = tuple(sorted(HIGH_WATER_MARKS)) if delta else ()
+        next_page = asyncio.create_task(self.fetch_page(owner, name, active_connections(connections), newest_first, not delta))
+        try:
+            while next_page:
+                data = await next_page
+                next_page = None
+
+                # the cursors of the next page are known as soon as this one
+                # arrives, so request it while this page is being processed.
+                # Finished connections drop out of the next document.
+                cursors = {}
+                for field, cursor_key in CONNECTIONS.items():
+                    if field not in data:
+                        continue
+                    state = connections[field]
+                    state['has_next_page'] = data[field]['pageInfo']['hasNextPage']
+                    page_stamps = stamps(field, data[field])
+                    if field in newest_first and cut_at_mark(data[field], page_stamps, state['mark']):
+                        state['has_next_page'] = False
+                    if data[field]['nodes']:
+                        state['cursor'] = data[field]['pageInfo']['endCursor']
+                        if field not in newest_first:
+                            cursors[cursor_key] = state['cursor']
+                    newest = max([s for s in page_stamps if s] + [state['hwm'] or ''])
+                    if newest and field in HIGH_WATER_MARKS:
+                        state['hwm'] = newest
+                        if field not in newest_first:
+                            cursors[HIGH_WATER_MARKS[field]] = newest
+                remaining = active_connections(connections)
+                if remaining:
+                    next_page = asyncio.create_task(self.fetch_page(
+                        owner, name, {field: dict(state) for field, state in remaining.items()}, newest_first, not delta,
+                    ))
+
+                # waits while the writers are queue_size pages behind
+                await queue.put((seq, data, cursors))
+                seq += 1
+        finally:
+            if next_page:
+                next_page.cancel()
+        for _ in range(self.writers):
+            await queue.put(None)
+
+    async def write(self, queue: asyncio.Queue, checkpoint: Checkpoint):
+        """Write queued pages, merging up to coalesce of them per batch, until None"""
+        while True:
+            page = await queue.get()
+            if page is None:
+                return
+            pages = [page]
+            while len(pages) < self.coalesce and not queue.empty():
+                page = queue.get_nowait()
+                if page is None:
+                    break
+                pages.append(page)
+            result = await asyncio.to_thread(self.write_page, merge_pages([data for _, data, _ in pages]))
+            await checkpoint.commit(pages, len(result))
+            if page is None:
+                return
+
+    async def crawl(self, owner: str, name: str, db_info: dict, id: str, pushedAt: str = None, delta: bool = False):
+        """Crawl the watchers, forks and stargazers of a repository, returns their counts.
+
+        With delta, only the stargazers and forks newer than the high-water
+        marks of the last crawl are fetched; see produce.
+        """
+        # initialize watchers/forks/stargazers counts
+        counts = {
+            'watchers': db_info['watchers'],
+            'forks': db_info['forks'],
+            'stargazers': db_info['stargazers'],
+        }
+
+        # initialize cursors from db_info
+        connections = init_connections(db_info, delta, self.profile)
+        if db_info['pushedAt'] == None:
+            await asyncio.to_thread(self.db.update_pushedAt, id, pushedAt)
+
+        queue = asyncio.Queue(self.queue_size)
+        checkpoint = Checkpoint(self.db, id, counts)
+        stages = [asyncio.create_task(self.produce(owner, name, connections, queue, delta))]
+        stages += [asyncio.create_task(self.write(queue, checkpoint)) for _ in range(self.writers)]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # a failing stage cancels the others, which would otherwise wait
+            # on the queue forever (asyncio.TaskGroup needs python 3.11)
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+
+        if delta:
+            # everything newer than the marks is written now, so moving them
+            # cannot skip a node if the next delta crawl is interrupted
+            marks = {
+                hwm_key: connections[field]['hwm'] for field, hwm_key in HIGH_WATER_MARKS.items()
+                if connections[field]['hwm'] != connections[field]['mark']
+            }
+            if marks:
+                await asyncio.to_thread(self.db.update_cursors, id, marks)
+        return counts
@@ -1,7 +1,102 @@
+import datetime
 from .queries import *
 
-from neo4j import GraphDatabase
-from neo4j.time import DateTime
+# nodes DETACH DELETEd per transaction when deleting a repository, and
+# transactions per statement (progress is reported between statements)
+DELETE_CHUNK_SIZE = 1000
+DELETE_CHUNKS_PER_STATEMENT = 10
+
+# page field -> (relationship, repository property of its cursor)
+EDGES = {
+    'stargazers': (STAR, 'stargazer_cursor'),
+    'watchers': (WATCH, 'watcher_cursor'),
+    'forks': (FORK, 'fork_cursor'),
+}
+# fork fields stored on its Repository node
+FORK_PROPERTIES = ('isFork', 'name', 'url', 'pushedAt', 'createdAt')
+# rows per page of the streamed reads (get_forks_info and co.), each page is
+# one read transaction
+FETCH_SIZE = 1000
+
+
+def to_datetime(value):
+    """A Github ISO 8601 date as a timezone aware datetime, which neo4j stores as a DateTime"""
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    from dateutil import parser
+    date = parser.isoparse(value)
+    return date if date.tzinfo else date.replace(tzinfo=datetime.timezone.utc)
+
+
+def from_datetime(value):
+    """A stored DateTime formatted the way Github formats dates"""
+    if value is None or isinstance(value, str):
+        return value
+    if hasattr(value, 'to_native'):
+        value = value.to_native()
+    return value.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def convert_dates(row, convert):
+    """row with convert applied to its DATE_PROPERTIES"""
+    return {key: convert(value) if key in DATE_PROPERTIES else value for key, value in row.items()}
+
+
+def head_oid(node):
+    """oid at the head of the default branch of a Repository node, None if empty or not selected"""
+    ref = node.get('defaultBranchRef') or {}
+    return (ref.get('target') or {}).get('oid')
+
+
+def fork_row(node):
+    """A fork as merge_fork_edges takes it.
+
+    Fields the crawl profile did not select are missing from the properties
+    rather than null, because SET += removes properties set to null. A
+    sparse row never erases what a fuller crawl stored.
+    """
+    properties = convert_dates({key: node[key] for key in FORK_PROPERTIES if node.get(key) is not None}, to_datetime)
+    properties['login'] = node['owner']['login']
+    head = head_oid(node)
+    if head:
+        properties['head_oid'] = head
+    return {'id': node['id'], 'owner': node['owner'], 'properties': properties}
+
+
+def edge_statements(nodes):
+    """Split a page into (query, rows) pairs, one per relationship and owner label.
+
+    Rows are grouped by the __typename of the owner, so every statement is
+    a plain UNWIND ... MERGE with a static label. Null nodes, which Github
+    returns for some deleted accounts, are dropped, and so are repeated
+    nodes, which the counters of the statements would count twice.
+    """
+    groups = {}
+    for field, (edge, _) in EDGES.items():
+        for node in (nodes.get(field) or {}).get('nodes') or []:
+            if not node:
+                continue
+            if field == 'forks':
+                label, key, row = node['owner']['__typename'], node['id'], fork_row(node)
+            else:
+                label, key, row = node['__typename'], node['login'], node
+            groups.setdefault((edge, label), {}).setdefault(key, row)
+    return [
+        (merge_fork_edges(label) if edge == FORK else merge_owner_edges(label, edge), list(rows.values()))
+        for (edge, label), rows in groups.items()
+    ]
+
+
+def page_cursors(nodes):
+    """Cursors to store for a page that comes with its pageInfo"""
+    cursors = {}
+    for field, (_, cursor_key) in EDGES.items():
+        page = nodes.get(field) or {}
+        cursor = (page.get('pageInfo') or {}).get('endCursor')
+        if cursor and page.get('nodes'):
+            cursors[cursor_key] = cursor
+    return cursors
+
 
 class GitDB:
     DEFAULT_REPO_INFO = {
@@ -11,14 +106,19 @@ class GitDB:
         'stargazer_cursor': None,
         'watcher_cursor': None,
         'fork_cursor': None,
+        'stargazer_hwm': None,
+        'fork_hwm': None,
     }
 
-    def __init__(self, host, port, user, pwd, db = 'neo4j') -> None:
+    def __init__(self, host, port, user, pwd, db = 'neo4j', fetch_size = FETCH_SIZE) -> None:
+        # the driver takes a while to import, only pay for it when connecting
+        from neo4j import GraphDatabase
         self.driver = GraphDatabase.driver(
             uri=f'bolt://{host}:{port}',
             auth=(user, pwd),
         )
         self.db = db
+        self.fetch_size = fetch_size
 
         # create uniqueness constraints
         ## indexes created when constraints are created
@@ -26,6 +126,11 @@ class GitDB:
         def uniquenesses(tx):
             tx.run(CREATE_OWNER_UNIQUENESS)
             tx.run(CREATE_REPO_UNIQUENESS)
+            tx.run(CREATE_REPO_NETWORK_INDEX)
+            tx.run(CREATE_REPO_DELETING_INDEX)
+            tx.run(CREATE_REPO_PUSHED_AT_INDEX)
+            tx.run(CREATE_REPO_PATCH_DATE_INDEX)
+            tx.run(CREATE_REPO_FORK_COUNT_INDEX)
 
         self._write(uniquenesses)
 
@@ -45,19 +150,44 @@ class GitDB:
             results = session.execute_write(func)
         return results
 
+    def _run(self, query, **params):
+        # auto-commit transaction, which CALL { } IN TRANSACTIONS needs
+        with self.driver.session(database=self.db) as session:
+            return session.run(query, **params).data()
+
     def _read(self, func):
         with self.driver.session(database=self.db) as session:
             results = session.execute_read(func)
         return results
 
+    def _stream(self, query, cursor, limit=None, fetch_size=None, **params):
+        """Rows of a keyset paginated query, read fetch_size at a time.
+
+        query takes $after and $limit (see GET_FORKS); cursor turns the
+        last row of a page into the $after of the next one. Every page is a read transaction
+        of its own and is dropped once consumed, so memory does not grow
+        with the size of the result. limit caps the rows yielded.
+        """
+        fetch_size = fetch_size or self.fetch_size
+        after = None
+        while limit is None or limit > 0:
+            size = fetch_size if limit is None else min(fetch_size, limit)
+            rows = self._read(lambda tx: tx.run(query, after = after, limit = size, **params).data())
+            yield from rows
+            if len(rows) < size:
+                return
+            after = cursor(rows[-1])
+            if limit is not None:
+                limit -= len(rows)
+
     def add_user(self, login, properties):
+        from neo4j.time import DateTime
         # warn: be careful! this will actually modify the original dictionary
         label = properties.pop('__typename')
 
         result = self._write(
             lambda tx: tx.run(
-                CREATE_OWNER,
-                label = label,
+                create_owner(label),
                 properties = {'login': login},
                 on_create = {**properties, 'created': DateTime.now()},
                 on_merge = {**properties, 'lastSeen': DateTime.now()},
@@ -67,38 +197,30 @@ class GitDB:
         return result
 
     def add_all_edges(self, nodes):
-        # try:
-        # print(list(nodes))
-            # print(d)
-        result = self._write(
-                lambda tx: tx.run(
-                    ADD_ALL_EDGES,
-                    nodes = nodes,
-                ).data()
-        )
-        # for node in nodes:
-        #     print (node)
-        #     try:
-        #         result = self._write(
-        #             lambda tx: tx.run(
-        #                 ADD_ALL_EDGES,
-        #                 nodes = [node],
-        #             ).data()
-        #         )
-        #     except Exception as e:
-        #         print(e)
-        #         print("Error adding edges: Node: {},".format(node))
-        #         return None
+        """Merge the stargazers, watchers and forks of a page in one transaction.
+
+        Cursors are stored too if the page has its pageInfo.
+        """
+        statements = edge_statements(nodes)
+        cursors = page_cursors(nodes)
+
+        def work(tx):
+            result = []
+            for query, rows in statements:
+                result += tx.run(query, id = nodes['id'], rows = rows).data()
+            if cursors:
+                tx.run(UPDATE_CURSORS, id = nodes['id'], cursors = cursors)
+            return result
 
+        result = self._write(work)
         return result
 
     def get_repo_info(self, id, login, owner, repo_properties):
         result = self._write(
             lambda tx: tx.run(
-                GET_COUNTS,
+                get_counts(owner['__typename']),
                 id = id,
                 login = login,
-                label = owner['__typename'],
                 properties = {'login': owner['login']},
                 on_create = owner,
                 on_merge = owner,
@@ -109,65 +231,112 @@ class GitDB:
         # check if result is empty
         if not result:
             return self.DEFAULT_REPO_INFO
-        return result[0]
+        return convert_dates(result[0], from_datetime)
     
     def update_pushedAt(self, id, pushedAt):
         self._write(
             lambda tx: tx.run(
                 UPDATE_PUSHED_AT,
                 id = id,
-                pushedAt = pushedAt,
+                pushedAt = to_datetime(pushedAt),
             ).data()
         )
-    def get_organizations_info(self, id, limit):
-        result = self._write(
+
+    def update_cursors(self, id, cursors):
+        self._write(
             lambda tx: tx.run(
-                GET_TOP_ORGANIZATIONS,
+                UPDATE_CURSORS,
                 id = id,
-                limit = limit
+                cursors = cursors,
             ).data()
         )
 
-        # # check if result is empty
-        # print("DEBUG: result is" + str(result))
-        if not result:
-            return self.DEFAULT_REPO_INFO
-        return result
-    
-    def get_forks_info(self, id,limit=1000):
-        result = self._write(
-            lambda tx: tx.run(
-                GET_FORKS,
-                id = id,
-                limit=limit
-            ).data()
+    def get_organizations_info(self, id, limit=None, fetch_size=None):
+        """Forks of id by their own number of forks, most forked first: {'org', 'forkcount'}"""
+        return self._stream(
+            GET_TOP_ORGANIZATIONS,
+            lambda row: {'forkcount': row['forkcount'], 'id': row['org']['id']},
+            limit, fetch_size, id = id,
         )
 
-        # # check if result is empty
-        # print("DEBUG: result is" + str(result))
-        return result
-    def get_orgs_forks_info(self, id,limit=1000):
-        result = self._write(
-            lambda tx: tx.run(
-                GET_ORGS_FORKS,
-                id = id,
-                limit=limit
-            ).data()
+    def get_forks_info(self, id, limit=None, fetch_size=None):
+        """Forks of id in the order of their ids: {'fork', 'login'}"""
+        for row in self._stream(GET_FORKS, lambda row: row['fork']['id'], limit, fetch_size, id = id):
+            yield dict(row, fork = convert_dates(row['fork'], from_datetime))
+
+    def get_forks_pushed_at(self, id):
+        rows = self._read(lambda tx: tx.run(GET_FORKS_PUSHED_AT, id = id).data())
+        return [convert_dates(row, from_datetime) for row in rows]
+
+    def update_forks(self, rows):
+        rows = [convert_dates(row, to_datetime) for row in rows]
+        self._write(lambda tx: tx.run(UPDATE_FORKS, rows = rows).consume())
+
+    def get_patch_candidates(self, id, patch_date):
+        """Forks of id evaluate_patches has to look up for a patch of patch_date"""
+        rows = self._read(lambda tx: tx.run(GET_PATCH_CANDIDATES, id = id, patch_date = to_datetime(patch_date)).data())
+        return [convert_dates(row, from_datetime) for row in rows]
+
+    def get_unpatched(self, id, patch_date=None, patched=None):
+        """Unpatched forks and organizations of id, see GET_UNPATCHED"""
+        return self._read(
+            lambda tx: tx.run(GET_UNPATCHED, id = id, patch_date = to_datetime(patch_date), patched = patched).single().data()
         )
 
-        # # check if result is empty
-        # print("DEBUG: result is" + str(result))
-        return result
-    
-    def delete_repo_info(self, owner, name):
-        result = self._write(
+    def migrate_dates(self):
+        """Store the dates kept as strings as DateTime. Returns the number of repositories changed."""
+        return self._run(MIGRATE_DATES)[0]['repos']
+
+    def get_orgs_forks_info(self, id, limit=None, fetch_size=None):
+        """Forks of id owned by organizations in the order of their ids: {'fork', 'org_login'}"""
+        for row in self._stream(GET_ORGS_FORKS, lambda row: row['fork']['id'], limit, fetch_size, id = id):
+            yield dict(row, fork = convert_dates(row['fork'], from_datetime))
+
+    def repair_counts(self, id=None):
+        """Recount the counters of repository id (or of all of them) from its edges.
+
+        Returns the repositories whose counters were off, with the stored
+        and the actual counts.
+        """
+        return self._write(
             lambda tx: tx.run(
-                DELETE_REPO,
-                login = owner,
-                name = name
+                REPAIR_COUNTS,
+                id = id,
             ).data()
         )
 
-        # # check if result is empty
-        # print("DEBUG: result is" + str(result))
-        return result
+    def repair_network(self):
+        """Label the fork network of every repository from scratch. Returns the number of forks."""
+        return self._write(lambda tx: tx.run(REPAIR_NETWORK).single()['forks'])
+
+    def delete_repo_info(self, owner, name, chunk_size=DELETE_CHUNK_SIZE, progress=None):
+        """Delete a repository, its forks and the owners left without edges. Returns the number of nodes deleted."""
+        found = self._read(lambda tx: tx.run(FIND_REPO, login = owner, name = name).data())
+        return sum(self.delete_repo(row['id'], chunk_size, progress) for row in found)
+
+    def pending_deletions(self):
+        """Ids of repositories whose deletion was interrupted"""
+        return [row['id'] for row in self._read(lambda tx: tx.run(PENDING_DELETIONS).data())]
+
+    def delete_repo(self, id, chunk_size=DELETE_CHUNK_SIZE, progress=None):
+        """Delete repository id, the forks under it and the owners with edges to nothing else.
+
+        The repository is marked first, and the nodes to delete are
+        collected once and deleted chunk_size per transaction, so neither
+        the heap nor the transaction log has to hold the whole network. If
+        the deletion stops half way the marked repository is still there
+        and pending_deletions() finds it. progress(deleted, total) is called
+        after every statement.
+        """
+        progress = progress or (lambda deleted, total: print(f"Deleted {deleted}/{total} nodes"))
+        self._write(lambda tx: tx.run(MARK_DELETING, id = id).consume())
+        left = self._read(lambda tx: tx.run(COLLECT_DELETION, id = id).single())
+        if left is None:
+            return 0
+        # owners first, then forks, then the marked repository
+        ids = left['owners'] + left['forks'] + [left['repo']]
+        step = chunk_size * DELETE_CHUNKS_PER_STATEMENT
+        for start in range(0, len(ids), step):
+            self._run(delete_nodes(chunk_size), ids = ids[start:start + step])
+            progress(min(start + step, len(ids)), len(ids))
+        return len(ids)
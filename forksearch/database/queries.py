@@ -10,6 +10,15 @@ FORK = 'FORK'
 STAR = 'STAR'
 WATCH = 'WATCH'
 
+# note: counters kept on Repository nodes by the edge statements below
+COUNTERS = {
+    STAR: 'star_count',
+    WATCH: 'watch_count',
+    FORK: 'fork_count',
+}
+## forks of forks included
+NETWORK_FORK_COUNT = 'network_fork_count'
+
 # note: constraints
 drop_constraint = lambda name: f'DROP CONSTRAINT {name} IF EXISTS'
 create_unique_constraint = lambda name, label, property: f'''
@@ -26,16 +35,46 @@ ON (n.{property})
 CREATE_OWNER_UNIQUENESS = create_unique_constraint('owner_uniqueness', OWNER, 'login')
 CREATE_REPO_UNIQUENESS = create_unique_constraint('repo_uniqueness', REPOSITORY, 'id')
 DROP_OWNER_UNIQUENESS = drop_constraint('owner_uniqueness')
+## every Repository knows its fork network: network_root is the id of the
+## repository at the top, ancestry the ids from there down to its parent and
+## fork_depth the length of ancestry. A whole network or subtree is then an
+## index lookup on network_root instead of a FORK* expansion.
+CREATE_REPO_NETWORK_INDEX = create_index('repo_network_root', REPOSITORY, 'network_root')
+## set on a repository while it and its forks are being deleted
+CREATE_REPO_DELETING_INDEX = create_index('repo_deleting', REPOSITORY, 'deleting')
+## Repository dates are native DateTime values, compared and range scanned
+## in the database (see db.to_datetime)
+DATE_PROPERTIES = ('pushedAt', 'createdAt', 'patch_date', 'patch_checked')
+CREATE_REPO_PUSHED_AT_INDEX = create_index('repo_pushed_at', REPOSITORY, 'pushedAt')
+CREATE_REPO_PATCH_DATE_INDEX = create_index('repo_patch_date', REPOSITORY, 'patch_date')
+## forks are ranked by their stored fork count (GET_TOP_ORGANIZATIONS), which
+## every repository starts at 0 (older databases: --repair-counts)
+CREATE_REPO_FORK_COUNT_INDEX = create_index('repo_fork_count', REPOSITORY, COUNTERS[FORK])
 
 # note: insert nodes
-CREATE_OWNER = f'call apoc.merge.node(["{OWNER}", $label], $properties, $on_create, $on_merge) yield node as owner'
-CREATE_REPOSITORY_WITHOUT_RET = f'''
-{CREATE_OWNER}
-MERGE (repo:{REPOSITORY} {{id: $id}})<-[:{OWN}]-(owner)
+## labels can't be parameters, so statements that set the label of an owner
+## (its Github __typename) are built per label. Owners are merged on
+## Owner.login alone, which is what the uniqueness constraint indexes.
+def owner_label(label):
+    if not str(label).isidentifier():
+        raise ValueError(f'Not a label: {label!r}')
+    return label
+
+create_owner = lambda label: f'''
+MERGE (owner:{OWNER} {{login: $properties.login}})
+ON CREATE SET owner += $on_create
+ON MATCH SET owner += $on_merge
+SET owner:{owner_label(label)}
+'''
+create_repository_without_ret = lambda label: f'''
+{create_owner(label)}
+MERGE (repo:{REPOSITORY} {{id: $id}})
+ON CREATE SET repo.network_root = repo.id, repo.ancestry = [], repo.fork_depth = 0, repo.{COUNTERS[FORK]} = 0
+MERGE (repo)<-[:{OWN}]-(owner)
 SET repo += $repo_properties
 '''
-CREATE_REPOSITORY = f'''
-{CREATE_REPOSITORY_WITHOUT_RET}
+create_repository = lambda label: f'''
+{create_repository_without_ret(label)}
 return repo.id as id
 '''
 
@@ -64,77 +103,298 @@ return repo.id as id
 # return owner.name, repo.name
 # '''
 
-ADD_ALL_EDGES = f'''
-WITH $nodes as batch
-MATCH (parent:{REPOSITORY} {{id: $nodes.id}})
-WITH $nodes.stargazers.pageInfo.endCursor as starCursor,
-    $nodes.watchers.pageInfo.endCursor as watchCursor,
-    $nodes.forks.pageInfo.endCursor as forkCursor,
-    $nodes.stargazers.nodes as stargazers,
-    $nodes.watchers.nodes as watchers,
-    $nodes.forks.nodes as forks,
-    parent
-SET parent.stargazer_cursor = (CASE WHEN starCursor IS NULL OR isEmpty(stargazers) THEN parent.stargazer_cursor ELSE starCursor END),
-    parent.watcher_cursor = (CASE WHEN watchCursor IS NULL OR isEmpty(watchers) THEN parent.watcher_cursor ELSE watchCursor END),
-    parent.fork_cursor = (CASE WHEN forkCursor IS NULL OR isEmpty(forks) THEN parent.fork_cursor ELSE forkCursor END)
-WITH parent, stargazers, watchers, forks
+# note: bulk edges, one UNWIND for every owner label and relationship type
+## edges that did not exist yet are added to the counters of the parent
+## (and for forks, of its ancestors). Rows must be unique.
+## $rows are the stargazers/watchers of one label, straight from Github
+merge_owner_edges = lambda label, edge: f'''
+MATCH (parent:{REPOSITORY} {{id: $id}})
+UNWIND $rows AS user
+MERGE (owner:{OWNER} {{login: user.login}})
+SET owner:{owner_label(label)}, owner += user
+WITH parent, owner, EXISTS {{ (parent)<-[:{edge}]-(owner) }} AS known
+MERGE (parent)<-[:{edge}]-(owner)
+WITH parent, collect(owner.login) AS result, sum(CASE WHEN known THEN 0 ELSE 1 END) AS created
+SET parent.{COUNTERS[edge]} = coalesce(parent.{COUNTERS[edge]}, 0) + created
+UNWIND result AS login
+return login AS result
+'''
+## $rows are forks whose owners have label, {id, owner, properties} (see
+## db.fork_row). A fork takes the network of
+## its parent; one that was crawled before with forks of its own moves them
+## into that network too. A new fork adds itself and the forks already
+## under it to the network count of every ancestor
+merge_fork_edges = lambda label: f'''
+MATCH (parent:{REPOSITORY} {{id: $id}})
+WITH parent, coalesce(parent.ancestry, []) + parent.id AS ancestry
+UNWIND $rows AS fork
+MERGE (owner:{OWNER} {{login: fork.owner.login}})
+SET owner:{owner_label(label)}, owner += fork.owner
+MERGE (repo:{REPOSITORY} {{id: fork.id}})
+ON CREATE SET repo.{COUNTERS[FORK]} = 0
+SET repo += fork.properties
+MERGE (repo)<-[:{OWN}]-(owner)
+WITH parent, ancestry, owner, repo, EXISTS {{ (parent)<-[:{FORK}]-(repo) }} AS known,
+    coalesce(repo.network_root, repo.id) AS old_root
+MERGE (parent)<-[:{FORK}]-(repo)
+SET repo.network_root = ancestry[0], repo.ancestry = ancestry, repo.fork_depth = size(ancestry)
+WITH parent, ancestry, owner, repo, known, old_root
 CALL {{
-    WITH parent, stargazers
-    UNWIND stargazers AS user
-    call apoc.merge.node(["{OWNER}", user.__typename], {{login: user.login}}, user, user) yield node as stargazer
-    MERGE (parent) <-[:{STAR}]- (stargazer)
-    return stargazer.login as result
-UNION all
-    WITH parent, watchers
-    UNWIND watchers AS user
-    call apoc.merge.node(["{OWNER}", user.__typename], {{login: user.login}}, user, user) yield node as watcher
-    MERGE (parent) <-[:{WATCH}]- (watcher)
-    return watcher.login as result
-UNION all
-    WITH parent, forks
-    UNWIND forks as fork
-    call apoc.merge.node(["{OWNER}", fork.owner.__typename], {{login: fork.owner.login}}, fork.owner, fork.owner) yield node as owner
-    MERGE (repo:{REPOSITORY} {{id: fork.id}})<-[:{OWN}]-(owner)
-    SET repo += {{ isFork: fork.isFork, name: fork.name, url: fork.url, login: fork.owner.login, patch_date: fork.patch_date, pushedAt: fork.pushedAt}}
-    MERGE (repo)<-[:{OWN}]-(owner)
-    MERGE (parent)<-[:{FORK}]-(repo)
-    return owner.login as result
+    WITH repo, known, old_root
+    WITH repo, old_root WHERE NOT known AND coalesce(repo.{NETWORK_FORK_COUNT}, 0) > 0
+    MATCH (d:{REPOSITORY} {{network_root: old_root}}) WHERE repo.id IN d.ancestry
+    WITH repo, d, [i IN range(0, size(d.ancestry) - 1) WHERE d.ancestry[i] = repo.id][0] AS at
+    WITH repo, d, repo.ancestry + d.ancestry[at..] AS moved
+    SET d.network_root = moved[0], d.ancestry = moved, d.fork_depth = size(moved)
 }}
-return result
+WITH parent, ancestry, collect(owner.login) AS result,
+    sum(CASE WHEN known THEN 0 ELSE 1 END) AS created,
+    sum(CASE WHEN known THEN 0 ELSE 1 + coalesce(repo.{NETWORK_FORK_COUNT}, 0) END) AS network
+SET parent.{COUNTERS[FORK]} = coalesce(parent.{COUNTERS[FORK]}, 0) + created
+WITH ancestry, result, network
+CALL {{
+    WITH ancestry, network
+    MATCH (ancestor:{REPOSITORY}) WHERE ancestor.id IN ancestry
+    SET ancestor.{NETWORK_FORK_COUNT} = coalesce(ancestor.{NETWORK_FORK_COUNT}, 0) + network
+}}
+UNWIND result AS login
+return login AS result
+'''
+
+# cursors maps stargazer_cursor/watcher_cursor/fork_cursor to a cursor, and
+# stargazer_hwm/fork_hwm to the newest starredAt/createdAt seen
+UPDATE_CURSORS = f'''
+MATCH (repo:{REPOSITORY} {{id: $id}})
+SET repo += $cursors
 '''
 
+# ADD_ALL_EDGES = f'''
+# WITH $nodes as batch
+# MATCH (parent:{REPOSITORY} {{id: $nodes.id}})
+# WITH $nodes.stargazers.pageInfo.endCursor as starCursor,
+#     $nodes.watchers.pageInfo.endCursor as watchCursor,
+#     $nodes.forks.pageInfo.endCursor as forkCursor,
+#     $nodes.stargazers.nodes as stargazers,
+#     $nodes.watchers.nodes as watchers,
+#     $nodes.forks.nodes as forks,
+#     parent
+# SET parent.stargazer_cursor = (CASE WHEN starCursor IS NULL OR isEmpty(stargazers) THEN parent.stargazer_cursor ELSE starCursor END),
+#     parent.watcher_cursor = (CASE WHEN watchCursor IS NULL OR isEmpty(watchers) THEN parent.watcher_cursor ELSE watchCursor END),
+#     parent.fork_cursor = (CASE WHEN forkCursor IS NULL OR isEmpty(forks) THEN parent.fork_cursor ELSE forkCursor END)
+# WITH parent, stargazers, watchers, forks
+# CALL {{
+#     WITH parent, stargazers
+#     UNWIND stargazers AS user
+#     call apoc.merge.node(["{OWNER}", user.__typename], {{login: user.login}}, user, user) yield node as stargazer
+#     MERGE (parent) <-[:{STAR}]- (stargazer)
+#     return stargazer.login as result
+# UNION all
+#     WITH parent, watchers
+#     UNWIND watchers AS user
+#     call apoc.merge.node(["{OWNER}", user.__typename], {{login: user.login}}, user, user) yield node as watcher
+#     MERGE (parent) <-[:{WATCH}]- (watcher)
+#     return watcher.login as result
+# UNION all
+#     WITH parent, forks
+#     UNWIND forks as fork
+#     call apoc.merge.node(["{OWNER}", fork.owner.__typename], {{login: fork.owner.login}}, fork.owner, fork.owner) yield node as owner
+#     MERGE (repo:{REPOSITORY} {{id: fork.id}})<-[:{OWN}]-(owner)
+#     SET repo += {{ isFork: fork.isFork, name: fork.name, url: fork.url, login: fork.owner.login, patch_date: fork.patch_date, pushedAt: fork.pushedAt}}
+#     MERGE (repo)<-[:{OWN}]-(owner)
+#     MERGE (parent)<-[:{FORK}]-(repo)
+#     return owner.login as result
+# }}
+# return result
+# '''
+
 # read nodes/relationships
 # GET_FORK_COUNT = f'''
 # MATCH (:{OWNER} {{login: $login}})-[:{OWN}]->(:{REPOSITORY} {{name: $name}})<-[:{FORK}*]-(fork:{REPOSITORY})
 # return count(fork) as count
 # '''
-GET_COUNTS = f'''
-{CREATE_REPOSITORY_WITHOUT_RET}
-return COUNT {{ (repo)<-[:{STAR}]-() }} as stargazers,
-    COUNT {{ (repo)<-[:{WATCH}]-() }} as watchers,
-    COUNT {{ (repo)<-[:{FORK}*]-() }} as forks,
+get_counts = lambda label: f'''
+{create_repository_without_ret(label)}
+return coalesce(repo.{COUNTERS[STAR]}, 0) as stargazers,
+    coalesce(repo.{COUNTERS[WATCH]}, 0) as watchers,
+    coalesce(repo.{NETWORK_FORK_COUNT}, 0) as forks,
     repo.stargazer_cursor as stargazer_cursor,
     repo.watcher_cursor as watcher_cursor,
     repo.fork_cursor as fork_cursor,
+    repo.stargazer_hwm as stargazer_hwm,
+    repo.fork_hwm as fork_hwm,
     repo.name as name,
     repo.pushedAt as pushedAt
 '''
 
 
+## keyset paginated reads: every page starts after $after, the sort key of
+## the last row of the previous page (null for the first), and holds at most
+## $limit rows. See GitDB._stream
 GET_TOP_ORGANIZATIONS = f'''
-MATCH (organizations:{REPOSITORY})-[r:{FORK}]->(repo:{REPOSITORY} {{id: $id}}) RETURN organizations as org, COUNT  {{(organizations)<-[r2:{FORK}]-()}}  as forkcount ORDER BY forkcount DESC LIMIT $limit
+MATCH (organizations:{REPOSITORY})-[r:{FORK}]->(repo:{REPOSITORY} {{id: $id}})
+WITH organizations, organizations.{COUNTERS[FORK]} as forkcount
+WHERE forkcount IS NOT NULL AND ($after IS NULL OR forkcount < $after.forkcount
+    OR (forkcount = $after.forkcount AND organizations.id > $after.id))
+RETURN organizations as org, forkcount ORDER BY forkcount DESC, organizations.id LIMIT $limit
 '''
 
 
 GET_FORKS = f'''
-MATCH (forks:{REPOSITORY})-[r:{FORK}]->(repo:{REPOSITORY} {{id: $id}}) RETURN forks as fork, forks.login as login
+MATCH (forks:{REPOSITORY})-[r:{FORK}]->(repo:{REPOSITORY} {{id: $id}})
+WHERE $after IS NULL OR forks.id > $after
+RETURN forks as fork, forks.login as login ORDER BY forks.id LIMIT $limit
+'''
+GET_FORKS_PUSHED_AT = f'''
+MATCH (fork:{REPOSITORY})-[:{FORK}]->(repo:{REPOSITORY} {{id: $id}}) RETURN fork.id as id, fork.pushedAt as pushedAt
+'''
+## $rows are maps of a fork id and the properties to set on it: a new
+## pushedAt, or patch_date with patch_checked, the pushedAt it was found at
+UPDATE_FORKS = f'''
+UNWIND $rows AS row
+MATCH (fork:{REPOSITORY} {{id: row.id}})
+SET fork += row
+'''
+## forks of $id that may contain a patch of $patch_date and have no patch
+## date found at their current pushedAt, the ones evaluate_patches looks up
+GET_PATCH_CANDIDATES = f'''
+MATCH (fork:{REPOSITORY})-[:{FORK}]->(:{REPOSITORY} {{id: $id}})
+WHERE (fork.pushedAt IS NULL OR fork.pushedAt >= $patch_date)
+    AND NOT coalesce(fork.patch_checked = fork.pushedAt, false)
+RETURN fork.id AS id, fork.login AS login, fork.name AS name, fork.pushedAt AS pushedAt,
+    fork.patch_date AS patch_date, fork.patch_checked AS patch_checked, fork.head_oid AS head_oid
+'''
+## forks of $id without the patch, and the organizations owning them. With
+## $patched (ids of the forks found patched) every other fork is unpatched,
+## otherwise those not pushed to since $patch_date or whose last merge from
+## upstream is older. Returns the result sets and the totals only
+GET_UNPATCHED = f'''
+MATCH (fork:{REPOSITORY})-[:{FORK}]->(:{REPOSITORY} {{id: $id}})
+OPTIONAL MATCH (org:{ORGANIZATION})-[:{OWN}]->(fork)
+WITH fork, org, CASE
+    WHEN $patched IS NOT NULL THEN NOT fork.id IN $patched
+    ELSE coalesce(fork.pushedAt < $patch_date, false) OR NOT coalesce(fork.patch_date >= $patch_date, false)
+END AS unpatched
+RETURN count(fork) AS forks,
+    count(org) AS org_forks,
+    collect(CASE WHEN unpatched THEN fork.login + '/' + fork.name END) AS unpatched_forks,
+    count(CASE WHEN unpatched AND org IS NOT NULL THEN 1 END) AS unpatched_org_forks,
+    collect(DISTINCT CASE WHEN unpatched THEN org.login END) AS unpatched_orgs
+'''
+## dates stored as strings before they were native, 'None' for no date
+_MIGRATE_DATE = lambda key: f"""
+        repo.{key} = CASE WHEN NOT repo.{key} IS :: STRING THEN repo.{key}
+            WHEN repo.{key} = 'None' THEN null ELSE datetime(replace(repo.{key}, ' ', 'T')) END"""
+MIGRATE_DATES = f'''
+MATCH (repo:{REPOSITORY})
+WHERE {' OR '.join(f'repo.{key} IS :: STRING' for key in DATE_PROPERTIES)}
+CALL {{
+    WITH repo
+    SET {','.join(map(_MIGRATE_DATE, DATE_PROPERTIES))}
+}} IN TRANSACTIONS OF 10000 ROWS
+RETURN count(repo) AS repos
 '''
 GET_ORGS_FORKS = f'''
-MATCH (o:{ORGANIZATION})-[:{OWN}]->(forks:{REPOSITORY})-[r:{FORK}]->(repo:{REPOSITORY} {{id: $id}}) RETURN forks as fork, o.login as org_login
+MATCH (o:{ORGANIZATION})-[:{OWN}]->(forks:{REPOSITORY})-[r:{FORK}]->(repo:{REPOSITORY} {{id: $id}})
+WHERE $after IS NULL OR forks.id > $after
+RETURN forks as fork, o.login as org_login ORDER BY forks.id LIMIT $limit
+'''
+
+# recount the counters of repositories ($id, or all with $id null) from
+# their edges and return the ones that were off (-1 for never counted)
+REPAIR_COUNTS = f'''
+MATCH (repo:{REPOSITORY})
+WHERE $id IS NULL OR repo.id = $id
+WITH repo, {{
+    {COUNTERS[STAR]}: COUNT {{ (repo)<-[:{STAR}]-() }},
+    {COUNTERS[WATCH]}: COUNT {{ (repo)<-[:{WATCH}]-() }},
+    {COUNTERS[FORK]}: COUNT {{ (repo)<-[:{FORK}]-() }},
+    {NETWORK_FORK_COUNT}: COUNT {{ (repo)<-[:{FORK}*]-() }}
+}} AS counts
+WITH repo, counts, {{
+    {COUNTERS[STAR]}: coalesce(repo.{COUNTERS[STAR]}, -1),
+    {COUNTERS[WATCH]}: coalesce(repo.{COUNTERS[WATCH]}, -1),
+    {COUNTERS[FORK]}: coalesce(repo.{COUNTERS[FORK]}, -1),
+    {NETWORK_FORK_COUNT}: coalesce(repo.{NETWORK_FORK_COUNT}, -1)
+}} AS stored
+WHERE stored <> counts
+SET repo += counts
+return repo.id as id, repo.login as login, repo.name as name, stored, counts
+'''
+
+# note: deletion, in steps that can be resumed
+## find the repository to delete
+FIND_REPO = f'''
+MATCH (r:{REPOSITORY} {{name: $name}})<-[:OWN]-(:{OWNER} {{login: $login}})
+return r.id as id
+'''
+## repositories whose deletion did not finish
+PENDING_DELETIONS = f'''
+MATCH (r:{REPOSITORY}) WHERE r.deleting IS NOT NULL
+return r.id as id
+'''
+## mark a repository as being deleted and take it out of the counters of
+## its ancestors, once; returns false if it was already marked
+MARK_DELETING = f'''
+MATCH (r:{REPOSITORY} {{id: $id}})
+WITH r, r.deleting IS NULL AS first
+CALL {{
+    WITH r, first
+    WITH r WHERE first
+    SET r.deleting = datetime()
+    WITH r
+    OPTIONAL MATCH (r)-[:{FORK}]->(parent:{REPOSITORY})
+    SET parent.{COUNTERS[FORK]} = coalesce(parent.{COUNTERS[FORK]}, 1) - 1
+    WITH r
+    MATCH (ancestor:{REPOSITORY}) WHERE ancestor.id IN r.ancestry
+    SET ancestor.{NETWORK_FORK_COUNT} = coalesce(ancestor.{NETWORK_FORK_COUNT}, 1) - 1 - coalesce(r.{NETWORK_FORK_COUNT}, 0)
+}}
+return first
+'''
+## what is left to delete of a marked repository: the owners with an edge to
+## it or a fork under it, then those forks. The repository itself, with its
+## marker, goes last, so a deletion that stops half way is found and resumed.
+## Owners that also own, star or watch a repository outside the deletion are
+## kept: deleting them would drop those edges without touching the counters
+## of the repositories at their other end. Whether a repository is in the
+## deletion is read from its network labels, not looked up in the list of
+## forks, which would make this quadratic in the size of the network.
+COLLECT_DELETION = f'''
+MATCH (r:{REPOSITORY} {{id: $id}})
+WITH r, coalesce(r.network_root, r.id) AS root
+OPTIONAL MATCH (d:{REPOSITORY} {{network_root: root}}) WHERE r.id IN d.ancestry
+WITH r, root, collect(d) AS forks
+CALL {{
+    WITH r, root, forks
+    UNWIND forks + r AS repo
+    MATCH (o:{OWNER})-->(repo)
+    WITH DISTINCT o, r, root
+    WHERE NOT EXISTS {{
+        MATCH (o)-->(other:{REPOSITORY})
+        WHERE other <> r AND (coalesce(other.network_root, other.id) <> root OR NOT r.id IN coalesce(other.ancestry, []))
+    }}
+    return collect(elementId(o)) AS owners
+}}
+return owners, [f IN forks | elementId(f)] AS forks, elementId(r) AS repo
+'''
+## auto-commit only: detach and delete nodes by element id, chunk per transaction
+delete_nodes = lambda chunk: f'''
+UNWIND $ids AS id
+MATCH (n) WHERE elementId(n) = id
+CALL {{
+    WITH n
+    DETACH DELETE n
+}} IN TRANSACTIONS OF {int(chunk)} ROWS
 '''
 
-DELETE_REPO = f'''
-MATCH (downstream)-[edges*]->(r:{REPOSITORY} {{name: $name}})<-[:OWN]-(:{OWNER} {{login: $login}}) FOREACH (e in edges | DELETE e) DETACH DELETE downstream,r
+# (re)label the fork network of every repository from the FORK edges
+REPAIR_NETWORK = f'''
+MATCH (root:{REPOSITORY}) WHERE NOT (root)-[:{FORK}]->()
+SET root.network_root = root.id, root.ancestry = [], root.fork_depth = 0
+WITH root
+MATCH p = (d:{REPOSITORY})-[:{FORK}*]->(root)
+WITH root, d, [n IN reverse(tail(nodes(p))) | n.id] AS ancestry
+SET d.network_root = root.id, d.ancestry = ancestry, d.fork_depth = size(ancestry)
+return count(d) as forks
 '''
 
 UPDATE_PUSHED_AT = f'''
@@ -1,27 +1,49 @@
 """
 Utility functions for the CLI
 """
+from __future__ import annotations
 import sys
 import time
 import os
 import logging
 import json
-from typing import List, Tuple
+import datetime
+from typing import List, Tuple, TYPE_CHECKING
 from dateutil import parser
 from pathlib import Path
 from re import sub
-from typer import confirm as Confirm
 from sgqlc.operation import Operation  # noqa: I900
-from sgqlc.endpoint.requests import RequestsEndpoint  # noqa: I900
-from mygithub import github_schema as schema  # noqa: I900
+from mygithub import schema
+from selections import *
+from templates import *
 from sgqlc.types import Arg, String, Variable  # noqa: I900
-import xdg.BaseDirectory
 from time import sleep
-import requests
+from tokens import TokenPool
+from ratelimit import governor, is_rate_limited
+from adaptive import PageSize
+
+if TYPE_CHECKING:
+    from sgqlc.endpoint.requests import RequestsEndpoint  # noqa: I900
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
+# Github refuses documents that may return more than 500,000 nodes, and
+# charges one point for every 100 connections a document requests
+MAX_QUERY_NODES = 500000
+MAX_QUERY_COST = 10
+PULLS_PAGE_SIZE = 100
+# forks per aliased find_patch_dates document
+PATCH_BATCH_SIZE = 50
+# Github's maximum of ids for one nodes(ids:) lookup
+NODES_PAGE_SIZE = 100
+
+
+def Confirm(*args, **kwargs):
+    """typer.confirm, imported only once there is something to ask"""
+    from typer import confirm
+    return confirm(*args, **kwargs)
+
 
 def compact_fmt(d):
     s = []
@@ -50,186 +72,6 @@ def report_download_errors(errors):
         print(f"Error #{i+1}: %{msg}%{extra}")
     print(f"Total errors: {len(errors)}")
 
-def camel_case(s: str):
-    """Rewrite s with unallowable graphql characters to camelCase"""
-    s = sub(r"(_|-|\.)+", " ", s).title().replace(" ", "")
-    return "".join([s[0].lower(), s[1:]])
-
-
-def set_user_fields(n: schema.User):
-    """Set the fields we use on a Github User object.
-
-    See https://docs.github.com/en/graphql/reference/objects#user for all
-    options. Note that sqglc replaces camelCase for snake_case.
-    """
-    n.__fields__(
-        id=True,
-        login=True,
-        company=True,
-        url=True,
-        email=True,
-        twitter_username=True,
-        website_url=True,
-        name=True,
-        __typename__=True,
-    )
-
-
-def set_org_fields(n: schema.Organization):
-    """Set the fields we use on a Github Organization object.
-
-    See https://docs.github.com/en/graphql/reference/objects#organization for
-    all options. Note that sqglc replaces camelCase for snake_case.
-    """
-    n.__fields__(
-        id=True,
-        login=True,
-        url=True,
-        email=True,
-        website_url=True,
-        name=True,
-        __typename__=True,
-    )
-
-
-def set_owner_fields(n: schema.RepositoryOwner):
-    """Set the fields we use on a RepositoryOwner.
-
-    See https://docs.github.com/en/graphql/reference/interfaces#repositoryowner
-    Note that the repositoryOwner is actually a sum type that can include
-    information for a User or Organization.
-    """
-    n.__fields__(url=True, __typename__=True)
-    u = n.__as__(schema.User)
-    set_user_fields(u)
-    o = n.__as__(schema.Organization)
-    set_org_fields(o)
-
-def set_parent_fields(n: schema.Repository):
-    n.__fields__(url=True)
-    set_owner_fields(n.owner)
-
-def select_comments(repo, last=100, before=None):
-    args = {}
-    args["last"] = last
-    if before:
-        args["before"] = before
-
-    conn = repo.issues(**args)
-    # repo.pull_requests.__fields__(__typename__=True)
-    conn.page_info.__fields__(has_previous_page=True, start_cursor=True)
-    #either that or body (habbud). either publishedAt or createdAt or updatedAt
-    comment_args={}
-    comment_args["last"] = 100
-    comment_args["before"] = None
-    comment_conn=conn.nodes.comments(**comment_args)
-    comment_conn.nodes.__fields__(body_text=True, updated_at=True)
-    comment_conn.page_info.__fields__(has_previous_page=True, start_cursor=True)
-    # __fields__(__typename__=True, body_text=True, published_at=True) 
-    # repository(, __alias__=camel_case(name))
-
-def select_pulls(repo, last=100, before=None):
-    args = {}
-    args["last"] = last
-    if before:
-        args["before"] = before
-
-    conn = repo.pull_requests(**args)
-    # repo.pull_requests.__fields__(__typename__=True)
-    conn.page_info.__fields__(has_previous_page=True, start_cursor=True)
-    conn.nodes.__fields__(__typename__=True, merged_at=True, merged=True)
-    conn.nodes.head_repository.__fields__(name_with_owner=True, __typename__=True, url=True)
-    # repository(, __alias__=camel_case(name))
-    # conn.nodes.owner.__fields__(__typename__="Organization")
-    # set_owner_fields(conn.nodes.owner)
-
-def select_forks(repo, first=100, after=None):
-    args = {}
-    args["first"] = first
-    if after:
-        args["after"] = after
-
-    conn = repo.forks(**args)
-    conn.__fields__(total_count=True, __typename__=True)
-    conn.page_info.__fields__(has_next_page=True, end_cursor=True)
-    conn.nodes.__fields__(url=True, __typename__=True, is_fork=True, name=True, id=True, pushed_at=True)
-    # conn.nodes.owner.__fields__(__typename__="Organization")
-    set_owner_fields(conn.nodes.owner)
-
-def select_stargazers(repo, first=100, after=None):
-    """Helper to paginate a Repository.stargazers() query"""
-    args = {}
-    args["first"] = first
-    if after:
-        args["after"] = after
-
-    conn = repo.stargazers(**args)
-    conn.page_info.__fields__(has_next_page=True, end_cursor=True)
-    set_user_fields(conn.nodes)
-
-
-def select_watchers(repo, first=100, after=None):
-    args = {}
-    args["first"] = first
-    if after:
-        args["after"] = after
-
-    conn = repo.watchers(**args)
-    conn.__fields__(total_count=True)
-    conn.page_info.__fields__(has_next_page=True, end_cursor=True)
-    set_user_fields(conn.nodes)
-
-
-def select_repo(
-    op,
-    owner,
-    name,
-    forks_page_cursor=None,
-    stargazers_page_cursor=None,
-    watchers_page_cursor=None,
-):
-    r = op.repository(name=name, owner=owner, __alias__=camel_case(name))
-    r.__fields__(
-        id=True,
-        url=True,
-        created_at=True,
-        description=True,
-        description_html=True,
-        has_issues_enabled=True,
-        homepage_url=True,
-        is_archived=True,
-        is_in_organization=True,
-        is_locked=True,
-        is_mirror=True,
-        license_info=True,
-        lock_reason=True,
-        mirror_url=True,
-        name=True,
-        name_with_owner=True,
-        pushed_at=True,
-        short_description_html=True,
-        updated_at=True,
-        code_of_conduct=True,
-        stargazer_count=True,
-        fork_count=True,
-        database_id=True,
-        funding_links=True,
-        is_security_policy_enabled=True,
-        primary_language=True,
-        security_policy_url=True,
-        ssh_url=True,
-        __typename__=True,
-        is_fork=True,
-    )
-
-    set_owner_fields(r.owner)
-    r.repository_topics(first=10)
-
-    select_forks(r, after=forks_page_cursor)
-    select_stargazers(r, after=stargazers_page_cursor)
-    select_watchers(r, after=watchers_page_cursor)
-
-
 def next_cursor(info=None):
     if info and info.has_next_page:
         return info.end_cursor
@@ -269,61 +111,96 @@ def sleep_off_primary_rate_limit(rate_limit):
     return
 
 
-def sleep_off_graphql_rate_limit(limit):
-    assert limit
+def query_error_handler(errors):
+    # rate limits are held back in the governor, the retry waits them off
+    if governor.observe_errors(errors):
+        return
+    report_download_errors(errors)
 
-    cost = 10  # default cost
-    remaining = limit["remaining"]
 
-    if "cost" in limit:
-        cost = limit["cost"]
+def graphql_request(endpoint, op, variables=None):
+    """Send op once the rate limit governor lets it through"""
+    if isinstance(endpoint, TokenPool):
+        # the pool paces every one of its tokens on its own
+        with governor.slot():
+            return endpoint(op, variables, timeout=600.0)
 
-    if remaining < cost:
-        reset_time = parser.parse(limit["resetAt"])
-        sleep_time = (
-            datetime.datetime.fromtimestamp(reset_time)
-            - datetime.datetime.now()
-        )
-        sleep_sec = sleep_time.seconds + 2
-        until = datetime.datetime.fromtimestamp(reset_time)
-        log.warning(
-            f"Rate limit hit. Sleeping until {until} ({sleep_sec} seconds)"
-        )
-        sleep(sleep_sec)  # add 2 seconds for slop
-        log.warning(f"<yawn>. Done sleeping; trying one more time.")
-    return
+    with governor.request("graphql"):
+        d = endpoint(op, variables, timeout=600.0)
+    governor.observe_headers(d.get("headers"), "graphql")
+    if (d.get("data") or {}).get("rateLimit"):
+        governor.observe_graphql(d["data"]["rateLimit"])
+    return d
 
 
-def query_error_handler(errors):
-    for e in errors:  # if we just hit a rate limit, sleep it off.
-        if e["message"].startswith(
-            '"You have exceeded a secondary rate limit.'
-        ):
-            log.warning("Secondary rate limit hit. Sleeping 4 minutes.")
-            sleep(60 * 4)
-            log.warning("Done sleeping")
-            return
-        if e["message"].startswith("API rate limit exceeded"):
-            # TBD
-            breakpoint()
-    report_download_errors(errors)
+def only_missing_nodes(d):
+    """True if the only errors of a response are aliases that were not found"""
+    return d.get("data") and all(e.get("type") == "NOT_FOUND" for e in d["errors"])
+
+
+# read-through cache of query_with_retry, see set_response_cache()
+response_cache = None
+
+
+def set_response_cache(cache):
+    global response_cache
+    response_cache = cache
+
 
+class QueryTimeout(Exception):
+    """Github gave up on a document, a smaller one may go through"""
 
-def query_with_retry(endpoint, op, max_retries=2, wait_for_ratelimiter=False):
+
+def is_timeout(errors):
+    for e in errors:
+        message = str(e.get("message", "")).lower()
+        if e.get("status") in (502, 504) or "something went wrong" in message or "timeout" in message:
+            return True
+    return False
+
+
+def query_with_retry(endpoint, op, max_retries=2, wait_for_ratelimiter=False, adaptive=False, variables=None,
+                     use_cache=True):
+    """Query op (an Operation or a CompiledQuery with its variables), retrying on errors.
+
+    With adaptive, timeouts raise QueryTimeout instead of sending the same
+    document again, so the caller can shrink or split it. The rateLimit of
+    the query is moved from the data to d["rateLimit"]. Responses are read
+    from and written to the response cache, if one is set; without
+    use_cache they are only written, for queries that must see Github as
+    it is now.
+    """
     # print("Querying...")
+    import requests
+    document = str(op)
+    if response_cache and use_cache:
+        cached = response_cache.get(document, variables)
+        if cached:
+            return cached
     op.rate_limit()
     for _ in range(max_retries):
-        d = endpoint(op, timeout=600.0)
+        try:
+            d = graphql_request(endpoint, op, variables)
+        except requests.exceptions.Timeout as e:
+            if adaptive:
+                raise QueryTimeout(str(e))
+            raise
         # print("DEBUGGGGGG D is:")
         # print(d)
         errors = d.get("errors")
-        if errors:
-            query_error_handler(errors)
-        elif "data" in d and "rateLimit" in d["data"]:
-            sleep_off_graphql_rate_limit(d["data"]["rateLimit"])
-            d["data"].pop("rateLimit")
-            return d
+        if errors and not only_missing_nodes(d):
+            if adaptive and is_timeout(errors):
+                raise QueryTimeout(errors)
+            if not isinstance(endpoint, TokenPool):
+                query_error_handler(errors)
+            elif not is_rate_limited(errors):
+                # the pool already benched a rate limited token
+                report_download_errors(errors)
         else:
+            if "data" in d and "rateLimit" in d["data"]:
+                d["rateLimit"] = d["data"].pop("rateLimit")
+            if response_cache and d.get("data"):
+                response_cache.put(document, variables, {"data": d["data"]})
             return d
         print ("Retrying...")
         print (f"Errors: {errors}")
@@ -338,12 +215,169 @@ def query_with_retry(endpoint, op, max_retries=2, wait_for_ratelimiter=False):
             f"Rate limit failure. Sleeping ({sleep_sec} seconds)"
         )
         sleep(sleep_sec)  # add 2 seconds for slop
-        return query_with_retry(endpoint, op, max_retries=max_retries, wait_for_ratelimiter=wait_for_ratelimiter)
+        return query_with_retry(endpoint, op, max_retries=max_retries, wait_for_ratelimiter=wait_for_ratelimiter, variables=variables,
+                                use_cache=use_cache)
     else :
         print("Exiting...")
         sys.exit(-2)
 
 
+def query_pushed_at(endpoint, ids, wait_for_ratelimiter=False):
+    """id -> {id, name, pushedAt, owner: {login}, defaultBranchRef} of repositories, looked up by node id.
+
+    Repositories that are gone from Github map to None. Never read from the
+    response cache, a cached pushedAt would hide the pushes since.
+    """
+    repos = {}
+    for batch in chunks(ids, NODES_PAGE_SIZE):
+        d = query_with_retry(endpoint, nodes_pushed_at_query(), wait_for_ratelimiter=wait_for_ratelimiter,
+                             variables={"ids": batch}, use_cache=False)
+        repos.update(zip(batch, d['data']['nodes']))
+    return repos
+
+
+def query_head_oids(endpoint, ids, wait_for_ratelimiter=False):
+    """id -> oid of the head commit of the default branch, looked up by node id.
+
+    Repositories that are gone from Github, or empty, map to None. Not read
+    from the response cache either.
+    """
+    heads = {}
+    for batch in chunks(ids, NODES_PAGE_SIZE):
+        d = query_with_retry(endpoint, nodes_head_oid_query(), wait_for_ratelimiter=wait_for_ratelimiter,
+                             variables={"ids": batch}, use_cache=False)
+        for id, repo in zip(batch, d['data']['nodes']):
+            ref = (repo or {}).get('defaultBranchRef')
+            heads[id] = ref['target']['oid'] if ref and ref.get('target') else None
+    return heads
+
+
+def commit_date(nameWithOwner, oid, headers):
+    """Committer date of commit oid in nameWithOwner, as Github formats dates; None if not found"""
+    response = rest_request(f"https://api.github.com/repos/{nameWithOwner}/commits/{oid}", headers, "core")
+    if response.status_code != 200:
+        return None
+    return response.json()['commit']['committer']['date']
+
+
+def contains_commit(nameWithOwner, head, oid, headers):
+    """Whether commit head of nameWithOwner has commit oid in its history, None if Github can't tell.
+
+    One REST compare of oid...head, asking for a single commit of the
+    difference: ahead or identical means oid is an ancestor of head. The
+    forks of a network share their objects, so the fix commit of the
+    upstream can be compared from any fork.
+    """
+    if head == oid:
+        return True
+    response = rest_request(
+        f"https://api.github.com/repos/{nameWithOwner}/compare/{oid}...{head}?per_page=1", headers, "core"
+    )
+    if response.status_code != 200:
+        return None
+    return response.json()['status'] in ('ahead', 'identical')
+
+
+def latest_patch_merge(pulls, parent_nameWithOwner):
+    """Return the merge date of the newest PR in pulls whose head is the parent repo"""
+    date = None
+    for pull in pulls:
+        if(pull['mergedAt'] != None and pull['headRepository'] != None):
+            if(pull['headRepository']['nameWithOwner'] == parent_nameWithOwner):
+                date = datetime.datetime.strptime(pull['mergedAt'], '%Y-%m-%dT%H:%M:%SZ')
+    return date
+
+
+def patch_batch_size(page_size=PULLS_PAGE_SIZE):
+    """Number of forks whose pull requests fit in one query document"""
+    by_nodes = MAX_QUERY_NODES // (page_size + 1)
+    # each fork adds one pullRequests connection, a hundredth of a point
+    by_cost = MAX_QUERY_COST * 100
+    return max(1, min(PATCH_BATCH_SIZE, by_nodes, by_cost))
+
+
+def query_cost(d):
+    return (d.get("rateLimit") or {}).get("cost")
+
+
+def find_patch_dates(endpoint, forks, parent_nameWithOwner, wait_for_ratelimiter=False, batch_size=None, use_cache=True):
+    """Find the patch date of many forks with aliased pull request queries.
+
+    forks is a list of (owner, name). Every fork gets its own alias in one
+    document, so a page of forks costs one round trip per page of pull
+    requests instead of one per fork. Forks that found their patch, or ran
+    out of pull requests, drop out of the next document. A document Github
+    times out on is split in half, and a single fork that still times out
+    asks for fewer pull requests per page.
+
+    Returns the patch dates (or None) in the order of forks. Without
+    use_cache the pull requests are not read from the response cache.
+    """
+    batch_size = batch_size or patch_batch_size()
+    batches = PageSize(batch_size, minimum=1, maximum=batch_size, target_cost=MAX_QUERY_COST)
+    pulls_page = PageSize(PULLS_PAGE_SIZE)
+    dates = [None] * len(forks)
+    # index of the fork -> cursor of the pull request page to fetch next
+    pending = {i: None for i in range(len(forks))}
+
+    while pending:
+        queue = list(chunks(list(pending), int(batches)))
+        while queue:
+            batch = queue.pop()
+            op = pulls_batch_query(len(batch))
+            variables = pulls_batch_variables(int(pulls_page), [(*forks[i], pending[i]) for i in batch])
+
+            start = time.monotonic()
+            try:
+                p = query_with_retry(endpoint, op, wait_for_ratelimiter=wait_for_ratelimiter, adaptive=True, variables=variables,
+                                     use_cache=use_cache)
+            except QueryTimeout:
+                if len(batch) > 1:
+                    batches.shrink()
+                    half = len(batch) // 2
+                    queue += [batch[:half], batch[half:]]
+                    continue
+                if pulls_page.shrink():
+                    queue.append(batch)
+                    continue
+                # nothing left to shrink, fall back to plain retries
+                p = query_with_retry(endpoint, op, wait_for_ratelimiter=wait_for_ratelimiter, variables=variables,
+                                     use_cache=use_cache)
+            latency = time.monotonic() - start
+            batches.observe(latency, query_cost(p))
+            pulls_page.observe(latency, query_cost(p))
+
+            for alias, i in enumerate(batch):
+                data = p['data'].get(f'fork{alias}')
+                # the fork was deleted or made private since it was listed
+                if not data:
+                    del pending[i]
+                    continue
+                pulls = data['pullRequests']
+                dates[i] = latest_patch_merge(pulls['nodes'], parent_nameWithOwner)
+                if dates[i] or not pulls['pageInfo']['hasPreviousPage']:
+                    del pending[i]
+                else:
+                    pending[i] = pulls['pageInfo']['startCursor']
+    return dates
+
+
+def rest_request(url, headers, category="core", max_retries=2):
+    """GET a REST url once the rate limit governor lets it through"""
+    import requests
+    for _ in range(max_retries):
+        with governor.request(category):
+            response = requests.get(url, headers=headers)
+        governor.observe_headers(response.headers, category)
+        # 403/429 with rate limit headers: the governor now holds the category
+        if response.status_code not in (403, 429) or not (
+            "retry-after" in response.headers or response.headers.get("x-ratelimit-remaining") == "0"
+        ):
+            return response
+        log.warning(f"REST rate limit hit on {url}, retrying.")
+    return response
+
+
 def query_repos(repos, endpoint):
     op = Operation(schema.Query)
     for owner, name in repos:
@@ -428,41 +462,9 @@ def query_repos(repos, endpoint):
     return ret
 
 
-def cmd_save(repos):
-    data_home = xdg.BaseDirectory.save_data_path("forksearch")
-    Path(data_home).mkdir(parents=True, exist_ok=True)
-    data = {}
-    for r in repos:
-        data = repos[r].__json_data__
-        with open(data_home + f"/{r}.json", "w") as f:
-            json.dump(
-                data, f, sort_keys=True, indent=2, separators=(",", ": ")
-            )
-
-
-def cmd_load():
-    return 
-    caches = xdg.BaseDirectory.load_data_paths("forksearch")
-    repos = {}
-    # This code has never been tested and probably wrong.
-    for dir in caches:
-        # temp: is `c` a directory correct?
-        for c in os.listdir(dir):
-            with open(os.path.join(dir, c), "r") as f:
-                json_data = json.load(f)
-                result = schema.Repository(json_data)
-                # for k, v in json_data.items():
-                #     repos[c] = schema.Repository(v)
-
-    return repos
-
-
 def repositories(token, repos, nocache=False, cache=None):
     target_repos = [(repo.owner, repo.name) for repo in repos]
     results = query_repos(target_repos, endpoint)
-    cmd_save(results)
-    # XXX: Check that save worked
-    foo = cmd_load()
     return results
 
 
@@ -496,39 +498,10 @@ def chunks(list_a, chunk_size):
 
 
 def query_repo_info(endpoint: RequestsEndpoint, name: str, owner: str, wait_for_ratelimiter: bool = False):
-    op = Operation(schema.Query)
-    r = op.repository(name=name, owner=owner, __alias__=camel_case(name))
-    # get info about the repo
-    r.__fields__(
-        id=True,
-        is_fork=True,
-        url=True,
-        name=True,
-        fork_count=True,
-        stargazer_count=True,
-        pushed_at=True,
-    )
-
+    d = query_with_retry(endpoint, repo_info_query(), wait_for_ratelimiter=wait_for_ratelimiter,
+                         variables={"owner": owner, "name": name})
+    return d['data']['repository']
 
-    # set up fields for owner
-    u = r.owner.__as__(schema.User)
-    set_user_fields(u)
-    u = r.owner.__as__(schema.Organization)
-    set_org_fields(u)
-
-    # get count of watchers
-    r.watchers.__fields__(total_count=True)
-    r.parent.__fields__(name_with_owner=True)
-    d= query_with_retry(endpoint, op, wait_for_ratelimiter=wait_for_ratelimiter)
-    # get response of query
-    # d = endpoint(op)
-    # errors = d.get("errors")
-    # if errors:
-    #     report_download_errors(errors)
-    #     sys.exit(1)
-    # else:
-    return d['data'][camel_case(name)]
-    
 def query_repo_language(endpoint: RequestsEndpoint, name: str, owner: str):
     op = Operation(schema.Query)
     r = op.repository(
@@ -568,8 +541,6 @@ def query_repo_list(endpoint: RequestsEndpoint, repositories: List[Tuple[str, st
         r = query_repos(current, endpoint)
         for k, v in r.items():
             repos[k] = v
-        cmd_save(repos)
-        foo = cmd_load()
 
 def get_repos_by_owner(endpoint: RequestsEndpoint, owner:str, wait_for_ratelimiter: bool = False) :
         op = Operation(schema.Query)
@@ -606,10 +577,7 @@ def query_org_repos(endpoint:RequestsEndpoint, lib_name:str, repos_names:List[st
         # REST_endpoint.setopt(REST_endpoint.URL, 'https://www.google.com')
         # repo_object= REST_endpoint.perform()
         url="https://api.github.com/repos/{}/{}/dependency-graph/sbom".format(organization_login, name)
-        response = requests.get(
-            url,
-            headers=headers,
-        )
+        response = rest_request(url, headers, "core")
         response = response.json()
 
         try:
@@ -643,7 +611,7 @@ def query_code_search(lib_name:str,  headers: List[str] = [], page_number:int=1)
     lib_name="libbw64"
     url="https://api.github.com/search/code?q={}&p={}".format(lib_name,page_number)
     print("DEBUG habbud query_org_repos: header={}".format(headers))
-    response = requests.request("GET", url, headers=headers)
+    response = rest_request(url, headers, "code_search")
 
     # response = requests.get(
     #     url,
@@ -1,17 +1,14 @@
 import argparse
 import os
-import utils
-from rich import print
-from database import GitDB
-from sgqlc.endpoint.requests import RequestsEndpoint  # noqa: I900
+from profiles import PROFILES, DEFAULT_PROFILE
 # from github import Github
 # from github import Auth
-import pycurl
 
 
 def init_parser():
     parser = argparse.ArgumentParser(description="ForkSearch CLI")
     parser.add_argument("--token", help="Github token (Default token with environment variable GH_TOKEN)", default=os.getenv("GH_TOKEN"))
+    parser.add_argument("--token-file", help="File with one Github token per line, crawls rotate over all of them (also read from GH_TOKENS)", default=None)
     parser.add_argument("--host", help="Neo4j host", default="localhost")
     parser.add_argument("--port", help="Neo4j port", default=7687)
     parser.add_argument("--username", help="Neo4j username", default="neo4j")
@@ -23,6 +20,16 @@ def init_parser():
     parser.add_argument("-w", "--wait", action="store_true", help="Wait for rate limiter instead of exiting", default=False)
     parser.add_argument("-t", "--trace", action="store_true", help="Trace back to the parent repository", default=False)
     parser.add_argument("-ref", "--refresh", action="store_true", help="Refresh the data instead of using local DB info", default=False)
+    parser.add_argument("--profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help="Crawl profile: " + ", ".join(f"{p.name} ({p.description})" for p in PROFILES.values()))
+    parser.add_argument("--mirror", action="store_true", help="Check fix commits against a local bare git mirror of the fork network instead of the API (needs git)", default=False)
+    parser.add_argument("-d", "--delta", action="store_true", help="Only crawl the stargazers and forks newer than the last crawl", default=False)
+    parser.add_argument("-u", "--update", action="store_true", help="Update the local DB incrementally: delta crawl and re-check only forks pushed to since the last crawl", default=False)
+    parser.add_argument("--fetch-size", type=int, help="Rows per read transaction when streaming forks and organizations from neo4j (Default: 1000)", default=1000)
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the on-disk cache of Github responses", default=False)
+    parser.add_argument("--repair-network", action="store_true", help="Label the fork network (root, depth, ancestry) of every repository from the database edges and exit", default=False)
+    parser.add_argument("--migrate-dates", action="store_true", help="Convert the repository dates stored as strings by older versions to DateTime and exit", default=False)
+    parser.add_argument("--repair-counts", action="store_true", help="Recount the stored star/watch/fork counters from the database edges and exit", default=False)
     args = parser.parse_args()
     return args
 
@@ -32,17 +39,44 @@ def quiet_info(*args, **kwargs):
 if __name__ == '__main__':
     args = init_parser()
 
-    if args.token is None:
-        print ("Set token with --token or GH_TOKEN environment variable")
+    # the rest of the CLI pulls in neo4j, sgqlc and requests; import it only
+    # once the arguments parsed, so -h and usage errors return right away
+    import utils
+    from rich import print
+    from tokens import TokenPool, load_tokens
+    from cache import ResponseCache
+    from database import GitDB
+
+    if args.repair_network:
+        db = GitDB(args.host, args.port, args.username, args.password)
+        print(f"Labelled the fork network of {db.repair_network()} forks")
+        db.close()
+        exit(0)
+
+    if args.migrate_dates:
+        db = GitDB(args.host, args.port, args.username, args.password)
+        print(f"Migrated the dates of {db.migrate_dates()} repositories")
+        db.close()
+        exit(0)
+
+    if args.repair_counts:
+        db = GitDB(args.host, args.port, args.username, args.password)
+        repaired = db.repair_counts()
+        for repo in repaired:
+            print(f"[italic blue]{repo['login']}/{repo['name']}[/italic blue]: {repo['stored']} -> {repo['counts']}")
+        print(f"Repaired the counters of {len(repaired)} repositories")
+        db.close()
+        exit(0)
+
+    tokens = load_tokens(args.token, args.token_file)
+    if not tokens:
+        print ("Set token with --token, --token-file, GH_TOKEN or GH_TOKENS environment variable")
         exit(-1)
 
-    endpoint = RequestsEndpoint(
-        "https://api.github.com/graphql",
-        {
-            "Authorization": "bearer " + args.token,
-        },
-        timeout=600.0,
-    )
+    endpoint = TokenPool.from_tokens(tokens, timeout=600.0)
+    if not args.no_cache:
+        # --refresh downloads everything again, but still fills the cache
+        utils.set_response_cache(ResponseCache(read=not args.refresh))
     # REST_endpoint = RequestsEndpoint(
     #     "https://api.github.com",
     #     {
@@ -52,8 +86,12 @@ if __name__ == '__main__':
     # )
     # auth = Auth.Token(args.token)
     # REST_endpoint = Github(auth=auth)
-    headers={'Accept': 'application/vnd.github+json', 'Authorization': 'Bearer {}'.format(args.token), 'X-GitHub-Api-Version': '2022-11-28'}
-    db = GitDB(args.host, args.port, args.username, args.password)
+    headers={'Accept': 'application/vnd.github+json', 'Authorization': 'Bearer {}'.format(tokens[0]), 'X-GitHub-Api-Version': '2022-11-28'}
+    db = GitDB(args.host, args.port, args.username, args.password, fetch_size=args.fetch_size)
+    # finish deletions an earlier --refresh did not get to complete
+    for id in db.pending_deletions():
+        print(f"Resuming the deletion of repository {id}")
+        db.delete_repo(id)
 
     if args.file is not None:
         with open(args.file, 'r') as f:
@@ -64,7 +102,7 @@ if __name__ == '__main__':
     for repo in repos:
         print (f'Processing [italic blue]{repo}[/italic blue]')
         owner, repo = repo.split("/")
-        utils.request_repo(endpoint, db, owner, repo, quiet_info if args.quiet else utils.print_info, args.trace, args.yes, args.wait, args.refresh, headers)
+        utils.request_repo(endpoint, db, owner, repo, quiet_info if args.quiet else utils.print_info, args.trace, args.yes, args.wait, args.refresh, headers, args.update, args.delta, args.profile, args.mirror)
     
     # REST_endpoint.close()
 
@@ -0,0 +1,118 @@
+"""
+Local bare git mirror of a fork network, for patch checks without the API
+"""
+import datetime
+import subprocess
+from pathlib import Path
+import xdg.BaseDirectory
+
+GITHUB_URL = "https://github.com/{}.git"
+# forks fetched into the mirror live under this ref namespace, one ref each
+FORKS_REFS = "refs/forks/"
+
+
+class GitError(Exception):
+    pass
+
+
+class NetworkMirror:
+    """One bare repository holding the default branches of a whole fork network.
+
+    Every fork is fetched into refs/forks/<owner>/<name>. The forks of a
+    network share most of their history, so one object store keeps each
+    commit once and fetching another fork only transfers what it adds.
+    Commit-graph files are written on fetch and pack() adds reachability
+    bitmaps, so containment questions are answered locally:
+    merge-base --is-ancestor for one fork, for-each-ref --contains for all.
+
+    url_format turns "owner/name" into the URL to fetch; tests point it at
+    local repositories.
+    """
+
+    def __init__(self, nameWithOwner: str, path=None, url_format: str = GITHUB_URL):
+        if path is None:
+            path = Path(xdg.BaseDirectory.save_cache_path("forksearch")) / "mirrors" / (nameWithOwner.replace("/", "__") + ".git")
+        self.nameWithOwner = nameWithOwner
+        self.path = Path(path)
+        self.url_format = url_format
+        if not (self.path / "HEAD").exists():
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.git("init", "--bare", "--quiet")
+            for key, value in [("core.commitGraph", "true"), ("fetch.writeCommitGraph", "true"),
+                               ("gc.writeCommitGraph", "true"), ("repack.writeBitmaps", "true")]:
+                self.git("config", key, value)
+
+    def git(self, *args, check: bool = True):
+        result = subprocess.run(["git", "--git-dir", str(self.path), *args], capture_output=True, text=True)
+        if check and result.returncode != 0:
+            raise GitError(f"git {' '.join(args)}: {result.stderr.strip()}")
+        return result
+
+    def ref(self, nameWithOwner: str):
+        return FORKS_REFS + nameWithOwner
+
+    def fetch(self, forks):
+        """Fetch the default branch of every fork in forks ("owner/name").
+
+        Returns the forks that could not be fetched (deleted, private, empty).
+        """
+        failed = []
+        for nameWithOwner in forks:
+            url = self.url_format.format(nameWithOwner)
+            result = self.git("fetch", "--quiet", "--no-tags", "--force", url, f"HEAD:{self.ref(nameWithOwner)}", check=False)
+            if result.returncode != 0:
+                failed.append(nameWithOwner)
+        return failed
+
+    def pack(self):
+        """Repack into one pack with reachability bitmaps and rewrite the commit-graph"""
+        self.git("repack", "-a", "-d", "-b", "--quiet")
+        self.git("commit-graph", "write", "--reachable")
+
+    def head(self, nameWithOwner: str):
+        """oid the mirror has for the default branch of a fork, None if it was never fetched"""
+        result = self.git("rev-parse", "--verify", "--quiet", self.ref(nameWithOwner), check=False)
+        return result.stdout.strip() or None
+
+    def resolve(self, oid: str):
+        """Full oid of a commit given by a possibly abbreviated oid, None if the mirror lacks it"""
+        result = self.git("rev-parse", "--verify", "--quiet", f"{oid}^{{commit}}", check=False)
+        return result.stdout.strip() or None
+
+    def has_commit(self, oid: str):
+        return self.resolve(oid) is not None
+
+    def commit_date(self, oid: str):
+        """Committer date of oid in the format of Github's pushedAt, None if the mirror lacks it"""
+        result = self.git("show", "-s", "--format=%ct", oid, check=False)
+        if result.returncode != 0:
+            return None
+        date = datetime.datetime.fromtimestamp(int(result.stdout.strip()), datetime.timezone.utc)
+        return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def is_ancestor(self, ancestor: str, oid: str):
+        """Whether ancestor is in the history of oid (oid itself included).
+
+        git stops the walk early using the generation numbers of the
+        commit-graph, once fetch or pack() has written one.
+        """
+        result = self.git("merge-base", "--is-ancestor", ancestor, oid, check=False)
+        if result.returncode > 1:
+            raise GitError(result.stderr.strip())
+        return result.returncode == 0
+
+    def contains(self, nameWithOwner: str, oid: str):
+        """Whether the fetched default branch of a fork has oid in its history.
+
+        None if the fork was never fetched or the mirror lacks oid.
+        """
+        if not self.head(nameWithOwner) or not self.has_commit(oid):
+            return None
+        return self.is_ancestor(oid, self.ref(nameWithOwner))
+
+    def containing(self, oid: str):
+        """The fetched forks ("owner/name") whose default branch contains oid"""
+        if not self.has_commit(oid):
+            return set()
+        result = self.git("for-each-ref", "--contains", oid, "--format=%(refname)", FORKS_REFS)
+        return {line[len(FORKS_REFS):] for line in result.stdout.split()}
@@ -0,0 +1,34 @@
+"""
+Github GraphQL schema for sgqlc, imported on first use.
+
+github_schema.py is the full schema written by update-schema.sh.
+github_schema_min.py, written by trim_schema.py, only has the types
+forksearch selects and imports in a fraction of the time. It is used
+whenever it exists, unless FORKSEARCH_FULL_SCHEMA is set.
+"""
+import os
+import importlib
+
+
+def load_schema():
+    """The github_schema module to build operations with"""
+    if not os.getenv("FORKSEARCH_FULL_SCHEMA"):
+        try:
+            return importlib.import_module(__name__ + ".github_schema_min")
+        except ImportError:
+            pass
+    return importlib.import_module(__name__ + ".github_schema")
+
+
+class LazySchema:
+    """Stands in for the schema module until one of its types is needed"""
+
+    _module = None
+
+    def __getattr__(self, name):
+        if LazySchema._module is None:
+            LazySchema._module = load_schema()
+        return getattr(LazySchema._module, name)
+
+
+schema = LazySchema()
@@ -0,0 +1,670 @@
+# Generated by mygithub/trim_schema.py from github_schema.json, do not edit.
+import sgqlc.types
+import sgqlc.types.datetime
+import sgqlc.types.relay
+
+
+github_schema = sgqlc.types.Schema()
+
+
+# Unexport Node/PageInfo, let schema re-declare them
+github_schema -= sgqlc.types.relay.Node
+github_schema -= sgqlc.types.relay.PageInfo
+
+
+
+########################################################################
+# Scalars and Enumerations
+########################################################################
+Boolean = sgqlc.types.Boolean
+
+DateTime = sgqlc.types.datetime.DateTime
+
+class FundingPlatform(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('COMMUNITY_BRIDGE', 'CUSTOM', 'GITHUB', 'ISSUEHUNT', 'KO_FI', 'LFX_CROWDFUNDING', 'LIBERAPAY', 'OPEN_COLLECTIVE', 'OTECHIE', 'PATREON', 'TIDELIFT')
+
+
+class GitObjectID(sgqlc.types.Scalar):
+    __schema__ = github_schema
+
+
+class GitSSHRemote(sgqlc.types.Scalar):
+    __schema__ = github_schema
+
+
+class HTML(sgqlc.types.Scalar):
+    __schema__ = github_schema
+
+
+ID = sgqlc.types.ID
+
+Int = sgqlc.types.Int
+
+class IssueCommentOrderField(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('UPDATED_AT',)
+
+
+class IssueOrderField(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('COMMENTS', 'CREATED_AT', 'UPDATED_AT')
+
+
+class IssueState(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('CLOSED', 'OPEN')
+
+
+class LanguageOrderField(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('SIZE',)
+
+
+class OrderDirection(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('ASC', 'DESC')
+
+
+class PullRequestMergeMethod(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('MERGE', 'REBASE', 'SQUASH')
+
+
+class PullRequestState(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('CLOSED', 'MERGED', 'OPEN')
+
+
+class RepositoryAffiliation(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('COLLABORATOR', 'ORGANIZATION_MEMBER', 'OWNER')
+
+
+class RepositoryLockReason(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('BILLING', 'MIGRATING', 'MOVING', 'RENAME')
+
+
+class RepositoryOrderField(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('CREATED_AT', 'NAME', 'PUSHED_AT', 'STARGAZERS', 'UPDATED_AT')
+
+
+class RepositoryPermission(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('ADMIN', 'MAINTAIN', 'READ', 'TRIAGE', 'WRITE')
+
+
+class RepositoryPrivacy(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('PRIVATE', 'PUBLIC')
+
+
+class RepositoryVisibility(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('INTERNAL', 'PRIVATE', 'PUBLIC')
+
+
+class StarOrderField(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('STARRED_AT',)
+
+
+String = sgqlc.types.String
+
+class SubscriptionState(sgqlc.types.Enum):
+    __schema__ = github_schema
+    __choices__ = ('IGNORED', 'SUBSCRIBED', 'UNSUBSCRIBED')
+
+
+class URI(sgqlc.types.Scalar):
+    __schema__ = github_schema
+
+
+
+########################################################################
+# Input Objects
+########################################################################
+class IssueCommentOrder(sgqlc.types.Input):
+    __schema__ = github_schema
+    __field_names__ = ('field', 'direction')
+    field = sgqlc.types.Field(sgqlc.types.non_null(IssueCommentOrderField), graphql_name='field')
+    direction = sgqlc.types.Field(sgqlc.types.non_null(OrderDirection), graphql_name='direction')
+
+
+class IssueFilters(sgqlc.types.Input):
+    __schema__ = github_schema
+    __field_names__ = ('assignee', 'created_by', 'labels', 'mentioned', 'milestone', 'milestone_number', 'since', 'states', 'viewer_subscribed')
+    assignee = sgqlc.types.Field(String, graphql_name='assignee')
+    created_by = sgqlc.types.Field(String, graphql_name='createdBy')
+    labels = sgqlc.types.Field(sgqlc.types.list_of(sgqlc.types.non_null(String)), graphql_name='labels')
+    mentioned = sgqlc.types.Field(String, graphql_name='mentioned')
+    milestone = sgqlc.types.Field(String, graphql_name='milestone')
+    milestone_number = sgqlc.types.Field(String, graphql_name='milestoneNumber')
+    since = sgqlc.types.Field(DateTime, graphql_name='since')
+    states = sgqlc.types.Field(sgqlc.types.list_of(sgqlc.types.non_null(IssueState)), graphql_name='states')
+    viewer_subscribed = sgqlc.types.Field(Boolean, graphql_name='viewerSubscribed')
+
+
+class IssueOrder(sgqlc.types.Input):
+    __schema__ = github_schema
+    __field_names__ = ('field', 'direction')
+    field = sgqlc.types.Field(sgqlc.types.non_null(IssueOrderField), graphql_name='field')
+    direction = sgqlc.types.Field(sgqlc.types.non_null(OrderDirection), graphql_name='direction')
+
+
+class LanguageOrder(sgqlc.types.Input):
+    __schema__ = github_schema
+    __field_names__ = ('field', 'direction')
+    field = sgqlc.types.Field(sgqlc.types.non_null(LanguageOrderField), graphql_name='field')
+    direction = sgqlc.types.Field(sgqlc.types.non_null(OrderDirection), graphql_name='direction')
+
+
+class RepositoryOrder(sgqlc.types.Input):
+    __schema__ = github_schema
+    __field_names__ = ('field', 'direction')
+    field = sgqlc.types.Field(sgqlc.types.non_null(RepositoryOrderField), graphql_name='field')
+    direction = sgqlc.types.Field(sgqlc.types.non_null(OrderDirection), graphql_name='direction')
+
+
+class StarOrder(sgqlc.types.Input):
+    __schema__ = github_schema
+    __field_names__ = ('field', 'direction')
+    field = sgqlc.types.Field(sgqlc.types.non_null(StarOrderField), graphql_name='field')
+    direction = sgqlc.types.Field(sgqlc.types.non_null(OrderDirection), graphql_name='direction')
+
+
+
+########################################################################
+# Output Objects and Interfaces
+########################################################################
+class Actor(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('login', 'url')
+    login = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='login')
+    url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='url')
+
+
+class Comment(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('body_text', 'updated_at')
+    body_text = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='bodyText')
+    updated_at = sgqlc.types.Field(sgqlc.types.non_null(DateTime), graphql_name='updatedAt')
+
+
+class GitObject(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('oid',)
+    oid = sgqlc.types.Field(sgqlc.types.non_null(GitObjectID), graphql_name='oid')
+
+
+class Node(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id',)
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+
+
+class PackageOwner(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id',)
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+
+
+class ProfileOwner(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('email', 'id', 'login', 'name', 'website_url')
+    email = sgqlc.types.Field(String, graphql_name='email')
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+    login = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='login')
+    name = sgqlc.types.Field(String, graphql_name='name')
+    website_url = sgqlc.types.Field(URI, graphql_name='websiteUrl')
+
+
+class ProjectNextOwner(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id',)
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+
+
+class ProjectOwner(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id', 'projects_resource_path', 'projects_url', 'viewer_can_create_projects')
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+    projects_resource_path = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='projectsResourcePath')
+    projects_url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='projectsUrl')
+    viewer_can_create_projects = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='viewerCanCreateProjects')
+
+
+class ProjectV2Owner(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id',)
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+
+
+class RepositoryInfo(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('created_at', 'description', 'description_html', 'fork_count', 'has_issues_enabled', 'has_projects_enabled', 'has_wiki_enabled', 'homepage_url', 'is_archived', 'is_fork', 'is_in_organization', 'is_locked', 'is_mirror', 'is_private', 'is_template', 'license_info', 'lock_reason', 'mirror_url', 'name', 'name_with_owner', 'open_graph_image_url', 'owner', 'pushed_at', 'resource_path', 'short_description_html', 'updated_at', 'url', 'uses_custom_open_graph_image', 'visibility')
+    created_at = sgqlc.types.Field(sgqlc.types.non_null(DateTime), graphql_name='createdAt')
+    description = sgqlc.types.Field(String, graphql_name='description')
+    description_html = sgqlc.types.Field(sgqlc.types.non_null(HTML), graphql_name='descriptionHTML')
+    fork_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='forkCount')
+    has_issues_enabled = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='hasIssuesEnabled')
+    has_projects_enabled = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='hasProjectsEnabled')
+    has_wiki_enabled = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='hasWikiEnabled')
+    homepage_url = sgqlc.types.Field(URI, graphql_name='homepageUrl')
+    is_archived = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isArchived')
+    is_fork = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isFork')
+    is_in_organization = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isInOrganization')
+    is_locked = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isLocked')
+    is_mirror = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isMirror')
+    is_private = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isPrivate')
+    is_template = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isTemplate')
+    license_info = sgqlc.types.Field('License', graphql_name='licenseInfo')
+    lock_reason = sgqlc.types.Field(RepositoryLockReason, graphql_name='lockReason')
+    mirror_url = sgqlc.types.Field(URI, graphql_name='mirrorUrl')
+    name = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='name')
+    name_with_owner = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='nameWithOwner')
+    open_graph_image_url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='openGraphImageUrl')
+    owner = sgqlc.types.Field(sgqlc.types.non_null('RepositoryOwner'), graphql_name='owner')
+    pushed_at = sgqlc.types.Field(DateTime, graphql_name='pushedAt')
+    resource_path = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='resourcePath')
+    short_description_html = sgqlc.types.Field(sgqlc.types.non_null(HTML), graphql_name='shortDescriptionHTML', args=sgqlc.types.ArgDict((
+        ('limit', sgqlc.types.Arg(Int, graphql_name='limit', default=200)),
+))
+    )
+    updated_at = sgqlc.types.Field(sgqlc.types.non_null(DateTime), graphql_name='updatedAt')
+    url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='url')
+    uses_custom_open_graph_image = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='usesCustomOpenGraphImage')
+    visibility = sgqlc.types.Field(sgqlc.types.non_null(RepositoryVisibility), graphql_name='visibility')
+
+
+class RepositoryOwner(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id', 'login', 'repositories', 'url')
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+    login = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='login')
+    repositories = sgqlc.types.Field(sgqlc.types.non_null('RepositoryConnection'), graphql_name='repositories', args=sgqlc.types.ArgDict((
+        ('privacy', sgqlc.types.Arg(RepositoryPrivacy, graphql_name='privacy', default=None)),
+        ('order_by', sgqlc.types.Arg(RepositoryOrder, graphql_name='orderBy', default=None)),
+        ('affiliations', sgqlc.types.Arg(sgqlc.types.list_of(RepositoryAffiliation), graphql_name='affiliations', default=None)),
+        ('owner_affiliations', sgqlc.types.Arg(sgqlc.types.list_of(RepositoryAffiliation), graphql_name='ownerAffiliations', default=('OWNER', 'COLLABORATOR'))),
+        ('is_locked', sgqlc.types.Arg(Boolean, graphql_name='isLocked', default=None)),
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+        ('is_fork', sgqlc.types.Arg(Boolean, graphql_name='isFork', default=None)),
+))
+    )
+    url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='url')
+
+
+class Starrable(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id', 'stargazer_count', 'stargazers', 'viewer_has_starred')
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+    stargazer_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='stargazerCount')
+    stargazers = sgqlc.types.Field(sgqlc.types.non_null('StargazerConnection'), graphql_name='stargazers', args=sgqlc.types.ArgDict((
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+        ('order_by', sgqlc.types.Arg(StarOrder, graphql_name='orderBy', default=None)),
+))
+    )
+    viewer_has_starred = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='viewerHasStarred')
+
+
+class Subscribable(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('id', 'viewer_can_subscribe', 'viewer_subscription')
+    id = sgqlc.types.Field(sgqlc.types.non_null(ID), graphql_name='id')
+    viewer_can_subscribe = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='viewerCanSubscribe')
+    viewer_subscription = sgqlc.types.Field(SubscriptionState, graphql_name='viewerSubscription')
+
+
+class UniformResourceLocatable(sgqlc.types.Interface):
+    __schema__ = github_schema
+    __field_names__ = ('resource_path', 'url')
+    resource_path = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='resourcePath')
+    url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='url')
+
+
+class FundingLink(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('platform', 'url')
+    platform = sgqlc.types.Field(sgqlc.types.non_null(FundingPlatform), graphql_name='platform')
+    url = sgqlc.types.Field(sgqlc.types.non_null(URI), graphql_name='url')
+
+
+class IssueCommentConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('nodes', 'page_info')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('IssueComment'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null('PageInfo'), graphql_name='pageInfo')
+
+
+class IssueConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('nodes', 'page_info')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('Issue'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null('PageInfo'), graphql_name='pageInfo')
+
+
+class LanguageConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('edges', 'nodes', 'page_info', 'total_count', 'total_size')
+    edges = sgqlc.types.Field(sgqlc.types.list_of('LanguageEdge'), graphql_name='edges')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('Language'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null('PageInfo'), graphql_name='pageInfo')
+    total_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='totalCount')
+    total_size = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='totalSize')
+
+
+class LanguageEdge(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('cursor', 'size')
+    cursor = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='cursor')
+    size = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='size')
+
+
+class LicenseRule(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('description', 'key', 'label')
+    description = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='description')
+    key = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='key')
+    label = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='label')
+
+
+class PageInfo(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('end_cursor', 'has_next_page', 'has_previous_page', 'start_cursor')
+    end_cursor = sgqlc.types.Field(String, graphql_name='endCursor')
+    has_next_page = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='hasNextPage')
+    has_previous_page = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='hasPreviousPage')
+    start_cursor = sgqlc.types.Field(String, graphql_name='startCursor')
+
+
+class PullRequestConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('nodes', 'page_info')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('PullRequest'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null(PageInfo), graphql_name='pageInfo')
+
+
+class Query(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('nodes', 'rate_limit', 'repository', 'repository_owner')
+    nodes = sgqlc.types.Field(sgqlc.types.non_null(sgqlc.types.list_of(Node)), graphql_name='nodes', args=sgqlc.types.ArgDict((
+        ('ids', sgqlc.types.Arg(sgqlc.types.non_null(sgqlc.types.list_of(sgqlc.types.non_null(ID))), graphql_name='ids', default=None)),
+))
+    )
+    rate_limit = sgqlc.types.Field('RateLimit', graphql_name='rateLimit', args=sgqlc.types.ArgDict((
+        ('dry_run', sgqlc.types.Arg(Boolean, graphql_name='dryRun', default=False)),
+))
+    )
+    repository = sgqlc.types.Field('Repository', graphql_name='repository', args=sgqlc.types.ArgDict((
+        ('owner', sgqlc.types.Arg(sgqlc.types.non_null(String), graphql_name='owner', default=None)),
+        ('name', sgqlc.types.Arg(sgqlc.types.non_null(String), graphql_name='name', default=None)),
+        ('follow_renames', sgqlc.types.Arg(Boolean, graphql_name='followRenames', default=True)),
+))
+    )
+    repository_owner = sgqlc.types.Field(RepositoryOwner, graphql_name='repositoryOwner', args=sgqlc.types.ArgDict((
+        ('login', sgqlc.types.Arg(sgqlc.types.non_null(String), graphql_name='login', default=None)),
+))
+    )
+
+
+class RateLimit(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('cost', 'limit', 'node_count', 'remaining', 'reset_at', 'used')
+    cost = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='cost')
+    limit = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='limit')
+    node_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='nodeCount')
+    remaining = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='remaining')
+    reset_at = sgqlc.types.Field(sgqlc.types.non_null(DateTime), graphql_name='resetAt')
+    used = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='used')
+
+
+class RepositoryConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('edges', 'nodes', 'page_info', 'total_count', 'total_disk_usage')
+    edges = sgqlc.types.Field(sgqlc.types.list_of('RepositoryEdge'), graphql_name='edges')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('Repository'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null(PageInfo), graphql_name='pageInfo')
+    total_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='totalCount')
+    total_disk_usage = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='totalDiskUsage')
+
+
+class RepositoryEdge(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('cursor',)
+    cursor = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='cursor')
+
+
+class RepositoryTopicConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('edges', 'nodes', 'page_info', 'total_count')
+    edges = sgqlc.types.Field(sgqlc.types.list_of('RepositoryTopicEdge'), graphql_name='edges')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('RepositoryTopic'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null(PageInfo), graphql_name='pageInfo')
+    total_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='totalCount')
+
+
+class RepositoryTopicEdge(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('cursor',)
+    cursor = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='cursor')
+
+
+class StargazerConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('edges', 'nodes', 'page_info')
+    edges = sgqlc.types.Field(sgqlc.types.list_of('StargazerEdge'), graphql_name='edges')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('User'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null(PageInfo), graphql_name='pageInfo')
+
+
+class StargazerEdge(sgqlc.types.Type):
+    __schema__ = github_schema
+    __field_names__ = ('starred_at',)
+    starred_at = sgqlc.types.Field(sgqlc.types.non_null(DateTime), graphql_name='starredAt')
+
+
+class UserConnection(sgqlc.types.relay.Connection):
+    __schema__ = github_schema
+    __field_names__ = ('nodes', 'page_info', 'total_count')
+    nodes = sgqlc.types.Field(sgqlc.types.list_of('User'), graphql_name='nodes')
+    page_info = sgqlc.types.Field(sgqlc.types.non_null(PageInfo), graphql_name='pageInfo')
+    total_count = sgqlc.types.Field(sgqlc.types.non_null(Int), graphql_name='totalCount')
+
+
+class CodeOfConduct(sgqlc.types.Type, Node):
+    __schema__ = github_schema
+    __field_names__ = ('body', 'key', 'name', 'resource_path', 'url')
+    body = sgqlc.types.Field(String, graphql_name='body')
+    key = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='key')
+    name = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='name')
+    resource_path = sgqlc.types.Field(URI, graphql_name='resourcePath')
+    url = sgqlc.types.Field(URI, graphql_name='url')
+
+
+class Issue(sgqlc.types.Type, Node, Comment, Subscribable, UniformResourceLocatable, ProjectNextOwner, ProjectV2Owner):
+    __schema__ = github_schema
+    __field_names__ = ('comments',)
+    comments = sgqlc.types.Field(sgqlc.types.non_null(IssueCommentConnection), graphql_name='comments', args=sgqlc.types.ArgDict((
+        ('order_by', sgqlc.types.Arg(IssueCommentOrder, graphql_name='orderBy', default=None)),
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+))
+    )
+
+
+class IssueComment(sgqlc.types.Type, Node, Comment):
+    __schema__ = github_schema
+    __field_names__ = ()
+
+
+class Language(sgqlc.types.Type, Node):
+    __schema__ = github_schema
+    __field_names__ = ('color', 'name')
+    color = sgqlc.types.Field(String, graphql_name='color')
+    name = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='name')
+
+
+class License(sgqlc.types.Type, Node):
+    __schema__ = github_schema
+    __field_names__ = ('body', 'conditions', 'description', 'featured', 'hidden', 'implementation', 'key', 'limitations', 'name', 'nickname', 'permissions', 'pseudo_license', 'spdx_id', 'url')
+    body = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='body')
+    conditions = sgqlc.types.Field(sgqlc.types.non_null(sgqlc.types.list_of(LicenseRule)), graphql_name='conditions')
+    description = sgqlc.types.Field(String, graphql_name='description')
+    featured = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='featured')
+    hidden = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='hidden')
+    implementation = sgqlc.types.Field(String, graphql_name='implementation')
+    key = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='key')
+    limitations = sgqlc.types.Field(sgqlc.types.non_null(sgqlc.types.list_of(LicenseRule)), graphql_name='limitations')
+    name = sgqlc.types.Field(sgqlc.types.non_null(String), graphql_name='name')
+    nickname = sgqlc.types.Field(String, graphql_name='nickname')
+    permissions = sgqlc.types.Field(sgqlc.types.non_null(sgqlc.types.list_of(LicenseRule)), graphql_name='permissions')
+    pseudo_license = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='pseudoLicense')
+    spdx_id = sgqlc.types.Field(String, graphql_name='spdxId')
+    url = sgqlc.types.Field(URI, graphql_name='url')
+
+
+class Organization(sgqlc.types.Type, Node, Actor, PackageOwner, ProjectOwner, ProjectNextOwner, ProjectV2Owner, RepositoryOwner, UniformResourceLocatable, ProfileOwner):
+    __schema__ = github_schema
+    __field_names__ = ()
+
+
+class PullRequest(sgqlc.types.Type, Node, Comment, Subscribable, UniformResourceLocatable, ProjectNextOwner, ProjectV2Owner):
+    __schema__ = github_schema
+    __field_names__ = ('head_repository', 'merged', 'merged_at')
+    head_repository = sgqlc.types.Field('Repository', graphql_name='headRepository')
+    merged = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='merged')
+    merged_at = sgqlc.types.Field(DateTime, graphql_name='mergedAt')
+
+
+class Ref(sgqlc.types.Type, Node):
+    __schema__ = github_schema
+    __field_names__ = ('target',)
+    target = sgqlc.types.Field(GitObject, graphql_name='target')
+
+
+class Repository(sgqlc.types.Type, Node, ProjectOwner, PackageOwner, Subscribable, Starrable, UniformResourceLocatable, RepositoryInfo):
+    __schema__ = github_schema
+    __field_names__ = ('allow_update_branch', 'auto_merge_allowed', 'code_of_conduct', 'database_id', 'default_branch_ref', 'delete_branch_on_merge', 'disk_usage', 'forking_allowed', 'forks', 'funding_links', 'is_blank_issues_enabled', 'is_disabled', 'is_empty', 'is_security_policy_enabled', 'is_user_configuration_repository', 'issues', 'languages', 'merge_commit_allowed', 'parent', 'primary_language', 'pull_requests', 'rebase_merge_allowed', 'repository_topics', 'security_policy_url', 'squash_merge_allowed', 'squash_pr_title_used_as_default', 'ssh_url', 'temp_clone_token', 'viewer_can_administer', 'viewer_can_update_topics', 'viewer_default_commit_email', 'viewer_default_merge_method', 'viewer_permission', 'viewer_possible_commit_emails', 'watchers')
+    allow_update_branch = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='allowUpdateBranch')
+    auto_merge_allowed = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='autoMergeAllowed')
+    code_of_conduct = sgqlc.types.Field(CodeOfConduct, graphql_name='codeOfConduct')
+    database_id = sgqlc.types.Field(Int, graphql_name='databaseId')
+    default_branch_ref = sgqlc.types.Field(Ref, graphql_name='defaultBranchRef')
+    delete_branch_on_merge = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='deleteBranchOnMerge')
+    disk_usage = sgqlc.types.Field(Int, graphql_name='diskUsage')
+    forking_allowed = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='forkingAllowed')
+    forks = sgqlc.types.Field(sgqlc.types.non_null(RepositoryConnection), graphql_name='forks', args=sgqlc.types.ArgDict((
+        ('privacy', sgqlc.types.Arg(RepositoryPrivacy, graphql_name='privacy', default=None)),
+        ('order_by', sgqlc.types.Arg(RepositoryOrder, graphql_name='orderBy', default=None)),
+        ('affiliations', sgqlc.types.Arg(sgqlc.types.list_of(RepositoryAffiliation), graphql_name='affiliations', default=None)),
+        ('owner_affiliations', sgqlc.types.Arg(sgqlc.types.list_of(RepositoryAffiliation), graphql_name='ownerAffiliations', default=('OWNER', 'COLLABORATOR'))),
+        ('is_locked', sgqlc.types.Arg(Boolean, graphql_name='isLocked', default=None)),
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+))
+    )
+    funding_links = sgqlc.types.Field(sgqlc.types.non_null(sgqlc.types.list_of(sgqlc.types.non_null(FundingLink))), graphql_name='fundingLinks')
+    is_blank_issues_enabled = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isBlankIssuesEnabled')
+    is_disabled = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isDisabled')
+    is_empty = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isEmpty')
+    is_security_policy_enabled = sgqlc.types.Field(Boolean, graphql_name='isSecurityPolicyEnabled')
+    is_user_configuration_repository = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='isUserConfigurationRepository')
+    issues = sgqlc.types.Field(sgqlc.types.non_null(IssueConnection), graphql_name='issues', args=sgqlc.types.ArgDict((
+        ('order_by', sgqlc.types.Arg(IssueOrder, graphql_name='orderBy', default=None)),
+        ('labels', sgqlc.types.Arg(sgqlc.types.list_of(sgqlc.types.non_null(String)), graphql_name='labels', default=None)),
+        ('states', sgqlc.types.Arg(sgqlc.types.list_of(sgqlc.types.non_null(IssueState)), graphql_name='states', default=None)),
+        ('filter_by', sgqlc.types.Arg(IssueFilters, graphql_name='filterBy', default=None)),
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+))
+    )
+    languages = sgqlc.types.Field(LanguageConnection, graphql_name='languages', args=sgqlc.types.ArgDict((
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+        ('order_by', sgqlc.types.Arg(LanguageOrder, graphql_name='orderBy', default=None)),
+))
+    )
+    merge_commit_allowed = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='mergeCommitAllowed')
+    parent = sgqlc.types.Field('Repository', graphql_name='parent')
+    primary_language = sgqlc.types.Field(Language, graphql_name='primaryLanguage')
+    pull_requests = sgqlc.types.Field(sgqlc.types.non_null(PullRequestConnection), graphql_name='pullRequests', args=sgqlc.types.ArgDict((
+        ('states', sgqlc.types.Arg(sgqlc.types.list_of(sgqlc.types.non_null(PullRequestState)), graphql_name='states', default=None)),
+        ('labels', sgqlc.types.Arg(sgqlc.types.list_of(sgqlc.types.non_null(String)), graphql_name='labels', default=None)),
+        ('head_ref_name', sgqlc.types.Arg(String, graphql_name='headRefName', default=None)),
+        ('base_ref_name', sgqlc.types.Arg(String, graphql_name='baseRefName', default=None)),
+        ('order_by', sgqlc.types.Arg(IssueOrder, graphql_name='orderBy', default=None)),
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+))
+    )
+    rebase_merge_allowed = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='rebaseMergeAllowed')
+    repository_topics = sgqlc.types.Field(sgqlc.types.non_null(RepositoryTopicConnection), graphql_name='repositoryTopics', args=sgqlc.types.ArgDict((
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+))
+    )
+    security_policy_url = sgqlc.types.Field(URI, graphql_name='securityPolicyUrl')
+    squash_merge_allowed = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='squashMergeAllowed')
+    squash_pr_title_used_as_default = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='squashPrTitleUsedAsDefault')
+    ssh_url = sgqlc.types.Field(sgqlc.types.non_null(GitSSHRemote), graphql_name='sshUrl')
+    temp_clone_token = sgqlc.types.Field(String, graphql_name='tempCloneToken')
+    viewer_can_administer = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='viewerCanAdminister')
+    viewer_can_update_topics = sgqlc.types.Field(sgqlc.types.non_null(Boolean), graphql_name='viewerCanUpdateTopics')
+    viewer_default_commit_email = sgqlc.types.Field(String, graphql_name='viewerDefaultCommitEmail')
+    viewer_default_merge_method = sgqlc.types.Field(sgqlc.types.non_null(PullRequestMergeMethod), graphql_name='viewerDefaultMergeMethod')
+    viewer_permission = sgqlc.types.Field(RepositoryPermission, graphql_name='viewerPermission')
+    viewer_possible_commit_emails = sgqlc.types.Field(sgqlc.types.list_of(sgqlc.types.non_null(String)), graphql_name='viewerPossibleCommitEmails')
+    watchers = sgqlc.types.Field(sgqlc.types.non_null(UserConnection), graphql_name='watchers', args=sgqlc.types.ArgDict((
+        ('after', sgqlc.types.Arg(String, graphql_name='after', default=None)),
+        ('before', sgqlc.types.Arg(String, graphql_name='before', default=None)),
+        ('first', sgqlc.types.Arg(Int, graphql_name='first', default=None)),
+        ('last', sgqlc.types.Arg(Int, graphql_name='last', default=None)),
+))
+    )
+
+
+class RepositoryTopic(sgqlc.types.Type, Node, UniformResourceLocatable):
+    __schema__ = github_schema
+    __field_names__ = ()
+
+
+class User(sgqlc.types.Type, Node, Actor, PackageOwner, ProjectOwner, ProjectNextOwner, ProjectV2Owner, RepositoryOwner, UniformResourceLocatable, ProfileOwner):
+    __schema__ = github_schema
+    __field_names__ = ('company', 'twitter_username')
+    company = sgqlc.types.Field(String, graphql_name='company')
+    twitter_username = sgqlc.types.Field(String, graphql_name='twitterUsername')
+
+
+
+########################################################################
+# Unions
+########################################################################
+
+########################################################################
+# Schema Entry Points
+########################################################################
+github_schema.query_type = Query
+github_schema.mutation_type = None
+github_schema.subscription_type = None
+
@@ -0,0 +1,208 @@
+"""
+Write github_schema_min.py, the part of the Github schema forksearch selects.
+
+The full github_schema.py has ~1300 classes and importing it dominates the
+start of the CLI. This keeps the types reachable from the documents
+forksearch sends: their selected fields, the arguments of those fields and
+whatever input objects, enums and scalars the arguments need.
+
+Run from forksearch/ after update-schema.sh, or after adding a selection:
+
+    python -m mygithub.trim_schema
+"""
+import os
+import io
+import json
+import argparse
+from pathlib import Path
+
+HERE = Path(__file__).parent
+SCHEMA_JSON = HERE / "github_schema.json"
+SCHEMA_MIN = HERE / "github_schema_min.py"
+
+
+class Captured(Exception):
+    pass
+
+
+class CaptureEndpoint:
+    """Endpoint that records the document it is sent and stops the caller"""
+
+    def __init__(self):
+        self.documents = []
+
+    def __call__(self, query, variables=None, *args, **kwargs):
+        self.documents.append(str(query))
+        raise Captured()
+
+
+def documents():
+    """Every GraphQL document forksearch sends, built with the loaded schema"""
+    import gh_utils
+    import templates
+    from crawler import CONNECTIONS
+    from profiles import PROFILES
+
+    docs = [
+        str(templates.crawl_page_query(tuple(sorted(CONNECTIONS)), newest_first, profile))
+        for profile in PROFILES
+        for newest_first in [(), tuple(sorted(templates.NEWEST_FIRST))]
+    ]
+    docs += [
+        str(templates.pulls_batch_query(1)),
+        str(templates.issue_comments_query()),
+        str(templates.repo_info_query()),
+        str(templates.nodes_pushed_at_query()),
+        str(templates.nodes_head_oid_query()),
+    ]
+    endpoint = CaptureEndpoint()
+    calls = [
+        lambda: gh_utils.query_repos([("owner", "name")], endpoint),
+        lambda: gh_utils.upstreams(["owner/name"], endpoint),
+        lambda: gh_utils.query_repo_language(endpoint, "name", "owner"),
+        lambda: gh_utils.get_repos_by_owner(endpoint, "owner"),
+    ]
+    for call in calls:
+        try:
+            call()
+        except Captured:
+            pass
+    return docs + endpoint.documents
+
+
+def introspection(path=SCHEMA_JSON):
+    with open(path) as f:
+        return json.load(f)["data"]
+
+
+def used_fields(schema, docs):
+    """Map of type name -> names of the fields the documents select on it.
+
+    Types that are only named (fragment conditions, variable types) map to
+    an empty set.
+    """
+    from graphql import TypeInfo, TypeInfoVisitor, Visitor, get_named_type, parse, visit
+
+    used = {}
+
+    class Usage(Visitor):
+        def __init__(self, type_info):
+            super().__init__()
+            self.type_info = type_info
+
+        def enter_field(self, node, *_):
+            parent = self.type_info.get_parent_type()
+            field = self.type_info.get_field_def()
+            if field is None or node.name.value.startswith("__"):
+                return
+            used.setdefault(parent.name, set()).add(node.name.value)
+            used.setdefault(get_named_type(field.type).name, set())
+
+        def enter_named_type(self, node, *_):
+            used.setdefault(node.name.value, set())
+
+    for doc in docs:
+        type_info = TypeInfo(schema)
+        visit(parse(doc), TypeInfoVisitor(type_info, Usage(type_info)))
+    return used
+
+
+def trim(data, used):
+    """Introspection data reduced to the used types and fields"""
+    types = {t["name"]: t for t in data["__schema"]["types"]}
+    keep = {name: set(fields) for name, fields in used.items()}
+    keep.setdefault(data["__schema"]["queryType"]["name"], set())
+
+    def named(ref):
+        while ref.get("ofType"):
+            ref = ref["ofType"]
+        return ref["name"]
+
+    # fields selected through an interface are fields of its implementations
+    for name, fields in list(keep.items()):
+        if types[name]["kind"] == "INTERFACE":
+            for impl in types[name]["possibleTypes"] or ():
+                if impl["name"] in keep:
+                    keep[impl["name"]] |= fields
+    # and the other way round, so objects inherit their fields in the order
+    # of the full schema and auto selected fields come out the same
+    for name, fields in list(keep.items()):
+        for iface in types[name]["interfaces"] or ():
+            shared = fields & {f["name"] for f in types[iface["name"]]["fields"]}
+            if shared:
+                keep.setdefault(iface["name"], set()).update(shared)
+
+    # close over the types the kept fields return and take as arguments
+    pending = list(keep)
+    while pending:
+        t = types[pending.pop()]
+        reached = [named(f["type"]) for f in t["inputFields"] or ()]
+        if t["kind"] in ("OBJECT", "INTERFACE"):
+            if not keep[t["name"]]:
+                # a type needs a field, keep the first if none is selected
+                keep[t["name"]].add(t["fields"][0]["name"])
+            for field in t["fields"]:
+                if field["name"] in keep[t["name"]]:
+                    reached += [named(field["type"])] + [named(arg["type"]) for arg in field["args"]]
+        for name in reached:
+            if name not in keep:
+                keep[name] = set()
+                pending.append(name)
+
+    out = []
+    for t in data["__schema"]["types"]:
+        name = t["name"]
+        if name.startswith("__"):
+            out.append(t)
+            continue
+        if name not in keep:
+            continue
+        t = dict(t)
+        if t["kind"] in ("OBJECT", "INTERFACE"):
+            t["fields"] = [f for f in t["fields"] if f["name"] in keep[name]]
+        if t.get("interfaces") is not None:
+            t["interfaces"] = [i for i in t["interfaces"] if i["name"] in keep]
+        if t.get("possibleTypes") is not None:
+            t["possibleTypes"] = [p for p in t["possibleTypes"] if p["name"] in keep]
+        out.append(t)
+
+    schema = dict(data["__schema"], types=out, mutationType=None, subscriptionType=None)
+    schema["directives"] = [
+        d for d in data["__schema"]["directives"]
+        if all(named(arg["type"]) in keep for arg in d["args"])
+    ]
+    return {"__schema": schema}
+
+
+def generate(docs, schema_json=SCHEMA_JSON, schema_name="github_schema"):
+    """Source of the trimmed sgqlc schema module"""
+    from graphql import build_client_schema
+    from sgqlc.codegen.schema import CodeGen
+
+    data = introspection(schema_json)
+    used = used_fields(build_client_schema(data), docs)
+    trimmed = trim(data, used)
+    # the trimmed schema must still make sense on its own
+    build_client_schema(trimmed)
+
+    out = io.StringIO()
+    out.write("# Generated by mygithub/trim_schema.py from github_schema.json, do not edit.\n")
+    CodeGen(schema_name, trimmed["__schema"], out.write, docstrings=False).write()
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=str(SCHEMA_MIN))
+    args = parser.parse_args()
+
+    # build the documents against every type Github has
+    os.environ["FORKSEARCH_FULL_SCHEMA"] = "1"
+    source = generate(documents())
+    with open(args.output, "w") as f:
+        f.write(source)
+    print(f"Wrote {args.output} ({source.count('class ')} classes)")
+
+
+if __name__ == "__main__":
+    main()
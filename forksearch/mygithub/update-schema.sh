@@ -18,3 +18,5 @@ fi
 sgqlc-codegen schema --docstrings github_schema.json github_schema.py || exit 1
 
 python3 -c 'import github_schema' || exit 1
+
+(cd .. && python3 -m mygithub.trim_schema) || exit 1
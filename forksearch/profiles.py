@@ -0,0 +1,47 @@
+"""
+Crawl profiles: the connections a crawl pages through and the fields it selects
+"""
+
+
+class CrawlProfile:
+    """What a crawl fetches.
+
+    connections are the names of the connections to page through, the
+    others are not requested at all. user_fields, org_fields and
+    fork_fields are sgqlc (snake_case) field names selected on owners and
+    forks; None keeps the defaults of selections.py. Fields a profile leaves
+    out are left alone in neo4j, not cleared.
+    """
+
+    def __init__(self, name: str, connections: tuple, user_fields: tuple = None, org_fields: tuple = None,
+                 fork_fields: tuple = None, description: str = ""):
+        self.name = name
+        self.connections = tuple(sorted(connections))
+        self.user_fields = user_fields
+        self.org_fields = org_fields
+        self.fork_fields = fork_fields
+        self.description = description
+
+    def __repr__(self):
+        return f"CrawlProfile({self.name!r})"
+
+
+OWNER_MINIMAL = ("login", "__typename__")
+
+PROFILES = {
+    profile.name: profile
+    for profile in [
+        CrawlProfile(
+            "full", ("watchers", "forks", "stargazers"),
+            description="every connection with every owner field",
+        ),
+        CrawlProfile(
+            "forks-minimal", ("forks",),
+            user_fields=OWNER_MINIMAL,
+            org_fields=OWNER_MINIMAL,
+            fork_fields=("id", "name", "is_fork", "pushed_at", "created_at", "__typename__"),
+            description="only forks, their owners' login and type",
+        ),
+    ]
+}
+DEFAULT_PROFILE = "full"
@@ -0,0 +1,195 @@
+"""
+Rate limit governor shared by the GraphQL and REST calls of the CLI
+"""
+import time
+import logging
+import threading
+import datetime
+from contextlib import contextmanager
+from dateutil import parser
+
+log = logging.getLogger(__name__)
+
+# category -> (requests or points per window, window in seconds)
+LIMITS = {
+    "graphql": (5000, 3600),
+    "core": (5000, 3600),
+    "search": (30, 60),
+    # code search has a budget of its own, a third of the other searches
+    "code_search": (10, 60),
+}
+# x-ratelimit-resource values that share the budget of a category
+RESOURCES = {
+    "graphql": "graphql",
+    "core": "core",
+    "search": "search",
+    "code_search": "code_search",
+}
+# share of a window kept back; below it requests are spread over the window
+RESERVE = 0.2
+# Github asks for no more than 100 concurrent requests, stay well below
+SECONDARY_CONCURRENCY = 10
+# wait on a secondary limit that came without a Retry-After header
+SECONDARY_BACKOFF = 60
+
+
+def parse_reset(value):
+    """Epoch seconds of a reset given as epoch seconds or an ISO date"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return float(value)
+    return parser.parse(value).timestamp()
+
+
+def is_rate_limited(errors):
+    """True if Github refused a request because of a primary or secondary limit"""
+    return any(
+        "secondary rate limit" in e.get("message", "") or e.get("message", "").startswith("API rate limit exceeded")
+        for e in errors
+    )
+
+
+class TokenBucket:
+    """Budget of one rate limit window.
+
+    Github refills a category all at once when its window resets. The bucket
+    lets requests through freely while more than RESERVE of the window is
+    left, then spaces them out so what remains lasts until the reset instead
+    of running dry and sleeping off the rest of the hour. The server's view
+    (remaining, reset) overrides the local count whenever it is known.
+    """
+
+    def __init__(self, limit: int, period: float, reserve: float = RESERVE):
+        self.limit = limit
+        self.period = period
+        self.reserve = reserve
+        self.remaining = limit
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.last_grant = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.reset_at is None:
+            self.reset_at = now + self.period
+        elif now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.period
+
+    def wait_time(self, cost: int = 1, now: float = None):
+        """Seconds to wait before cost points may be spent"""
+        now = now or time.time()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.remaining < cost:
+            return self.reset_at - now
+        if self.remaining - cost >= self.limit * self.reserve:
+            return 0
+        interval = (self.reset_at - now) * cost / self.remaining
+        return max(0, self.last_grant + interval - now)
+
+    def acquire(self, cost: int = 1):
+        while True:
+            with self.lock:
+                now = time.time()
+                wait = self.wait_time(cost, now)
+                if wait <= 0:
+                    self.remaining -= cost
+                    self.last_grant = now
+                    return
+            if wait > 1:
+                until = datetime.datetime.fromtimestamp(now + wait)
+                log.warning(f"Pacing rate limit. Sleeping until {until} ({wait:.0f} seconds)")
+            time.sleep(wait)
+
+    def update(self, remaining: int, reset=None, limit: int = None):
+        """Take the server's view of the window"""
+        with self.lock:
+            if limit:
+                self.limit = limit
+            self.remaining = remaining
+            reset = parse_reset(reset)
+            if reset:
+                self.reset_at = reset
+
+    def block(self, seconds: float):
+        """Let nothing through for seconds, as asked by Retry-After"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+    def headroom(self):
+        with self.lock:
+            self._refill(time.time())
+            return self.remaining
+
+
+class RateLimitGovernor:
+    """One bucket per API category plus a cap on concurrent requests.
+
+    Callers acquire before they send (request()) and feed every response
+    back (observe_headers(), observe_graphql(), observe_errors()), so the
+    buckets follow what Github reports rather than what we guessed.
+    """
+
+    def __init__(self, limits: dict = LIMITS, concurrency: int = SECONDARY_CONCURRENCY):
+        self.buckets = {category: TokenBucket(*limit) for category, limit in limits.items()}
+        self.slots = threading.BoundedSemaphore(concurrency)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the concurrent request slots"""
+        with self.slots:
+            yield
+
+    @contextmanager
+    def request(self, category: str, cost: int = 1):
+        self.buckets[category].acquire(cost)
+        with self.slot():
+            yield
+
+    def observe_headers(self, headers, category: str = None, bucket: TokenBucket = None):
+        """Feed x-ratelimit-* and Retry-After response headers"""
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        category = RESOURCES.get(headers.get("x-ratelimit-resource"), category)
+        bucket = bucket or self.buckets.get(category)
+        if bucket is None:
+            return
+        if "x-ratelimit-remaining" in headers:
+            bucket.update(
+                int(headers["x-ratelimit-remaining"]),
+                headers.get("x-ratelimit-reset"),
+                int(headers.get("x-ratelimit-limit", 0)) or None,
+            )
+        if "retry-after" in headers:
+            bucket.block(int(headers["retry-after"]))
+
+    def observe_graphql(self, rate_limit, bucket: TokenBucket = None):
+        """Feed the rateLimit object (cost, remaining, resetAt) of a query"""
+        bucket = bucket or self.buckets["graphql"]
+        bucket.update(rate_limit["remaining"], rate_limit.get("resetAt"), rate_limit.get("limit"))
+
+    def observe_errors(self, errors, category: str = "graphql", bucket: TokenBucket = None):
+        """Block a bucket on rate limit errors. Returns True if one was hit."""
+        bucket = bucket or self.buckets[category]
+        limited = False
+        for e in errors:
+            message = e.get("message", "")
+            headers = {k.lower(): v for k, v in (e.get("headers") or {}).items()}
+            if "secondary rate limit" in message:
+                retry_after = int(headers.get("retry-after", SECONDARY_BACKOFF))
+                log.warning(f"Secondary rate limit hit. Holding {category} requests for {retry_after} seconds.")
+                bucket.block(retry_after)
+                limited = True
+            elif message.startswith("API rate limit exceeded"):
+                reset = headers.get("x-ratelimit-reset") or time.time() + SECONDARY_BACKOFF
+                bucket.update(0, reset)
+                limited = True
+        return limited
+
+
+# governor of the process, used by gh_utils for every Github call
+governor = RateLimitGovernor()
@@ -0,0 +1,184 @@
+"""
+Selections of the Github objects and connections forksearch queries
+"""
+from __future__ import annotations
+from re import sub
+from mygithub import schema
+
+
+def camel_case(s: str):
+    """Rewrite s with unallowable graphql characters to camelCase"""
+    s = sub(r"(_|-|\.)+", " ", s).title().replace(" ", "")
+    return "".join([s[0].lower(), s[1:]])
+
+
+# fields selected by default, crawl profiles (profiles.py) can select fewer
+USER_FIELDS = ("id", "login", "company", "url", "email", "twitter_username", "website_url", "name", "__typename__")
+ORG_FIELDS = ("id", "login", "url", "email", "website_url", "name", "__typename__")
+FORK_FIELDS = ("url", "__typename__", "is_fork", "name", "id", "pushed_at", "created_at")
+
+
+def set_user_fields(n: schema.User, fields=USER_FIELDS):
+    """Set the fields we use on a Github User object.
+
+    See https://docs.github.com/en/graphql/reference/objects#user for all
+    options. Note that sqglc replaces camelCase for snake_case.
+    """
+    n.__fields__(**dict.fromkeys(fields, True))
+
+
+def set_org_fields(n: schema.Organization, fields=ORG_FIELDS):
+    """Set the fields we use on a Github Organization object.
+
+    See https://docs.github.com/en/graphql/reference/objects#organization for
+    all options. Note that sqglc replaces camelCase for snake_case.
+    """
+    n.__fields__(**dict.fromkeys(fields, True))
+
+
+def set_owner_fields(n: schema.RepositoryOwner):
+    """Set the fields we use on a RepositoryOwner.
+
+    See https://docs.github.com/en/graphql/reference/interfaces#repositoryowner
+    Note that the repositoryOwner is actually a sum type that can include
+    information for a User or Organization.
+    """
+    n.__fields__(url=True, __typename__=True)
+    u = n.__as__(schema.User)
+    set_user_fields(u)
+    o = n.__as__(schema.Organization)
+    set_org_fields(o)
+
+def set_parent_fields(n: schema.Repository):
+    n.__fields__(url=True)
+    set_owner_fields(n.owner)
+
+def select_comments(repo, last=100, before=None):
+    args = {}
+    args["last"] = last
+    if before:
+        args["before"] = before
+
+    conn = repo.issues(**args)
+    # repo.pull_requests.__fields__(__typename__=True)
+    conn.page_info.__fields__(has_previous_page=True, start_cursor=True)
+    #either that or body (habbud). either publishedAt or createdAt or updatedAt
+    comment_args={}
+    comment_args["last"] = 100
+    comment_args["before"] = None
+    comment_conn=conn.nodes.comments(**comment_args)
+    comment_conn.nodes.__fields__(body_text=True, updated_at=True)
+    comment_conn.page_info.__fields__(has_previous_page=True, start_cursor=True)
+    # __fields__(__typename__=True, body_text=True, published_at=True) 
+    # repository(, __alias__=camel_case(name))
+
+def select_pulls(repo, last=100, before=None):
+    args = {}
+    args["last"] = last
+    if before:
+        args["before"] = before
+
+    conn = repo.pull_requests(**args)
+    # repo.pull_requests.__fields__(__typename__=True)
+    conn.page_info.__fields__(has_previous_page=True, start_cursor=True)
+    conn.nodes.__fields__(__typename__=True, merged_at=True, merged=True)
+    conn.nodes.head_repository.__fields__(name_with_owner=True, __typename__=True, url=True)
+    # repository(, __alias__=camel_case(name))
+    # conn.nodes.owner.__fields__(__typename__="Organization")
+    # set_owner_fields(conn.nodes.owner)
+
+def select_forks(repo, first=100, after=None, owner_fields=set_owner_fields, order_by=None, fields=FORK_FIELDS):
+    args = {}
+    args["first"] = first
+    if after:
+        args["after"] = after
+    if order_by:
+        args["order_by"] = order_by
+
+    conn = repo.forks(**args)
+    conn.__fields__(total_count=True, __typename__=True)
+    conn.page_info.__fields__(has_next_page=True, end_cursor=True)
+    conn.nodes.__fields__(**dict.fromkeys(fields, True))
+    # forks at the same commit have the same patch status
+    conn.nodes.default_branch_ref.target.__fields__(oid=True)
+    # conn.nodes.owner.__fields__(__typename__="Organization")
+    owner_fields(conn.nodes.owner)
+
+def select_stargazers(repo, first=100, after=None, user_fields=set_user_fields, order_by=None):
+    """Helper to paginate a Repository.stargazers() query.
+
+    edges only carry starredAt, in the same order as nodes.
+    """
+    args = {}
+    args["first"] = first
+    if after:
+        args["after"] = after
+    if order_by:
+        args["order_by"] = order_by
+
+    conn = repo.stargazers(**args)
+    conn.page_info.__fields__(has_next_page=True, end_cursor=True)
+    conn.edges.__fields__(starred_at=True)
+    user_fields(conn.nodes)
+
+
+def select_watchers(repo, first=100, after=None, user_fields=set_user_fields):
+    args = {}
+    args["first"] = first
+    if after:
+        args["after"] = after
+
+    conn = repo.watchers(**args)
+    conn.__fields__(total_count=True)
+    conn.page_info.__fields__(has_next_page=True, end_cursor=True)
+    user_fields(conn.nodes)
+
+
+def select_repo(
+    op,
+    owner,
+    name,
+    forks_page_cursor=None,
+    stargazers_page_cursor=None,
+    watchers_page_cursor=None,
+):
+    r = op.repository(name=name, owner=owner, __alias__=camel_case(name))
+    r.__fields__(
+        id=True,
+        url=True,
+        created_at=True,
+        description=True,
+        description_html=True,
+        has_issues_enabled=True,
+        homepage_url=True,
+        is_archived=True,
+        is_in_organization=True,
+        is_locked=True,
+        is_mirror=True,
+        license_info=True,
+        lock_reason=True,
+        mirror_url=True,
+        name=True,
+        name_with_owner=True,
+        pushed_at=True,
+        short_description_html=True,
+        updated_at=True,
+        code_of_conduct=True,
+        stargazer_count=True,
+        fork_count=True,
+        database_id=True,
+        funding_links=True,
+        is_security_policy_enabled=True,
+        primary_language=True,
+        security_policy_url=True,
+        ssh_url=True,
+        __typename__=True,
+        is_fork=True,
+    )
+
+    set_owner_fields(r.owner)
+    r.repository_topics(first=10)
+
+    select_forks(r, after=forks_page_cursor)
+    select_stargazers(r, after=stargazers_page_cursor)
+    select_watchers(r, after=watchers_page_cursor)
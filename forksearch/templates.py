@@ -0,0 +1,202 @@
+"""
+GraphQL documents compiled once and sent with variables
+"""
+from functools import lru_cache
+from sgqlc.operation import Operation, Fragment  # noqa: I900
+from sgqlc.types import ID, Int, String, Variable, list_of, non_null  # noqa: I900
+from selections import *
+from profiles import PROFILES, DEFAULT_PROFILE
+
+
+class CompiledQuery:
+    """A query document built and serialized once.
+
+    Between two requests of the same shape only owner, name and cursors
+    change, so they are $variables and the sgqlc selection tree is walked
+    once per shape instead of once per page. query_with_retry sends the
+    document as is, together with the variables of the request.
+    """
+
+    def __init__(self, name: str, variables: dict, build):
+        op = Operation(schema.Query, name=name, variables=variables)
+        build(op)
+        op.rate_limit()
+        self.name = name
+        self.document = bytes(op).decode()
+
+    def __str__(self):
+        return self.document
+
+    def __bytes__(self):
+        return self.document.encode()
+
+    def rate_limit(self):
+        """rateLimit is already selected when the document is compiled"""
+
+
+@lru_cache(maxsize=None)
+def owner_fragments(profile: str = DEFAULT_PROFILE):
+    """UserFields and OrgFields fragments with the owner fields of a crawl profile"""
+    p = PROFILES[profile]
+    user = Fragment(schema.User, "UserFields")
+    set_user_fields(user, p.user_fields or USER_FIELDS)
+    org = Fragment(schema.Organization, "OrgFields")
+    set_org_fields(org, p.org_fields or ORG_FIELDS)
+    return user, org
+
+
+def spread_user_fields(n, profile: str = DEFAULT_PROFILE):
+    n.__fragment__(owner_fragments(profile)[0])
+
+
+def spread_owner_fields(n, profile: str = DEFAULT_PROFILE):
+    n.__fields__(url=True, __typename__=True)
+    user, org = owner_fragments(profile)
+    n.__fragment__(user)
+    n.__fragment__(org)
+
+
+CONNECTION_SELECTIONS = {
+    "watchers": lambda r, first, after, order_by, profile: select_watchers(
+        r, first=first, after=after, user_fields=lambda n: spread_user_fields(n, profile.name)),
+    "forks": lambda r, first, after, order_by, profile: select_forks(
+        r, first=first, after=after, owner_fields=lambda n: spread_owner_fields(n, profile.name), order_by=order_by,
+        fields=profile.fork_fields or FORK_FIELDS),
+    "stargazers": lambda r, first, after, order_by, profile: select_stargazers(
+        r, first=first, after=after, user_fields=lambda n: spread_user_fields(n, profile.name), order_by=order_by),
+}
+# connection -> field it is paged by, newest first, in a delta crawl
+NEWEST_FIRST = {
+    "forks": "CREATED_AT",
+    "stargazers": "STARRED_AT",
+}
+
+
+@lru_cache(maxsize=None)
+def crawl_page_query(connections: tuple, newest_first: tuple = (), profile: str = DEFAULT_PROFILE):
+    """One page of each of connections, a sorted tuple of connection names.
+
+    The connections in newest_first are ordered by NEWEST_FIRST, descending.
+    Owners and forks get the fields of the crawl profile.
+    Variables: owner, name and <connection>First/<connection>After.
+    """
+    variables = {"owner": non_null(String), "name": non_null(String)}
+    for field in connections:
+        variables[f"{field}First"] = Int
+        variables[f"{field}After"] = String
+
+    def build(op):
+        r = op.repository(owner=Variable("owner"), name=Variable("name"), __alias__="repository")
+        r.__fields__(id=True)
+        for field in connections:
+            order_by = {"field": NEWEST_FIRST[field], "direction": "DESC"} if field in newest_first else None
+            CONNECTION_SELECTIONS[field](r, Variable(f"{field}First"), Variable(f"{field}After"), order_by, PROFILES[profile])
+
+    return CompiledQuery("crawlPage", variables, build)
+
+
+def crawl_page_variables(owner: str, name: str, pages: dict):
+    """Variables of crawl_page_query for pages, connection -> (first, after)"""
+    variables = {"owner": owner, "name": name}
+    for field, (first, after) in pages.items():
+        variables[f"{field}First"] = first
+        variables[f"{field}After"] = after
+    return variables
+
+
+@lru_cache(maxsize=None)
+def pulls_batch_query(size: int):
+    """The last pull requests of size repositories, aliased fork0..fork<size-1>.
+
+    Variables: last, and owner<i>, name<i>, before<i> for every alias.
+    """
+    variables = {"last": Int}
+    for i in range(size):
+        variables[f"owner{i}"] = non_null(String)
+        variables[f"name{i}"] = non_null(String)
+        variables[f"before{i}"] = String
+
+    def build(op):
+        for i in range(size):
+            r = op.repository(owner=Variable(f"owner{i}"), name=Variable(f"name{i}"), __alias__=f"fork{i}")
+            r.__fields__(id=True)
+            select_pulls(r, last=Variable("last"), before=Variable(f"before{i}"))
+
+    return CompiledQuery("pullsBatch", variables, build)
+
+
+def pulls_batch_variables(last: int, repos):
+    """Variables of pulls_batch_query for repos, a list of (owner, name, before)"""
+    variables = {"last": last}
+    for i, (owner, name, before) in enumerate(repos):
+        variables[f"owner{i}"] = owner
+        variables[f"name{i}"] = name
+        variables[f"before{i}"] = before
+    return variables
+
+
+@lru_cache(maxsize=None)
+def issue_comments_query():
+    """The last issues of a repository with their comments. Variables: owner, name, before."""
+    variables = {"owner": non_null(String), "name": non_null(String), "before": String}
+
+    def build(op):
+        r = op.repository(owner=Variable("owner"), name=Variable("name"), __alias__="repository")
+        r.__fields__(id=True)
+        select_comments(r, last=100, before=Variable("before"))
+
+    return CompiledQuery("issueComments", variables, build)
+
+
+@lru_cache(maxsize=None)
+def repo_info_query():
+    """Counters, owner and parent of a repository. Variables: owner, name."""
+    variables = {"owner": non_null(String), "name": non_null(String)}
+
+    def build(op):
+        r = op.repository(owner=Variable("owner"), name=Variable("name"), __alias__="repository")
+        r.__fields__(
+            id=True,
+            is_fork=True,
+            url=True,
+            name=True,
+            fork_count=True,
+            stargazer_count=True,
+            pushed_at=True,
+        )
+        # set up fields for owner
+        user, org = owner_fragments()
+        r.owner.__fragment__(user)
+        r.owner.__fragment__(org)
+        # get count of watchers
+        r.watchers.__fields__(total_count=True)
+        r.parent.__fields__(name_with_owner=True)
+
+    return CompiledQuery("repoInfo", variables, build)
+
+
+@lru_cache(maxsize=None)
+def nodes_pushed_at_query():
+    """pushedAt, name, owner and head oid of repositories by node id. Variables: ids, at most 100."""
+    variables = {"ids": non_null(list_of(non_null(ID)))}
+
+    def build(op):
+        r = op.nodes(ids=Variable("ids")).__as__(schema.Repository)
+        r.__fields__(id=True, name=True, pushed_at=True)
+        r.owner.__fields__(login=True)
+        r.default_branch_ref.target.__fields__(oid=True)
+
+    return CompiledQuery("nodesPushedAt", variables, build)
+
+
+@lru_cache(maxsize=None)
+def nodes_head_oid_query():
+    """Commit at the head of the default branch of repositories by node id. Variables: ids, at most 100."""
+    variables = {"ids": non_null(list_of(non_null(ID)))}
+
+    def build(op):
+        r = op.nodes(ids=Variable("ids")).__as__(schema.Repository)
+        r.__fields__(id=True, pushed_at=True)
+        r.default_branch_ref.target.__fields__(oid=True)
+
+    return CompiledQuery("nodesHeadOid", variables, build)
@@ -0,0 +1,81 @@
+"""
+Pool of Github tokens sharing the GraphQL rate budget of a crawl
+"""
+import os
+import threading
+from ratelimit import LIMITS, TokenBucket, governor
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+
+def load_tokens(token=None, token_file=None, env="GH_TOKENS"):
+    """Collect tokens from --token, a file (one per line) and GH_TOKENS.
+
+    GH_TOKENS holds tokens separated by commas or whitespace. Duplicates are
+    dropped, the order of first appearance is kept.
+    """
+    tokens = [token] if token else []
+    if token_file:
+        with open(token_file, "r") as f:
+            tokens += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    tokens += os.getenv(env, "").replace(",", " ").split()
+    return list(dict.fromkeys(tokens))
+
+
+class TokenPool:
+    """Callable like a RequestsEndpoint, but backed by several tokens.
+
+    Every token has its own GraphQL TokenBucket, fed by the rateLimit that
+    query_with_retry adds to each query. Every request goes to the token
+    that can send soonest, the one with the most points left among those,
+    so a token running low or benched by a rate limit is simply not picked
+    anymore; the bucket only makes a request wait once every token is low.
+    """
+
+    def __init__(self, endpoints):
+        self.endpoints = list(endpoints)
+        assert self.endpoints, "TokenPool needs at least one token"
+        self.buckets = [TokenBucket(*LIMITS["graphql"]) for _ in self.endpoints]
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_tokens(cls, tokens, url: str = GRAPHQL_URL, timeout: float = 600.0):
+        from sgqlc.endpoint.requests import RequestsEndpoint  # noqa: I900
+        endpoints = [
+            RequestsEndpoint(url, {"Authorization": "bearer " + token}, timeout=timeout)
+            for token in tokens
+        ]
+        return cls(endpoints)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def headroom(self, i):
+        return self.buckets[i].headroom()
+
+    def wait_time(self, i):
+        bucket = self.buckets[i]
+        with bucket.lock:
+            return bucket.wait_time()
+
+    def pick(self):
+        """Index of the token with the shortest wait, then the most headroom"""
+        with self.lock:
+            return min(range(len(self.endpoints)), key=lambda i: (self.wait_time(i), -self.headroom(i)))
+
+    def record(self, i, rate_limit):
+        """Update the budget of token i from a GraphQL rateLimit object"""
+        governor.observe_graphql(rate_limit, bucket=self.buckets[i])
+
+    def __call__(self, query, variables=None, operation_name=None, extra_headers=None, timeout=None):
+        i = self.pick()
+        self.buckets[i].acquire()
+        d = self.endpoints[i](query, variables, operation_name, extra_headers, timeout)
+        governor.observe_headers(d.get("headers"), "graphql", bucket=self.buckets[i])
+        rate_limit = (d.get("data") or {}).get("rateLimit")
+        if rate_limit:
+            self.record(i, rate_limit)
+        if d.get("errors"):
+            # a rate limited token is benched until Github resets it
+            governor.observe_errors(d["errors"], bucket=self.buckets[i])
+        return d
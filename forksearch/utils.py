@@ -1,9 +1,14 @@
+from __future__ import annotations
 from types import FunctionType
 from database import GitDB
+from database.db import head_oid
 from gh_utils import *
-from rich import print, table
-from typer import confirm as Confirm
+from profiles import DEFAULT_PROFILE
+from mirror import NetworkMirror
+from ancestry import AncestryIndex
+from rich import print
 import datetime
+import re
 
 HOST = "localhost"
 BOLTPORT = 7687
@@ -20,6 +25,7 @@ def print_info(gh_info, db_info, owner, repo):
         caption = ""
 
     # print info in table
+    from rich import table
     t = table.Table(title=f'Repository {owner}/{repo}', caption=caption)
     t.add_column("", justify="right", style="cyan", no_wrap=True)
     t.add_column("Database", justify="right", no_wrap=True)
@@ -93,46 +99,136 @@ def query_organizations(endpoint: RequestsEndpoint, db: GitDB, owner: str, name:
         # TBD: run SBOM on the organization
     print("Found {} libraries in the organization, The Repos: ".format(len(all_libs), all_libs))
 
-def query_unpatched_orgs(endpoint, db, id, patch_date):
-     forks_repos = db.get_forks_info(id)    
-     orgs_forks_repos = db.get_orgs_forks_info(id)    
-     if(len(forks_repos) == 0):
+def group_by_head(forks, heads=None):
+    """Forks grouped by their head oid, from heads or the stored head_oid; unknown heads are groups of one"""
+    heads = heads or {}
+    groups = {}
+    for fork in forks:
+        head = heads.get(fork['id']) or fork.get('head_oid')
+        groups.setdefault(head or ('fork', fork['id']), []).append(fork)
+    return groups
+
+def evaluate_patches(endpoint, db, forks, patch_date, parent_nameWithOwner, wait_for_ratelimiter=False):
+    """{fork id: True if patched} for a patch of patch_date, looking up only forks pushed since their last check"""
+    patched = {}
+    candidates = []
+    for fork in forks:
+        if fork.get('pushedAt') and fork['pushedAt'] < patch_date:
+            patched[fork['id']] = False
+        elif fork.get('patch_checked') and fork['patch_checked'] == fork.get('pushedAt'):
+            patched[fork['id']] = bool(fork.get('patch_date')) and fork['patch_date'] >= patch_date
+        else:
+            candidates.append(fork)
+    print(f"{len(forks) - len(candidates)} forks decided from the database, looking up {len(candidates)}...")
+
+    # one lookup per head commit, forks at the same commit get its answer
+    groups = group_by_head(candidates)
+    print(f"{len(candidates)} forks share {len(groups)} heads")
+    # stored with patch_checked, so it has to hold for the current pushedAt
+    # and not come from the response cache
+    dates = find_patch_dates(endpoint, [(group[0]['login'], group[0]['name']) for group in groups.values()],
+                             parent_nameWithOwner, wait_for_ratelimiter, use_cache=False)
+    rows = []
+    for group, date in zip(groups.values(), dates):
+        date = date.strftime('%Y-%m-%dT%H:%M:%SZ') if date else None
+        for fork in group:
+            patched[fork['id']] = bool(date) and date >= patch_date
+            rows.append({'id': fork['id'], 'patch_date': date, 'patch_checked': fork.get('pushedAt')})
+    if rows:
+        db.update_forks(rows)
+    return patched
+
+def evaluate_containment(endpoint, forks, oids, parent_nameWithOwner, headers, wait_for_ratelimiter=False):
+    """{fork id: True if patched} by whether the head of a fork contains any of the fix commits oids"""
+    dates = [commit_date(parent_nameWithOwner, oid, headers) for oid in oids]
+    committed = min(dates) if dates and all(dates) else None
+    patched = {}
+    candidates = []
+    # forks may be a stream, only the candidates are kept
+    for fork in forks:
+        if committed and fork.get('pushedAt') and fork['pushedAt'] < committed:
+            patched[fork['id']] = False
+        else:
+            candidates.append(fork)
+    print(f"{len(patched)} forks not pushed to since the fix, comparing {len(candidates)}...")
+
+    # heads stored by the crawl are current until the fork is pushed to,
+    # which refresh_forks (--update) records along with the new head
+    heads = query_head_oids(endpoint, [fork['id'] for fork in candidates if not fork.get('head_oid')], wait_for_ratelimiter)
+    groups = group_by_head(candidates, heads)
+    print(f"{len(candidates)} forks share {len(groups)} heads")
+    for head, group in groups.items():
+        nameWithOwner = group[0]['login'] + '/' + group[0]['name']
+        contained = isinstance(head, str) and any(contains_commit(nameWithOwner, head, oid, headers) for oid in oids)
+        for fork in group:
+            patched[fork['id']] = contained
+    return patched
+
+def evaluate_mirror(mirror, forks, oids, parent_nameWithOwner):
+    """{fork id: True if patched} by whether the head of a fork contains any of oids, checked in a local mirror"""
+    new = not mirror.head(parent_nameWithOwner)
+    if not all(mirror.resolve(oid) for oid in oids):
+        mirror.fetch([parent_nameWithOwner])
+    oids = [mirror.resolve(oid) or oid for oid in oids]
+    dates = [date for date in map(mirror.commit_date, oids) if date]
+    committed = min(dates) if dates else None
+    patched = {}
+    candidates = []
+    for fork in forks:
+        if committed and fork.get('pushedAt') and fork['pushedAt'] < committed:
+            patched[fork['id']] = False
+        else:
+            candidates.append(fork)
+
+    index = AncestryIndex(mirror)
+    names = [fork['login'] + '/' + fork['name'] for fork in candidates]
+    fetch = []
+    for fork, name in zip(candidates, names):
+        head = fork.get('head_oid')
+        if head and (head in index or mirror.has_commit(head)):
+            index.set_head(name, head)
+        else:
+            fetch.append(name)
+    print(f"{len(patched)} forks not pushed to since the fix, {len(candidates) - len(fetch)} at known heads, "
+          f"fetching {len(fetch)} into {mirror.path}...")
+    if fetch:
+        failed = mirror.fetch(fetch)
+        if failed:
+            print(f"{len(failed)} forks could not be fetched")
+    if new:
+        # bitmaps for a freshly built mirror, later fetches only add packs
+        mirror.pack()
+    for name in fetch:
+        index.set_head(name, mirror.head(name))
+    contained = index.patched(oids)
+    index.close()
+    for fork, name in zip(candidates, names):
+        patched[fork['id']] = contained.get(name, False)
+    return patched
+
+def query_unpatched_orgs(endpoint, db, id, patch_date, parent_nameWithOwner, wait_for_ratelimiter=False,
+                         fix_oids=None, headers=None, mirror=None):
+     """Logins of the organizations owning an unpatched fork of id"""
+     patched = None
+     if fix_oids:
+         forks = (repo['fork'] for repo in db.get_forks_info(id))
+         if mirror:
+             statuses = evaluate_mirror(mirror, forks, fix_oids, parent_nameWithOwner)
+         else:
+             statuses = evaluate_containment(endpoint, forks, fix_oids, parent_nameWithOwner, headers or {}, wait_for_ratelimiter)
+         patched = [fork_id for fork_id, contained in statuses.items() if contained]
+     else:
+         # forks pushed before the patch or already checked are settled in neo4j
+         evaluate_patches(endpoint, db, db.get_patch_candidates(id, patch_date), patch_date, parent_nameWithOwner, wait_for_ratelimiter)
+
+     result = db.get_unpatched(id, patch_date, patched)
+     if(result['forks'] == 0):
          print("Local DataBase seems to be empty, please query the repo first.")
          exit(0)
-         
-    #  print("DEBUG HABBUD: forks_repos={}".format(forks_repos))
-     unpatched_forks=set()
-     for repo in forks_repos:
-         fork_name= repo['fork']['name']
-         fork_owner= repo['fork']['login']
-         fork_patch_date= repo['fork']['patch_date']
-
-         if(fork_patch_date=='None'):
-             name_with_owner=fork_owner+'/'+fork_name
-             unpatched_forks.add(name_with_owner)
-             continue
-        #  fork_merged_date = datetime.datetime.strptime(fork_patch_date, '%Y-%m-%dT%H:%M:%SZ')
-         if(patch_date>fork_patch_date):
-             unpatched_forks.add(fork_owner+fork_name)  
-     unpatched_orgs_forks=set()
-     unpatched_orgs_logins=set()
-     if(len(orgs_forks_repos) != 0):
-         for repo in orgs_forks_repos:
-            fork_name= repo['fork']['name']
-            fork_owner= repo['fork']['login']
-            fork_patch_date= repo['fork']['patch_date']
-            if(fork_patch_date=='None'):
-                unpatched_orgs_forks.add(fork_owner+fork_name)
-                unpatched_orgs_logins.add(repo['org_login'])
-                continue
-            #  fork_merged_date = datetime.datetime.strptime(fork_patch_date, '%Y-%m-%dT%H:%M:%SZ')
-            if(patch_date>fork_patch_date):
-                unpatched_orgs_forks.add(fork_owner+fork_name) 
-                unpatched_orgs_logins.add(repo['org_login']) 
-     print("Found {} unpatched forks out of {}, unpatched_forks={}".format(len(unpatched_forks),len(forks_repos), unpatched_forks))
-     print("Found {} unpatched organizations forks out of {}, unpatched_orgs_logins={}".format(len(unpatched_orgs_forks), len(orgs_forks_repos),unpatched_orgs_logins))
-         
-     return unpatched_orgs_logins
+     print("Found {} unpatched forks out of {}, unpatched_forks={}".format(len(result['unpatched_forks']), result['forks'], set(result['unpatched_forks'])))
+     print("Found {} unpatched organizations forks out of {}, unpatched_orgs_logins={}".format(result['unpatched_org_forks'], result['org_forks'], set(result['unpatched_orgs'])))
+
+     return set(result['unpatched_orgs'])
 
 # def check_repo_patch(endpoint, owner, name, parent_nameWithOwner, patch_date, wait_for_ratelimiter) :
 #      has_previous_page = True
@@ -170,49 +266,6 @@ def query_unpatched_orgs(endpoint, db, id, patch_date):
         #     after_cursor = data['pullRequests']['pageInfo']['endCursor']
         
 
-def find_patch_date(endpoint, owner, name, parent_nameWithOwner, wait_for_ratelimiter) :
-     has_previous_page = True
-     start_cursor = None
-     date=None
-    #  print("DEBUG HABBUD: find_patch_date: owner={}, name={}, parent_nameWithOwner={}".format(owner, name, parent_nameWithOwner))
-     while has_previous_page:
-        op = Operation(schema.Query)
-        r = op.repository(owner=owner, name=name, __alias__=camel_case(name))
-        r.__fields__(id=True)
-        # r.__fields__(pull_requests=True)
-        select_pulls(r, last=100, before=start_cursor)
-        p = query_with_retry(endpoint, op, wait_for_ratelimiter=wait_for_ratelimiter)
-        data = p['data'][camel_case(name)]
-        # print("DEBUG HABBUD query_patched_orgs: data={}".format(data['pullRequests']['nodes']))
-        has_previous_page = data['pullRequests']['pageInfo']['hasPreviousPage']
-        start_cursor = data['pullRequests']['pageInfo']['startCursor']
-        # print("DEBUG HABBUD query_patched_org: pageInfo={}".format(data['pullRequests']['pageInfo']))
-        for pull in data['pullRequests']['nodes']:
-            if(pull['mergedAt'] != None and pull['headRepository'] != None):
-                merged_date = datetime.datetime.strptime(pull['mergedAt'], '%Y-%m-%dT%H:%M:%SZ')
-                pull_repo_nameWithOwner=pull['headRepository']['nameWithOwner']
-                # if(not pull_repo_name.contains(name)):
-                # print("DEBUG HABBUD check_repo_patch: pull_repo_nameWithOwner={}, parent_nameWithOwner={}".format(pull_repo_nameWithOwner,parent_nameWithOwner))
-                #     exit(0)
-                if(pull_repo_nameWithOwner == parent_nameWithOwner):
-                    date=merged_date
-                    has_previous_page=False
-    #  print("DEBUG HABBUD query_patched_org: owner={}, repo={}, date={}".format(owner, name ,date))
-     return date
-        # exit(0)
-        # if len(data['pullRequests']['nodes']) > 0:
-        #     after_cursor = data['pullRequests']['pageInfo']['endCursor']
-
-def filter_data(data):
-    fields=['watchers', 'forks', 'stargazers']
-    for field in fields:
-        if(data[field]['nodes'] == None):
-            data[field]['nodes']=[]
-        else:
-            data[field]['nodes']=list(filter(None, data[field]['nodes']))
-        continue
-    return data
-            
 def find_patch_date_by_CVE(endpoint, owner, name, cve_info, wait_for_ratelimiter) :
     has_previous_page = True
     start_cursor = None
@@ -220,12 +273,9 @@ def find_patch_date_by_CVE(endpoint, owner, name, cve_info, wait_for_ratelimiter
     cve_number= cve_info.split('-')[2].lower()
     # print("DEBUG HABBUD: find_patch_date_by_CVE: owner={}, cve_year={}, cve_number={}".format(owner, cve_year, cve_number))
     while has_previous_page:
-        op = Operation(schema.Query)
-        r = op.repository(owner=owner, name=name, __alias__=camel_case(name))
-        r.__fields__(id=True)
-        select_comments(r, last=100, before=start_cursor)
-        p = query_with_retry(endpoint, op, wait_for_ratelimiter=wait_for_ratelimiter)
-        data = p['data'][camel_case(name)]
+        p = query_with_retry(endpoint, issue_comments_query(), wait_for_ratelimiter=wait_for_ratelimiter,
+                             variables={"owner": owner, "name": name, "before": start_cursor})
+        data = p['data']['repository']
         has_previous_page = data['issues']['pageInfo']['hasPreviousPage']
         start_cursor = data['issues']['pageInfo']['startCursor']
         # print("DEBUG HABBUD query_patched_org: pageInfo={}".format(data['issues']['pageInfo']))
@@ -245,84 +295,33 @@ def find_patch_date_by_CVE(endpoint, owner, name, cve_info, wait_for_ratelimiter
                     return comment['updatedAt']
     return None
 
-def query_all(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, db_info: dict, id: str, wait_for_ratelimiter: bool = False, pushedAt: str = None):
+def refresh_forks(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, id: str, wait_for_ratelimiter: bool = False):
+    """Store the new pushedAt and head of the forks pushed to, returns how many were"""
+    stored = db.get_forks_pushed_at(id)
+    print(f"Checking {len(stored)} forks of [italic blue]{owner}/{name}[/italic blue] for new pushes...")
+    current = query_pushed_at(endpoint, [fork['id'] for fork in stored], wait_for_ratelimiter)
+    changed = [
+        current[fork['id']] for fork in stored
+        if current.get(fork['id']) and current[fork['id']]['pushedAt'] != fork['pushedAt']
+    ]
+    db.update_forks([{'id': fork['id'], 'pushedAt': fork['pushedAt'], 'head_oid': head_oid(fork)} for fork in changed])
+    gone = sum(1 for fork in stored if not current.get(fork['id']))
+    print(f"{len(changed)} forks were pushed to, {gone} are gone from Github")
+    return len(changed)
+
+def query_all(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, db_info: dict, id: str, wait_for_ratelimiter: bool = False, pushedAt: str = None,
+              delta: bool = False, profile: str = DEFAULT_PROFILE):
     print (f"Querying all watchers, forks, and stargazers for [italic blue]{owner}/{name}[/italic blue]...")
 
-    has_next_page = True
-    repo_nameWithOwner=owner+'/'+name
-    # initialize watchers/forks/stargazers counts
-    counts = {
-        'watchers': db_info['watchers'],
-        'forks': db_info['forks'],
-        'stargazers': db_info['stargazers'],
-    }
-
-    # initialize cursor from db_info
-    cursors = {
-        'watchers': db_info['watcher_cursor'],
-        'forks': db_info['fork_cursor'],
-        'stargazers': db_info['stargazer_cursor'],
-    }
-    if db_info['pushedAt'] == None:
-        db.update_pushedAt(id, pushedAt)
-    while has_next_page:
-        op = Operation(schema.Query)
-        r = op.repository(owner=owner, name=name, __alias__=camel_case(name))
-        r.__fields__(id=True)
-        # r.__fields__(pull_requests=True)
-        select_watchers(r, after=cursors['watchers'])
-        select_forks(r, after=cursors['forks'])
-        select_stargazers(r, after=cursors['stargazers'])
-
-        p = query_with_retry(endpoint, op, wait_for_ratelimiter=wait_for_ratelimiter)
-        
-        data = p['data'][camel_case(name)]
-        # add all edged in database
-        #check data doesnt have nulls
-        for fork in data['forks']['nodes']:
-            fork_owner=fork['owner']['login']
-            fork_name=fork['name']
-            # print("DEBUG HABBUD: fork_owner={}, fork_name={}".format(fork_owner, fork_name))
-            date=find_patch_date(endpoint, fork_owner, fork_name, repo_nameWithOwner, wait_for_ratelimiter)
-            fork['patch_date']=str(date)
-        # print("DEBUG HABBUD: data={}".format(data['forks']['nodes']))
-        # exit(0)
-
-        try:
-            result = db.add_all_edges(data)
-        except:
-            data=filter_data(data)
-            db.add_all_edges(data)
-
-        # get all length of nodes
-        watchers_len = len(data['watchers']['nodes'])
-        # print("DEBUG HABBUD: data['forks']['nodes']={}".format(data['forks']['nodes']))
-        forks_len = len(data['forks']['nodes'])
-        stargazers_len = len(data['stargazers']['nodes'])
-
-        # update counts
-        counts['watchers'] += watchers_len
-        counts['forks'] += forks_len
-        counts['stargazers'] += stargazers_len
-
-        # print count of watchers/forks/stargazers
-        print(f"Watchers: {counts['watchers']}, Forks: {counts['forks']}, Stargazers: {counts['stargazers']} ({len(result)} edges added)")
-
-        # update has_next_page if any of the page has next page
-        has_next_page = data['watchers']['pageInfo']['hasNextPage'] \
-            or data['forks']['pageInfo']['hasNextPage'] \
-            or data['stargazers']['pageInfo']['hasNextPage']
-
-        if watchers_len > 0:
-            cursors['watchers'] = data['watchers']['pageInfo']['endCursor']
-        if forks_len > 0:
-            cursors['forks'] = data['forks']['pageInfo']['endCursor']
-        if stargazers_len > 0:
-            cursors['stargazers'] = data['stargazers']['pageInfo']['endCursor']
+    import asyncio
+    from crawler import Crawler
+    crawler = Crawler(endpoint, db, wait_for_ratelimiter=wait_for_ratelimiter, profile=profile)
+    asyncio.run(crawler.crawl(owner, name, db_info, id, pushedAt, delta))
 
 def request_repo(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, info: FunctionType = print_info, 
                  is_recursive: bool = False, do_request: bool = False, wait_for_ratelimiter: bool =False, refresh: bool = False, 
-                 REST_header: List[str] = []):
+                 REST_header: List[str] = [], update: bool = False,
+                 delta: bool = False, profile: str = DEFAULT_PROFILE, mirror: bool = False):
     # print("DEBUG HABBUD: query_info with endpoint={}, db={}, owner={}, name={}".format(endpoint, db, owner, name))
     if(refresh) :
         db.delete_repo_info(owner, name)
@@ -333,23 +332,33 @@ def request_repo(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, i
     if gh_info['isFork']:
         if is_recursive:
             parent_owner, parent_name = gh_info['parent']['nameWithOwner'].split('/')
-            request_repo(endpoint, db, parent_owner, parent_name, info, is_recursive, do_request)
+            request_repo(endpoint, db, parent_owner, parent_name, info, is_recursive, do_request, wait_for_ratelimiter, refresh,
+                         REST_header, update, delta, profile, mirror)
             info(gh_info, db_info, owner, name)
 
         elif Confirm("Do you want to request parent repo?"):
             parent_owner, parent_name = gh_info['parent']['nameWithOwner'].split('/')
 
-            request_repo(endpoint, db, parent_owner, parent_name, info, is_recursive, do_request)
+            request_repo(endpoint, db, parent_owner, parent_name, info, is_recursive, do_request, wait_for_ratelimiter, refresh,
+                         REST_header, update, delta, profile, mirror)
             info(gh_info, db_info, owner, name)
 
-    if do_request or refresh or Confirm("Do you want to query all data?") :
-        query_all(endpoint, db, owner, name, db_info, gh_info['id'], wait_for_ratelimiter, gh_info['pushedAt'])
+    if update:
+        # pick up the stargazers and forks newer than the last crawl, then
+        # the pushes that invalidate stored patch dates
+        query_all(endpoint, db, owner, name, db_info, gh_info['id'], wait_for_ratelimiter, gh_info['pushedAt'], True, profile)
+        if db_info['forks']:
+            refresh_forks(endpoint, db, owner, name, gh_info['id'], wait_for_ratelimiter)
+        db.update_pushedAt(gh_info['id'], gh_info['pushedAt'])
+    elif do_request or refresh or Confirm("Do you want to query all data?") :
+        query_all(endpoint, db, owner, name, db_info, gh_info['id'], wait_for_ratelimiter, gh_info['pushedAt'], delta, profile)
 
     gh_info, db_info = query_info(endpoint = endpoint, db = db, owner = owner, name = name)
     info(gh_info, db_info, owner, name)
 
     if do_request or Confirm("Do you want to query unpatched forks?"):
-        patch_info = input("Please enter the date of the patch or the CVE number: (e.g. 2021-12-31 or CVE-2021-1234))").lstrip().rstrip()
+        patch_info = input("Please enter the date of the patch, the CVE number or the SHAs of the fix commits: (e.g. 2021-12-31, CVE-2021-1234 or 3f2a9c1,7d41e0b))").lstrip().rstrip()
+        patch_date, fix_oids = None, None
 
         # Try to convert the user's input to an integer
         
@@ -358,6 +367,10 @@ def request_repo(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, i
         # print("DEBUG HABBUD: split_date={}".format(split_date))
         if(len(split_date) == 3 and split_date[0].isdigit() and split_date[1].isdigit() and split_date[2].isdigit()):
             patch_date=patch_info
+        elif re.fullmatch(r'[0-9a-fA-F]{7,40}([\s,]+[0-9a-fA-F]{7,40})*', patch_info):
+            # a fork is patched if its default branch contains one of the
+            # fixes, the commit of a patch or one of its backports
+            fix_oids=re.split(r'[\s,]+', patch_info.lower())
         elif(patch_info.split('-')[0].lower() == 'CVE'.lower()):
             # print("DEBUG HABBUD: patch_info={}".format(patch_info))
             #TODO: habbud support this flow 
@@ -366,7 +379,11 @@ def request_repo(endpoint: RequestsEndpoint, db: GitDB, owner: str, name: str, i
                 print("Could not find a commit associated with the given CVE, please confirm the CVE number and try again.")
                 return
             print("Found a commit associated with the given CVE, the commit date is {}".format(patch_date))
-        unpatched_orgs_forks=query_unpatched_orgs(endpoint, db, gh_info['id'], patch_date)
+        else:
+            print("Not a date, a CVE number or a commit SHA: {}".format(patch_info))
+            return
+        unpatched_orgs_forks=query_unpatched_orgs(endpoint, db, gh_info['id'], patch_date, owner + '/' + name, wait_for_ratelimiter,
+                                                  fix_oids, REST_header, NetworkMirror(owner + '/' + name) if mirror else None)
 
 
 
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the CLI modules import each other as top level modules (run from forksearch/)
+sys.path.insert(0, str(Path(__file__).parent.parent / "forksearch"))
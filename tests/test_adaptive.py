@@ -0,0 +1,15 @@
+from adaptive import PageSize
+
+
+def test_page_size_shrinks_to_the_minimum_and_grows_on_fast_cheap_pages():
+    size = PageSize(100, minimum=5)
+    assert [size.shrink() and int(size) for _ in range(6)] == [50, 25, 12, 6, 5, False]
+
+    size.observe(latency=9.0)
+    size.observe(latency=0.1, cost=3)
+    assert int(size) == 5
+    size.observe(latency=0.1, cost=1)
+    assert int(size) == 15
+    for _ in range(20):
+        size.observe(latency=0.1)
+    assert int(size) == 100
@@ -0,0 +1,59 @@
+from ancestry import AncestryIndex
+from mirror import NetworkMirror
+from tests.test_mirror import commit, git
+
+
+class CountingSource:
+    """A NetworkMirror that counts the ancestry walks it is asked for"""
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self.path = mirror.path
+        self.walks = 0
+
+    def has_commit(self, oid):
+        return self.mirror.has_commit(oid)
+
+    def is_ancestor(self, ancestor, oid):
+        self.walks += 1
+        return self.mirror.is_ancestor(ancestor, oid)
+
+
+def test_index_evaluates_backports_incrementally(tmp_path):
+    # main gets a fix, release-1 a backport of it; forks follow either branch
+    up = tmp_path / "up" / "repo"
+    up.mkdir(parents=True)
+    git(up, "init", "-q", "-b", "main")
+    commit(up, "base")
+    git(up, "branch", "release-1")
+    fix = commit(up, "fix")
+    git(up, "checkout", "-q", "release-1")
+    backport = commit(up, "backport")
+    commit(up, "release work")
+    git(up, "checkout", "-q", "main")
+    for fork, branch in [("main", "main"), ("release", "release-1"), ("stale", "main~1")]:
+        path = tmp_path / fork / "repo"
+        git(tmp_path, "clone", "-q", str(up), str(path))
+        git(path, "checkout", "-q", branch)
+
+    mirror = NetworkMirror("up/repo", tmp_path / "mirror.git", url_format=str(tmp_path) + "/{}")
+    mirror.fetch(["main/repo", "release/repo", "stale/repo"])
+    source = CountingSource(mirror)
+    index = AncestryIndex(source, tmp_path / "index.sqlite")
+    for fork in ["main/repo", "release/repo", "stale/repo"]:
+        index.set_head(fork, mirror.head(fork))
+
+    assert index.unpatched([fix, backport]) == {"stale/repo"}
+    assert index.unpatched([fix]) == {"release/repo", "stale/repo"}
+    walks = source.walks
+
+    # known fixes and heads are answered from the index alone
+    assert index.patched([backport]) == {"main/repo": False, "release/repo": True, "stale/repo": False}
+    assert source.walks == walks
+
+    # a fork moving to a head the index knows costs no walk, and it all persists
+    index.set_head("stale/repo", mirror.head("main/repo"))
+    assert source.walks == walks
+    index.close()
+    index = AncestryIndex(source, tmp_path / "index.sqlite")
+    assert index.unpatched([fix, backport]) == set()
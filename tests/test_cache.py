@@ -0,0 +1,46 @@
+import os
+import time
+import gh_utils
+from cache import ResponseCache, cache_key
+from tests.test_patch_dates import PullsEndpoint, pull
+
+
+def test_key_ignores_formatting():
+    assert cache_key("query {\n  viewer { login }\n}") == cache_key("query { viewer { login } }")
+    assert cache_key("query { a }", {"x": 1}) != cache_key("query { a }", {"x": 2})
+
+
+def test_entries_expire_by_query_type(tmp_path):
+    cache = ResponseCache(tmp_path / "c.sqlite", ttls={"pulls": 100, "default": 0})
+    cache.put("{ repository { pullRequests(last: 1) { totalCount } } }", None, {"data": 1})
+    cache.put("{ viewer { login } }", None, {"data": 2})
+    time.sleep(0.01)
+
+    assert cache.get("{ repository { pullRequests(last: 1) { totalCount } } }") == {"data": 1}
+    assert cache.get("{ viewer { login } }") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=200)
+    cache.put("{ a }", None, {"data": os.urandom(30).hex()})
+    time.sleep(0.01)
+    cache.put("{ b }", None, {"data": os.urandom(30).hex()})
+    time.sleep(0.01)
+    cache.get("{ a }")
+    cache.put("{ c }", None, {"data": os.urandom(30).hex()})
+
+    assert cache.get("{ b }") is None
+    assert cache.get("{ a }") is not None
+
+
+def test_query_with_retry_reads_through(tmp_path):
+    endpoint = PullsEndpoint({"a": [[pull("2021-01-01T00:00:00Z", "up/repo")]]})
+    gh_utils.set_response_cache(ResponseCache(tmp_path / "c.sqlite"))
+    try:
+        first = gh_utils.find_patch_dates(endpoint, [("a", "repo")], "up/repo")
+        second = gh_utils.find_patch_dates(endpoint, [("a", "repo")], "up/repo")
+    finally:
+        gh_utils.set_response_cache(None)
+
+    assert first == second
+    assert endpoint.calls == 1
@@ -0,0 +1,246 @@
+import pytest
+import time
+import asyncio
+import threading
+import gh_utils
+from cache import ResponseCache
+from crawler import Crawler
+
+EMPTY = {"pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": []}
+
+
+class StargazersEndpoint:
+    """Serves total stargazers in pages, every other connection is empty"""
+
+    def __init__(self, total):
+        self.total = total
+
+    def __call__(self, op, variables=None, timeout=None):
+        start = int(variables.get("stargazersAfter") or 0)
+        end = min(start + variables["stargazersFirst"], self.total)
+        repo = {"id": "R", "watchers": EMPTY, "forks": EMPTY}
+        repo["stargazers"] = {
+            "pageInfo": {"hasNextPage": end < self.total, "endCursor": str(end)},
+            "nodes": [{"login": f"s{i}", "__typename": "User"} for i in range(start, end)],
+        }
+        return {"data": {"repository": repo}}
+
+
+class SlowFirstWriteDB:
+    """The first batch takes longest to commit, so batches finish out of order"""
+
+    def __init__(self):
+        self.written = set()
+        self.batches = 0
+        self.cursor_updates = []
+        self.lock = threading.Lock()
+
+    def add_all_edges(self, batch):
+        with self.lock:
+            self.batches += 1
+            first = self.batches == 1
+        time.sleep(0.2 if first else 0)
+        logins = [n["login"] for n in batch["stargazers"]["nodes"]]
+        with self.lock:
+            self.written.update(logins)
+        return logins
+
+    def update_cursors(self, id, cursors):
+        with self.lock:
+            self.cursor_updates.append((cursors, set(self.written)))
+
+
+def test_cursors_advance_only_over_committed_pages():
+    db = SlowFirstWriteDB()
+    crawler = Crawler(StargazersEndpoint(50), db, writers=3, coalesce=1, page_sizes={"stargazers": 10})
+    info = {"watchers": 0, "forks": 0, "stargazers": 0, "watcher_cursor": None, "fork_cursor": None,
+            "stargazer_cursor": None, "pushedAt": "2023-01-01"}
+    counts = asyncio.run(crawler.crawl("me", "repo", info, "R"))
+
+    assert counts["stargazers"] == 50
+    assert db.written == {f"s{i}" for i in range(50)}
+    cursors = [int(c["stargazer_cursor"]) for c, _ in db.cursor_updates]
+    assert cursors == sorted(cursors) and cursors[-1] == 50
+    for c, written in db.cursor_updates:
+        # every stargazer before a stored cursor is already in the database
+        assert {f"s{i}" for i in range(int(c["stargazer_cursor"]))} <= written
+
+
+class NewestFirstEndpoint:
+    """Serves total stargazers newest first, s<i> starred on day i"""
+
+    def __init__(self, total):
+        self.total = total
+        self.served = 0
+
+    def __call__(self, op, variables=None, timeout=None):
+        assert "STARRED_AT" in str(op)
+        start = int(variables.get("stargazersAfter") or 0)
+        end = min(start + variables["stargazersFirst"], self.total)
+        self.served = max(self.served, end)
+        days = range(self.total - 1 - start, self.total - 1 - end, -1)
+        repo = {"id": "R", "watchers": EMPTY, "forks": EMPTY}
+        repo["stargazers"] = {
+            "pageInfo": {"hasNextPage": end < self.total, "endCursor": str(end)},
+            "edges": [{"starredAt": f"2023-01-{d + 1:02d}T00:00:00Z"} for d in days],
+            "nodes": [{"login": f"s{d}", "__typename": "User"} for d in days],
+        }
+        return {"data": {"repository": repo}}
+
+
+def test_delta_crawl_stops_at_the_high_water_mark():
+    db = SlowFirstWriteDB()
+    endpoint = NewestFirstEndpoint(30)
+    crawler = Crawler(endpoint, db, page_sizes={"stargazers": 5})
+    # stargazers up to s19 were crawled before
+    info = {"watchers": 0, "forks": 0, "stargazers": 20, "watcher_cursor": None, "fork_cursor": None,
+            "stargazer_cursor": "20", "stargazer_hwm": "2023-01-20T00:00:00Z", "pushedAt": "2023-01-01"}
+    counts = asyncio.run(crawler.crawl("me", "repo", info, "R", delta=True))
+
+    assert {f"s{i}" for i in range(20, 30)} <= db.written <= {f"s{i}" for i in range(19, 30)}
+    assert counts["stargazers"] == 20 + len(db.written)
+    # the oldest stargazers are never requested
+    assert endpoint.served < 30
+    # no cursor of the newest first pages, and the mark moves once at the end
+    assert [c for c, _ in db.cursor_updates if "stargazer_cursor" in c] == []
+    assert db.cursor_updates[-1][0] == {"stargazer_hwm": "2023-01-30T00:00:00Z"}
+
+
+def test_delta_crawls_do_not_read_cached_pages(tmp_path):
+    endpoint = NewestFirstEndpoint(30)
+    info = {"watchers": 0, "forks": 0, "stargazers": 20, "watcher_cursor": None, "fork_cursor": None,
+            "stargazer_cursor": "20", "stargazer_hwm": "2023-01-20T00:00:00Z", "pushedAt": "2023-01-01"}
+    gh_utils.set_response_cache(ResponseCache(tmp_path / "c.sqlite"))
+    try:
+        first = SlowFirstWriteDB()
+        asyncio.run(Crawler(endpoint, first, page_sizes={"stargazers": 5}).crawl("me", "repo", info, "R", delta=True))
+        # s30 to s34 star the repository before the next delta crawl
+        endpoint.total = 35
+        second = SlowFirstWriteDB()
+        info = dict(info, stargazer_hwm=first.cursor_updates[-1][0]["stargazer_hwm"])
+        asyncio.run(Crawler(endpoint, second, page_sizes={"stargazers": 5}).crawl("me", "repo", info, "R", delta=True))
+    finally:
+        gh_utils.set_response_cache(None)
+
+    assert {f"s{i}" for i in range(30, 35)} <= second.written
+    assert second.cursor_updates[-1][0] == {"stargazer_hwm": "2023-01-35T00:00:00Z"}
+
+
+class FailingDB(SlowFirstWriteDB):
+    def add_all_edges(self, batch):
+        raise RuntimeError("neo4j is gone")
+
+
+def test_a_failing_writer_stops_the_crawl():
+    crawler = Crawler(StargazersEndpoint(500), FailingDB(), writers=2, queue_size=1, page_sizes={"stargazers": 10})
+    info = {"watchers": 0, "forks": 0, "stargazers": 0, "watcher_cursor": None, "fork_cursor": None,
+            "stargazer_cursor": None, "pushedAt": "2023-01-01"}
+    with pytest.raises(RuntimeError):
+        asyncio.run(asyncio.wait_for(crawler.crawl("me", "repo", info, "R"), 5))
+
+
+class TimeoutEndpoint(StargazersEndpoint):
+    """Times out on pages of more than threshold stargazers, and the first failures_at of the rest"""
+
+    def __init__(self, total, threshold, failures_at=0):
+        super().__init__(total)
+        self.threshold = threshold
+        self.failures_at = failures_at
+        self.firsts = []
+
+    def __call__(self, op, variables=None, timeout=None):
+        first = variables["stargazersFirst"]
+        self.firsts.append(first)
+        if first <= self.threshold and self.failures_at:
+            self.failures_at -= 1
+        elif first <= self.threshold:
+            return super().__call__(op, variables, timeout)
+        return {"errors": [{"message": "Timeout on validation of query"}]}
+
+
+def crawl_stargazers(endpoint):
+    db = SlowFirstWriteDB()
+    info = {"watchers": 0, "forks": 0, "stargazers": 0, "watcher_cursor": None, "fork_cursor": None,
+            "stargazer_cursor": None, "pushedAt": "2023-01-01"}
+    asyncio.run(Crawler(endpoint, db, page_sizes={"stargazers": 100}).crawl("me", "repo", info, "R"))
+    return db.written
+
+
+def test_timed_out_pages_are_halved_and_grow_back():
+    endpoint = TimeoutEndpoint(60, threshold=30)
+    assert crawl_stargazers(endpoint) == {f"s{i}" for i in range(60)}
+    # halved down to a size that goes through, then grown by 10 after
+    # every fast page until it times out again
+    assert endpoint.firsts == [100, 50, 25, 35, 17, 27]
+
+
+def test_pages_at_the_minimum_size_fall_back_to_plain_retries():
+    endpoint = TimeoutEndpoint(3, threshold=5, failures_at=2)
+    assert crawl_stargazers(endpoint) == {"s0", "s1", "s2"}
+    # the adaptive request at 5 times out, then the plain retries go on at 5
+    assert endpoint.firsts == [100, 50, 25, 12, 6, 5, 5, 5]
+
+
+class ConnectionsEndpoint:
+    """Serves totals[field] watchers, forks and stargazers, recording the connections of every document"""
+
+    def __init__(self, totals):
+        self.totals = totals
+        self.documents = []
+
+    def __call__(self, op, variables=None, timeout=None):
+        fields = sorted(field for field in self.totals if field + "First" in variables)
+        self.documents.append(fields)
+        repo = {"id": "R"}
+        for field in fields:
+            start = int(variables.get(field + "After") or 0)
+            end = min(start + variables[field + "First"], self.totals[field])
+            nodes = [{"login": f"{field[0]}{i}", "__typename": "User"} for i in range(start, end)]
+            if field == "forks":
+                nodes = [{"id": f"F{i}", "owner": {"login": f"f{i}", "__typename": "User"}} for i in range(start, end)]
+            repo[field] = {"pageInfo": {"hasNextPage": end < self.totals[field], "endCursor": str(end)}, "nodes": nodes}
+        return {"data": {"repository": repo}}
+
+
+class RecordingDB:
+    def __init__(self):
+        self.nodes = {"watchers": [], "forks": [], "stargazers": []}
+        self.cursors = {}
+
+    def add_all_edges(self, batch):
+        for field, page in batch.items():
+            if field != "id":
+                self.nodes[field] += [node.get("login") or node["id"] for node in page["nodes"]]
+        return sum(self.nodes.values(), [])
+
+    def update_cursors(self, id, cursors):
+        self.cursors.update(cursors)
+
+
+def crawl_connections(totals):
+    endpoint, db = ConnectionsEndpoint(totals), RecordingDB()
+    info = {"watchers": 0, "forks": 0, "stargazers": 0, "watcher_cursor": None, "fork_cursor": None,
+            "stargazer_cursor": None, "pushedAt": "2023-01-01"}
+    counts = asyncio.run(Crawler(endpoint, db, page_sizes={field: 10 for field in totals}).crawl("me", "repo", info, "R"))
+    return endpoint, db, counts
+
+
+def test_crawl_writes_every_connection_and_its_cursors():
+    endpoint, db, counts = crawl_connections({"watchers": 3, "forks": 25, "stargazers": 12})
+
+    assert counts == {"watchers": 3, "forks": 25, "stargazers": 12}
+    assert sorted(db.nodes["watchers"]) == ["w0", "w1", "w2"]
+    assert sorted(db.nodes["forks"]) == sorted(f"F{i}" for i in range(25))
+    assert sorted(db.nodes["stargazers"]) == sorted(f"s{i}" for i in range(12))
+    assert db.cursors == {"watcher_cursor": "3", "fork_cursor": "25", "stargazer_cursor": "12"}
+
+
+def test_finished_connections_drop_out_of_the_next_documents():
+    # pages grow by 10 after every fast one: forks take 10 + 20 + 30
+    endpoint, db, counts = crawl_connections({"watchers": 3, "forks": 45, "stargazers": 12})
+
+    assert endpoint.documents == [
+        ["forks", "stargazers", "watchers"],
+        ["forks", "stargazers"],
+        ["forks"],
+    ]
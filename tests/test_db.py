@@ -0,0 +1,198 @@
+import re
+import datetime
+import pytest
+from database import db, queries
+
+
+def fork(id, owner, typename):
+    return {"id": id, "owner": {"login": owner, "__typename": typename}}
+
+
+def test_edge_statements_group_rows_by_label_and_relationship():
+    page = {
+        "id": "R",
+        "stargazers": {"nodes": [{"login": "a", "__typename": "User"}, None, {"login": "b", "__typename": "User"}]},
+        "watchers": {"nodes": [{"login": "a", "__typename": "User"}]},
+        "forks": {"nodes": [fork("F1", "o", "Organization"), fork("F2", "u", "User"), fork("F3", "p", "Organization")]},
+    }
+    statements = {query: [row.get("login") or row["id"] for row in rows] for query, rows in db.edge_statements(page)}
+
+    assert statements == {
+        queries.merge_owner_edges("User", queries.STAR): ["a", "b"],
+        queries.merge_owner_edges("User", queries.WATCH): ["a"],
+        queries.merge_fork_edges("Organization"): ["F1", "F3"],
+        queries.merge_fork_edges("User"): ["F2"],
+    }
+    assert "apoc" not in "".join(statements)
+
+
+def test_cursors_only_for_pages_with_nodes():
+    page = {
+        "stargazers": {"pageInfo": {"endCursor": "s"}, "nodes": [{"login": "a"}]},
+        "watchers": {"pageInfo": {"endCursor": None}, "nodes": []},
+        "forks": {"nodes": [{"id": "F"}]},
+    }
+    assert db.page_cursors(page) == {"stargazer_cursor": "s"}
+
+
+def test_labels_are_checked():
+    with pytest.raises(ValueError):
+        queries.merge_owner_edges("User`) DETACH DELETE (x", queries.STAR)
+
+
+def test_repeated_rows_are_merged_once():
+    page = {"id": "R", "stargazers": {"nodes": [{"login": "a", "__typename": "User"}] * 2}}
+    [(_, rows)] = db.edge_statements(page)
+    assert rows == [{"login": "a", "__typename": "User"}]
+
+
+CLAUSES = r"\b(MATCH|OPTIONAL|MERGE|CREATE|SET|REMOVE|DELETE|DETACH|UNWIND|CALL|WITH|WHERE|RETURN|ORDER|LIMIT|FOREACH)\b"
+
+
+def without_subqueries(query):
+    """query with the bodies of its CALL { } subqueries cut out, their scope is their own"""
+    while True:
+        start = re.search(r"CALL\s*\{", query, re.IGNORECASE)
+        if not start:
+            return query
+        depth, i = 0, start.end() - 1
+        for i in range(start.end() - 1, len(query)):
+            depth += {"{": 1, "}": -1}.get(query[i], 0)
+            if depth == 0:
+                break
+        query = query[:start.start()] + query[i + 1:]
+
+
+def redeclared_unwinds(query):
+    """Names an UNWIND ... AS declares while the WITH before it still carries them.
+
+    Neo4j refuses these with "Variable already declared"; no server is
+    needed to catch them.
+    """
+    query = without_subqueries(query)
+    names = []
+    for unwind in re.finditer(r"\bUNWIND\s+.+?\s+AS\s+(\w+)", query, re.IGNORECASE | re.DOTALL):
+        withs = list(re.finditer(r"\bWITH\b", query[:unwind.start()], re.IGNORECASE))
+        if not withs:
+            continue
+        projection = query[withs[-1].end():unwind.start()]
+        projection = re.split(CLAUSES, projection, flags=re.IGNORECASE)[0]
+        carried = {item.split()[-1] for item in projection.split(",") if item.split()}
+        if unwind.group(1) in carried:
+            names.append(unwind.group(1))
+    return names
+
+
+def test_edge_statements_do_not_redeclare_variables():
+    assert redeclared_unwinds("WITH result\nUNWIND result AS result\nRETURN result") == ["result"]
+    for edge in (queries.STAR, queries.WATCH):
+        assert redeclared_unwinds(queries.merge_owner_edges("User", edge)) == []
+    assert redeclared_unwinds(queries.merge_fork_edges("Organization")) == []
+
+
+def test_counts_are_read_from_counters():
+    assert "*]" not in queries.get_counts("User")
+
+
+def test_network_operations_do_not_expand_fork_paths():
+    for query in (queries.COLLECT_DELETION, queries.MARK_DELETING, queries.merge_fork_edges("User")):
+        assert f"[:{queries.FORK}*" not in query
+
+
+def test_deletion_tells_kept_owners_from_network_labels():
+    # not a lookup in the collected forks for every edge of every owner
+    subquery = queries.COLLECT_DELETION.split("CALL", 1)[1].split("return owners")[0]
+    assert "IN forks" not in subquery and "IN deleted" not in subquery
+    assert "network_root" in subquery
+
+
+class RecordingDB(db.GitDB):
+    """GitDB without a server: reads return what COLLECT_DELETION would"""
+
+    def __init__(self, left):
+        self.left = left
+        self.statements = []
+
+    def _write(self, func):
+        self.statements.append("write")
+
+    def _read(self, func):
+        return self.left
+
+    def _run(self, query, **params):
+        self.statements.append(params["ids"])
+
+    def close(self):
+        pass
+
+
+def test_delete_repo_deletes_in_chunks_repository_last():
+    left = {"owners": [f"o{i}" for i in range(25)], "forks": [f"f{i}" for i in range(10)], "repo": "r"}
+    recording = RecordingDB(left)
+    reported = []
+    deleted = recording.delete_repo("R", chunk_size=2, progress=lambda d, t: reported.append((d, t)))
+
+    assert deleted == 36
+    # the repository is marked before anything is deleted
+    assert recording.statements[0] == "write"
+    chunks = recording.statements[1:]
+    assert all(len(c) <= 2 * db.DELETE_CHUNKS_PER_STATEMENT for c in chunks)
+    assert sum(chunks, []) == left["owners"] + left["forks"] + ["r"]
+    assert reported[-1] == (36, 36)
+
+
+def test_fork_rows_carry_the_head_oid():
+    node = {"id": "F", "owner": {"login": "o", "__typename": "User"}, "defaultBranchRef": {"target": {"oid": "abc"}}}
+    assert db.fork_row(node)["properties"] == {"login": "o", "head_oid": "abc"}
+
+
+def test_sparse_fork_rows_leave_unselected_fields_out():
+    node = {"id": "F", "name": "repo", "pushedAt": None, "__typename": "Repository",
+            "owner": {"login": "o", "__typename": "User"}}
+    assert db.fork_row(node) == {
+        "id": "F", "owner": {"login": "o", "__typename": "User"},
+        "properties": {"name": "repo", "login": "o"},
+    }
+
+
+def test_fork_dates_are_stored_as_datetimes():
+    node = {"id": "F", "pushedAt": "2024-02-01T10:00:00Z", "owner": {"login": "o", "__typename": "User"}}
+    pushed_at = db.fork_row(node)["properties"]["pushedAt"]
+    assert pushed_at == datetime.datetime(2024, 2, 1, 10, tzinfo=datetime.timezone.utc)
+    assert db.from_datetime(pushed_at) == "2024-02-01T10:00:00Z"
+    # a bare patch date is midnight UTC, and compares with stored dates
+    assert db.to_datetime("2024-02-01") < pushed_at
+
+
+class PagedDB(db.GitDB):
+    """GitDB without a server: reads page through forks like GET_FORKS"""
+
+    def __init__(self, forks, fetch_size):
+        self.forks = sorted(forks, key=lambda fork: fork["id"])
+        self.fetch_size = fetch_size
+        self.pages = []
+
+    def _read(self, func):
+        class Tx:
+            def run(tx, query, after, limit, **params):
+                rows = [{"fork": f, "login": f["login"]} for f in self.forks if after is None or f["id"] > after][:limit]
+                self.pages.append(len(rows))
+                return type("Result", (), {"data": lambda result: rows})()
+        return func(Tx())
+
+    def close(self):
+        pass
+
+
+def test_forks_are_streamed_a_page_at_a_time():
+    forks = [{"id": f"F{i:02}", "login": f"o{i}", "pushedAt": "2024-02-01T00:00:00Z"} for i in range(25)]
+    paged = PagedDB(forks, fetch_size=10)
+
+    rows = paged.get_forks_info("R")
+    assert paged.pages == []
+    assert [row["fork"]["id"] for row in rows] == [f["id"] for f in forks]
+    assert paged.pages == [10, 10, 5]
+
+    paged.pages = []
+    assert len(list(paged.get_forks_info("R", limit=12))) == 12
+    assert paged.pages == [10, 2]
@@ -0,0 +1,85 @@
+import subprocess
+import utils
+from mirror import NetworkMirror
+
+
+def git(cwd, *args):
+    env = {"GIT_AUTHOR_NAME": "t", "GIT_AUTHOR_EMAIL": "t@t", "GIT_COMMITTER_NAME": "t", "GIT_COMMITTER_EMAIL": "t@t",
+           "GIT_AUTHOR_DATE": "2024-01-15T00:00:00Z", "GIT_COMMITTER_DATE": "2024-01-15T00:00:00Z", "HOME": str(cwd)}
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit(repo, message):
+    git(repo, "commit", "--allow-empty", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+def network(tmp_path):
+    """up/repo with a fix on top of a base commit, a fork that synced it and one that did not"""
+    up = tmp_path / "up" / "repo"
+    up.mkdir(parents=True)
+    git(up, "init", "-q", "-b", "main")
+    commit(up, "base")
+    old = tmp_path / "old" / "repo"
+    git(tmp_path, "clone", "-q", str(up), str(old))
+    commit(old, "their own work")
+    fix = commit(up, "fix")
+    synced = tmp_path / "synced" / "repo"
+    git(tmp_path, "clone", "-q", str(up), str(synced))
+    return fix
+
+
+def test_mirror_answers_containment_locally(tmp_path):
+    fix = network(tmp_path)
+    mirror = NetworkMirror("up/repo", tmp_path / "mirror.git", url_format=str(tmp_path) + "/{}")
+
+    assert mirror.fetch(["up/repo", "old/repo", "synced/repo", "gone/repo"]) == ["gone/repo"]
+    mirror.pack()
+    assert mirror.contains("synced/repo", fix) is True
+    assert mirror.contains("old/repo", fix) is False
+    assert mirror.contains("gone/repo", fix) is None
+    assert mirror.containing(fix) == {"up/repo", "synced/repo"}
+    assert mirror.commit_date(fix) == "2024-01-15T00:00:00Z"
+
+
+def test_evaluate_mirror_fetches_only_forks_pushed_since_the_fix(tmp_path):
+    fix = network(tmp_path)
+    mirror = NetworkMirror("up/repo", tmp_path / "mirror.git", url_format=str(tmp_path) + "/{}")
+    forks = [
+        {"id": "S", "login": "synced", "name": "repo", "pushedAt": "2024-02-01T00:00:00Z"},
+        {"id": "O", "login": "old", "name": "repo", "pushedAt": "2024-02-01T00:00:00Z"},
+        # not pushed since the fix, never fetched
+        {"id": "Q", "login": "quiet", "name": "repo", "pushedAt": "2023-01-01T00:00:00Z"},
+    ]
+    patched = utils.evaluate_mirror(mirror, iter(forks), [fix[:7]], "up/repo")
+
+    assert patched == {"S": True, "O": False, "Q": False}
+    assert mirror.head("quiet/repo") is None
+
+
+class CountingMirror(NetworkMirror):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetched = []
+
+    def fetch(self, forks):
+        self.fetched += forks
+        return super().fetch(forks)
+
+
+def test_evaluate_mirror_fetches_nothing_for_known_heads(tmp_path):
+    fix = network(tmp_path)
+    forks = [
+        {"id": i, "login": login, "name": "repo", "pushedAt": "2024-02-01T00:00:00Z",
+         "head_oid": git(tmp_path / login / "repo", "rev-parse", "HEAD")}
+        for i, login in [("S", "synced"), ("O", "old")]
+    ]
+    mirror = CountingMirror("up/repo", tmp_path / "mirror.git", url_format=str(tmp_path) + "/{}")
+    assert utils.evaluate_mirror(mirror, forks, [fix], "up/repo") == {"S": True, "O": False}
+    # synced/repo is at the fix the upstream fetch brought in
+    assert mirror.fetched == ["up/repo", "old/repo"]
+
+    # nobody pushed since: answered from the index, without the network
+    mirror = CountingMirror("up/repo", tmp_path / "mirror.git", url_format=str(tmp_path) + "/{}")
+    assert utils.evaluate_mirror(mirror, forks, [fix], "up/repo") == {"S": True, "O": False}
+    assert mirror.fetched == []
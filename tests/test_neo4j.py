@@ -0,0 +1,108 @@
+"""
+Statements run against a real neo4j server.
+
+Skipped unless FORKSEARCH_TEST_NEO4J is set to host:port of a scratch
+server (FORKSEARCH_TEST_NEO4J_USER/_PASSWORD, default neo4j/password).
+Every node the tests create has an id or login starting with a fresh
+prefix, and is deleted afterwards.
+"""
+import os
+import uuid
+import pytest
+from database import GitDB
+
+SERVER = os.getenv("FORKSEARCH_TEST_NEO4J")
+
+
+@pytest.fixture
+def gitdb():
+    if not SERVER:
+        pytest.skip("FORKSEARCH_TEST_NEO4J is not set")
+    host, port = SERVER.rsplit(":", 1)
+    db = GitDB(host, port, os.getenv("FORKSEARCH_TEST_NEO4J_USER", "neo4j"),
+               os.getenv("FORKSEARCH_TEST_NEO4J_PASSWORD", "password"))
+    db.prefix = f"t{uuid.uuid4().hex[:8]}-"
+    yield db
+    db._run("MATCH (n) WHERE n.id STARTS WITH $p OR n.login STARTS WITH $p DETACH DELETE n", p=db.prefix)
+    db.close()
+
+
+def add_repo(db, id, owner):
+    return db.get_repo_info(id=id, login=owner, owner={"login": owner, "__typename": "User"},
+                            repo_properties={"name": "repo", "isFork": False, "url": ""})
+
+
+def owners(db, *logins, typename="User"):
+    return {"nodes": [{"login": db.prefix + login, "__typename": typename} for login in logins]}
+
+
+def test_owner_edges_are_merged_and_counted(gitdb):
+    p = gitdb.prefix
+    add_repo(gitdb, p + "R", p + "up")
+
+    result = gitdb.add_all_edges({"id": p + "R", "stargazers": owners(gitdb, "a", "b"), "watchers": owners(gitdb, "a")})
+    assert sorted(row["result"] for row in result) == [p + "a", p + "a", p + "b"]
+    # a stars again, c is new
+    gitdb.add_all_edges({"id": p + "R", "stargazers": owners(gitdb, "a", "c")})
+
+    info = add_repo(gitdb, p + "R", p + "up")
+    assert (info["stargazers"], info["watchers"]) == (3, 1)
+
+
+def forks(db, *ids):
+    return {"nodes": [{"id": db.prefix + id, "owner": {"login": db.prefix + id.lower(), "__typename": "User"},
+                       "name": "repo", "isFork": True} for id in ids]}
+
+
+def network(db, *ids):
+    rows = db._run("MATCH (r:Repository) WHERE r.id IN $ids RETURN r.id AS id, r.network_root AS root, r.ancestry AS ancestry, "
+                   "r.fork_depth AS depth, r.fork_count AS forks, r.network_fork_count AS network",
+                   ids=[db.prefix + id for id in ids])
+    strip = lambda id: id[len(db.prefix):]
+    return {strip(row["id"]): (strip(row["root"]), [strip(a) for a in row["ancestry"]], row["depth"],
+                               row["forks"], row["network"]) for row in rows}
+
+
+def test_fork_edges_count_and_label_the_network(gitdb):
+    p = gitdb.prefix
+    # F1 is crawled first, as a root of its own with F2 under it
+    add_repo(gitdb, p + "F1", p + "f1")
+    result = gitdb.add_all_edges({"id": p + "F1", "forks": forks(gitdb, "F2")})
+    assert [row["result"] for row in result] == [p + "f2"]
+    # then the upstream, whose forks F1 is; merging F1 again changes nothing
+    add_repo(gitdb, p + "R", p + "up")
+    gitdb.add_all_edges({"id": p + "R", "forks": forks(gitdb, "F1", "F3")})
+    gitdb.add_all_edges({"id": p + "R", "forks": forks(gitdb, "F1")})
+
+    assert network(gitdb, "R", "F1", "F2", "F3") == {
+        "R": ("R", [], 0, 2, 3),
+        "F1": ("R", ["R"], 1, 1, 1),
+        "F2": ("R", ["R", "F1"], 2, 0, None),
+        "F3": ("R", ["R"], 1, 0, None),
+    }
+    assert add_repo(gitdb, p + "R", p + "up")["forks"] == 3
+
+
+def test_deleting_a_repository_keeps_owners_of_other_edges(gitdb):
+    p = gitdb.prefix
+    add_repo(gitdb, p + "R", p + "up")
+    add_repo(gitdb, p + "O", p + "other")
+    gitdb.add_all_edges({"id": p + "R", "stargazers": owners(gitdb, "both", "only"), "forks": forks(gitdb, "F")})
+    gitdb.add_all_edges({"id": p + "O", "stargazers": owners(gitdb, "both")})
+
+    # R, F, up, only and f; both still stars O
+    assert gitdb.delete_repo(p + "R", progress=lambda deleted, total: None) == 5
+    left = gitdb._run("MATCH (n) WHERE n.id STARTS WITH $p OR n.login STARTS WITH $p RETURN coalesce(n.id, n.login) AS n", p=p)
+    assert sorted(row["n"] for row in left) == [p + "O", p + "both", p + "other"]
+    assert add_repo(gitdb, p + "O", p + "other")["stargazers"] == 1
+
+
+def test_top_forks_are_streamed_by_stored_fork_count(gitdb):
+    p = gitdb.prefix
+    add_repo(gitdb, p + "R", p + "up")
+    gitdb.add_all_edges({"id": p + "R", "forks": forks(gitdb, "A", "B", "C")})
+    gitdb.add_all_edges({"id": p + "B", "forks": forks(gitdb, "B1", "B2")})
+    gitdb.add_all_edges({"id": p + "C", "forks": forks(gitdb, "C1")})
+
+    rows = list(gitdb.get_organizations_info(p + "R", fetch_size=1))
+    assert [(row["org"]["id"][len(p):], row["forkcount"]) for row in rows] == [("B", 2), ("C", 1), ("A", 0)]
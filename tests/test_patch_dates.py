@@ -0,0 +1,53 @@
+import re
+from gh_utils import find_patch_dates
+
+
+def pull(merged_at, head):
+    return {
+        "__typename": "PullRequest",
+        "merged": merged_at is not None,
+        "mergedAt": merged_at,
+        "headRepository": {"nameWithOwner": head, "__typename": "Repository", "url": ""},
+    }
+
+
+class PullsEndpoint:
+    """Answers aliased pullRequests queries from a dict of fork -> pages"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = 0
+
+    def __call__(self, op, variables=None, timeout=None):
+        self.calls += 1
+        data = {}
+        for alias in re.findall(r"(fork\d+): repository", str(op)):
+            i = alias[len("fork"):]
+            owner, before = variables["owner" + i], variables["before" + i]
+            if owner not in self.pages:
+                data[alias] = None
+                continue
+            index = int(before) if before else len(self.pages[owner]) - 1
+            data[alias] = {
+                "id": owner,
+                "pullRequests": {
+                    "pageInfo": {"hasPreviousPage": index > 0, "startCursor": str(index - 1)},
+                    "nodes": self.pages[owner][index],
+                },
+            }
+        return {"data": data, "errors": [{"type": "NOT_FOUND", "message": ""}] if None in data.values() else None}
+
+
+def test_find_patch_dates_batches_forks():
+    endpoint = PullsEndpoint(
+        {
+            "a": [[pull("2021-01-01T00:00:00Z", "up/repo")], [pull(None, "up/repo")]],
+            "b": [[pull("2022-02-02T00:00:00Z", "other/repo"), pull("2022-03-03T00:00:00Z", "up/repo")]],
+            "c": [[]],
+        }
+    )
+    dates = find_patch_dates(endpoint, [("a", "repo"), ("b", "repo"), ("c", "repo"), ("gone", "repo")], "up/repo")
+
+    assert [str(d) for d in dates] == ["2021-01-01 00:00:00", "2022-03-03 00:00:00", "None", "None"]
+    # one document for every fork, then one more for the fork with older pulls
+    assert endpoint.calls == 2
@@ -0,0 +1,65 @@
+import time
+from ratelimit import RateLimitGovernor, TokenBucket
+
+
+def test_bucket_spends_freely_above_reserve():
+    bucket = TokenBucket(100, 60)
+    bucket.update(50, time.time() + 60)
+
+    assert bucket.wait_time(1) == 0
+
+
+def test_bucket_paces_inside_reserve():
+    bucket = TokenBucket(100, 60)
+    now = time.time()
+    bucket.update(10, now + 60)
+    bucket.last_grant = now
+
+    # 10 requests left for 60 seconds: one every 6 seconds
+    assert 5.9 < bucket.wait_time(1, now) <= 6
+
+
+def test_bucket_waits_for_reset_when_empty():
+    bucket = TokenBucket(100, 60)
+    now = time.time()
+    bucket.update(0, now + 30)
+
+    assert 29.9 < bucket.wait_time(1, now) <= 30
+    assert bucket.wait_time(1, now + 31) == 0
+
+
+def test_governor_reads_search_headers():
+    governor = RateLimitGovernor()
+    reset = int(time.time()) + 60
+    governor.observe_headers(
+        {
+            "X-RateLimit-Resource": "code_search",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Limit": "10",
+            "X-RateLimit-Reset": str(reset),
+        }
+    )
+
+    code_search = governor.buckets["code_search"]
+    assert code_search.limit == 10
+    assert code_search.wait_time(1) > 50
+    # the other searches and the core API are not held
+    assert governor.buckets["search"].wait_time(1) == 0
+    assert governor.buckets["core"].wait_time(1) == 0
+
+
+def test_code_search_has_a_bucket_of_ten_a_minute():
+    governor = RateLimitGovernor()
+    with governor.request("code_search"):
+        pass
+
+    assert (governor.buckets["code_search"].limit, governor.buckets["code_search"].remaining) == (10, 9)
+    assert governor.buckets["search"].remaining == 30
+
+
+def test_governor_holds_category_on_secondary_limit():
+    governor = RateLimitGovernor()
+    errors = [{"message": "You have exceeded a secondary rate limit.", "headers": {"Retry-After": "30"}}]
+
+    assert governor.observe_errors(errors)
+    assert governor.buckets["graphql"].wait_time(1) > 29
@@ -0,0 +1,186 @@
+import re
+import utils
+from cache import ResponseCache
+from tests.test_patch_dates import pull
+
+
+class RefreshEndpoint:
+    """nodes(ids:) answers from pushed, pullRequests from pulls (fork owner -> pulls)"""
+
+    def __init__(self, pushed, pulls):
+        self.pushed = pushed
+        self.pulls = pulls
+        self.pull_lookups = []
+
+    def __call__(self, op, variables=None, timeout=None):
+        if "nodes(ids:" in str(op):
+            nodes = [
+                {"id": id, "name": "repo", "pushedAt": self.pushed[id], "owner": {"login": id.lower()}}
+                if id in self.pushed else None
+                for id in variables["ids"]
+            ]
+            return {"data": {"nodes": nodes}}
+        data = {}
+        for alias in re.findall(r"(fork\d+): repository", str(op)):
+            owner = variables["owner" + alias[len("fork"):]]
+            self.pull_lookups.append(owner)
+            data[alias] = {"id": owner, "pullRequests": {"pageInfo": {"hasPreviousPage": False}, "nodes": self.pulls[owner]}}
+        return {"data": data}
+
+
+class ForksDB:
+    def __init__(self, forks):
+        self.forks = forks
+        self.updated = []
+
+    def get_forks_pushed_at(self, id):
+        return self.forks
+
+    def update_forks(self, rows):
+        self.updated += rows
+
+
+def test_refresh_forks_updates_only_pushed_forks():
+    db = ForksDB([
+        {"id": "A", "pushedAt": "2023-01-01T00:00:00Z"},
+        {"id": "B", "pushedAt": "2023-01-01T00:00:00Z"},
+        {"id": "C", "pushedAt": "2023-01-01T00:00:00Z"},
+    ])
+    endpoint = RefreshEndpoint({"A": "2023-01-01T00:00:00Z", "B": "2024-05-05T00:00:00Z"}, {})
+    changed = utils.refresh_forks(endpoint, db, "up", "repo", "R")
+
+    assert changed == 1
+    # patch dates are left to evaluate_patches, which sees B is stale
+    assert endpoint.pull_lookups == []
+    assert db.updated == [{"id": "B", "pushedAt": "2024-05-05T00:00:00Z", "head_oid": None}]
+
+
+def test_refresh_forks_sees_pushes_behind_the_response_cache(tmp_path):
+    db = ForksDB([{"id": "A", "pushedAt": "2023-01-01T00:00:00Z"}])
+    endpoint = RefreshEndpoint({"A": "2023-01-01T00:00:00Z"}, {})
+    utils.set_response_cache(ResponseCache(tmp_path / "c.sqlite"))
+    try:
+        assert utils.refresh_forks(endpoint, db, "up", "repo", "R") == 0
+        endpoint.pushed["A"] = "2024-05-05T00:00:00Z"
+        assert utils.refresh_forks(endpoint, db, "up", "repo", "R") == 1
+    finally:
+        utils.set_response_cache(None)
+
+
+def test_evaluate_patches_looks_up_only_undecided_forks():
+    def fork(id, pushed, **kwargs):
+        return {"id": id, "login": id.lower(), "name": "repo", "pushedAt": pushed, **kwargs}
+
+    forks = [
+        # not pushed since the patch
+        fork("Old", "2023-01-01T00:00:00Z"),
+        # checked at its current push
+        fork("Fresh", "2024-03-01T00:00:00Z", patch_date="2024-02-01T00:00:00Z", patch_checked="2024-03-01T00:00:00Z"),
+        # pushed since it was checked, and never checked
+        fork("Stale", "2024-06-01T00:00:00Z", patch_date="2024-02-01T00:00:00Z", patch_checked="2024-03-01T00:00:00Z"),
+        fork("New", "2024-06-01T00:00:00Z", head_oid="abc"),
+        # at the same commit as New
+        fork("Twin", "2024-06-01T00:00:00Z", head_oid="abc"),
+    ]
+    endpoint = RefreshEndpoint({}, {
+        "stale": [pull("2024-05-01T00:00:00Z", "up/repo")],
+        "new": [pull("2024-05-01T00:00:00Z", "someone/else")],
+    })
+    db = ForksDB([])
+    patched = utils.evaluate_patches(endpoint, db, forks, "2024-01-15", "up/repo")
+
+    assert patched == {"Old": False, "Fresh": True, "Stale": True, "New": False, "Twin": False}
+    assert sorted(endpoint.pull_lookups) == ["new", "stale"]
+    assert db.updated == [
+        {"id": "Stale", "patch_date": "2024-05-01T00:00:00Z", "patch_checked": "2024-06-01T00:00:00Z"},
+        {"id": "New", "patch_date": None, "patch_checked": "2024-06-01T00:00:00Z"},
+        {"id": "Twin", "patch_date": None, "patch_checked": "2024-06-01T00:00:00Z"},
+    ]
+
+
+class HeadsEndpoint:
+    """nodes(ids:) answers the head oid of every id in heads"""
+
+    def __init__(self, heads):
+        self.heads = heads
+        self.ids = []
+
+    def __call__(self, op, variables=None, timeout=None):
+        self.ids += variables["ids"]
+        nodes = [
+            {"id": id, "pushedAt": "", "defaultBranchRef": {"target": {"oid": self.heads[id]}}} if id in self.heads else None
+            for id in variables["ids"]
+        ]
+        return {"data": {"nodes": nodes}}
+
+
+def test_evaluate_containment_compares_only_forks_pushed_since_the_fix(monkeypatch):
+    compared = []
+
+    def contains_commit(nameWithOwner, head, oid, headers):
+        compared.append(nameWithOwner)
+        return head == "merged"
+
+    monkeypatch.setattr(utils, "commit_date", lambda *args: "2024-01-15T00:00:00Z")
+    monkeypatch.setattr(utils, "contains_commit", contains_commit)
+    forks = [
+        {"id": i, "login": i.lower(), "name": "repo", "pushedAt": pushed}
+        for i, pushed in [("Old", "2023-01-01T00:00:00Z"), ("Synced", "2024-06-01T00:00:00Z"),
+                          ("Behind", "2024-06-01T00:00:00Z"), ("Gone", "2024-06-01T00:00:00Z")]
+    ]
+    # heads stored by the crawl, one shared with Synced
+    forks += [
+        {"id": "Twin", "login": "twin", "name": "repo", "pushedAt": "2024-06-01T00:00:00Z", "head_oid": "merged"},
+        {"id": "Other", "login": "other", "name": "repo", "pushedAt": "2024-06-01T00:00:00Z", "head_oid": "old"},
+    ]
+    endpoint = HeadsEndpoint({"Synced": "merged", "Behind": "other"})
+    # forks stream from the database, they can be iterated only once
+    patched = utils.evaluate_containment(endpoint, iter(forks), ["fix"], "up/repo", {})
+
+    assert patched == {"Old": False, "Synced": True, "Behind": False, "Gone": False, "Twin": True, "Other": False}
+    assert endpoint.ids == ["Synced", "Behind", "Gone"]
+    # one compare per distinct head
+    assert compared == ["synced/repo", "behind/repo", "other/repo"]
+
+
+def test_evaluate_containment_looks_heads_up_once_for_all_fixes(monkeypatch):
+    compared = []
+
+    def contains_commit(nameWithOwner, head, oid, headers):
+        compared.append((head, oid))
+        return (head, oid) in {("main", "fix"), ("release", "backport")}
+
+    monkeypatch.setattr(utils, "commit_date", lambda *args: "2024-01-15T00:00:00Z")
+    monkeypatch.setattr(utils, "contains_commit", contains_commit)
+    forks = [
+        {"id": i, "login": i.lower(), "name": "repo", "pushedAt": "2024-06-01T00:00:00Z"}
+        for i in ["Main", "Release", "Stale"]
+    ]
+    endpoint = HeadsEndpoint({"Main": "main", "Release": "release", "Stale": "stale"})
+    patched = utils.evaluate_containment(endpoint, forks, ["fix", "backport"], "up/repo", {})
+
+    assert patched == {"Main": True, "Release": True, "Stale": False}
+    assert endpoint.ids == ["Main", "Release", "Stale"]
+    # a head stops at the first fix it contains
+    assert compared == [("main", "fix"), ("release", "fix"), ("release", "backport"), ("stale", "fix"), ("stale", "backport")]
+
+
+def test_request_repo_passes_its_options_to_the_parent(monkeypatch):
+    infos = {
+        "f": {"id": "F", "isFork": True, "parent": {"nameWithOwner": "up/repo"}, "pushedAt": None},
+        "up": {"id": "U", "isFork": False, "pushedAt": None},
+    }
+    monkeypatch.setattr(utils, "query_info", lambda endpoint, db, owner, name, **kwargs: (infos[owner], {"forks": 0}))
+    crawls = []
+    # delta and profile are the last arguments of query_all
+    monkeypatch.setattr(utils, "query_all", lambda endpoint, db, owner, *args: crawls.append((owner, args[-2:])))
+    monkeypatch.setattr(utils, "Confirm", lambda *args, **kwargs: False)
+
+    class DB:
+        def update_pushedAt(self, id, pushedAt):
+            pass
+
+    utils.request_repo(None, DB(), "f", "repo", info=lambda *args: None, is_recursive=True, update=True,
+                       profile="forks-minimal")
+
+    assert crawls == [("up", (True, "forks-minimal")), ("f", (True, "forks-minimal"))]
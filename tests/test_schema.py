@@ -0,0 +1,12 @@
+from mygithub import schema, trim_schema
+
+
+def test_operations_use_the_trimmed_schema():
+    assert schema.Query.__module__ == "mygithub.github_schema_min"
+
+
+def test_trimmed_schema_is_up_to_date():
+    # fails when a selection needs a type or field the trimmed schema lacks,
+    # run `python -m mygithub.trim_schema` from forksearch/ then
+    source = trim_schema.generate(trim_schema.documents())
+    assert source == trim_schema.SCHEMA_MIN.read_text()
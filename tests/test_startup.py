@@ -0,0 +1,29 @@
+import sys
+import subprocess
+from pathlib import Path
+
+FORKSEARCH = Path(__file__).parent.parent / "forksearch"
+HEAVY = ("neo4j", "requests", "typer", "pycurl", "sgqlc.endpoint.requests", "mygithub.github_schema")
+
+
+def imported_modules(*args):
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=FORKSEARCH,
+                            capture_output=True, text=True)
+    return {line.split("|")[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+def heavy(modules):
+    return sorted(m for m in modules if any(m == h or m.startswith((h + ".", h + "_")) for h in HEAVY))
+
+
+def test_help_imports_nothing_heavy():
+    modules = imported_modules("main.py", "-h")
+    assert "argparse" in modules
+    assert heavy(modules) == []
+    assert "utils" not in modules
+
+
+def test_cli_modules_defer_heavy_imports():
+    modules = imported_modules("-c", "import utils")
+    assert "gh_utils" in modules
+    assert heavy(modules) == []
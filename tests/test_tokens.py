@@ -0,0 +1,62 @@
+from tokens import TokenPool, load_tokens
+
+
+class BudgetEndpoint:
+    """Endpoint that reports a fixed number of points left"""
+
+    def __init__(self, remaining):
+        self.remaining = remaining
+        self.calls = 0
+
+    def __call__(self, query, variables=None, operation_name=None, extra_headers=None, timeout=None):
+        self.calls += 1
+        self.remaining -= 1
+        rate_limit = {"limit": 100, "remaining": self.remaining, "resetAt": "2099-01-01T00:00:00Z", "cost": 1}
+        return {"data": {"rateLimit": rate_limit}}
+
+
+def test_pool_prefers_token_with_most_headroom():
+    low, high = BudgetEndpoint(60), BudgetEndpoint(4000)
+    pool = TokenPool([low, high])
+    pool.record(0, {"remaining": 60, "resetAt": "2099-01-01T00:00:00Z"})
+    pool.record(1, {"remaining": 4000, "resetAt": "2099-01-01T00:00:00Z"})
+
+    for _ in range(5):
+        pool("{ rateLimit { remaining } }")
+
+    assert (low.calls, high.calls) == (0, 5)
+
+
+def test_pool_switches_away_from_low_token():
+    draining, spare = BudgetEndpoint(50), BudgetEndpoint(60)
+    pool = TokenPool([draining, spare])
+    pool.record(0, {"limit": 100, "remaining": 100, "resetAt": "2099-01-01T00:00:00Z"})
+    pool.record(1, {"limit": 100, "remaining": 60, "resetAt": "2099-01-01T00:00:00Z"})
+
+    for _ in range(3):
+        pool("{ rateLimit { remaining } }")
+
+    # the first answer reveals the first token has less left than the spare
+    assert (draining.calls, spare.calls) == (1, 2)
+
+
+def test_pool_skips_blocked_token():
+    blocked, spare = BudgetEndpoint(4000), BudgetEndpoint(60)
+    pool = TokenPool([blocked, spare])
+    pool.record(0, {"remaining": 4000, "resetAt": "2099-01-01T00:00:00Z"})
+    pool.record(1, {"remaining": 60, "resetAt": "2099-01-01T00:00:00Z"})
+    # a secondary limit benches the token with the most headroom
+    pool.buckets[0].block(60)
+
+    for _ in range(3):
+        pool("{ rateLimit { remaining } }")
+
+    assert (blocked.calls, spare.calls) == (0, 3)
+
+
+def test_load_tokens(tmp_path, monkeypatch):
+    token_file = tmp_path / "tokens"
+    token_file.write_text("a\n# comment\nb\n\n")
+    monkeypatch.setenv("GH_TOKENS", "b, c")
+
+    assert load_tokens("a", str(token_file)) == ["a", "b", "c"]